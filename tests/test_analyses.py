@@ -0,0 +1,675 @@
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import unittest
+import unittest.mock
+import tempfile
+import numpy
+from pathlib import Path
+
+from .context import turmeric
+
+from turmeric import aio, batch, batch_solve, log, parser, profiler, progress, results, settings, solvers, trace, units
+from turmeric.FORTRAN.LU import ludcmp, lubksb
+from turmeric.analyses.OP import dc_solve, op_solve
+
+class TranPrintStepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        self.circ, self.analyses = parser.parse_network('tests/data/netlists/RC.net')
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix = self.saved
+        self.tmp.cleanup()
+
+    def test_rows_on_print_grid(self):
+        tran = self.analyses[0]
+        self.assertAlmostEqual(tran.tmax, 10e-6)
+        data = tran.run(self.circ)[1]
+        self.assertEqual(len(data['t']), 10)
+        numpy.testing.assert_allclose(data['t'], numpy.arange(1, 11) * 100e-6)
+        expected = 1 - numpy.exp(-data['t'] / 1e-3)
+        numpy.testing.assert_allclose(data['V(2)'], expected, atol=5e-3)
+
+class StepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+        self.circ, analyses = parser.parse_network('tests/data/netlists/STEP.net')
+        self.step = analyses[-1]
+        self.analyses = analyses[:-1]
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def test_parse(self):
+        self.assertEqual(self.step.param, 'r2')
+        numpy.testing.assert_allclose(self.step.values(), [1e3, 2e3, 3e3])
+
+    def test_incremental_restamp(self):
+        self.step.prepare(self.circ)
+        self.step.apply(self.circ, 3e3)
+        M0 = self.circ.M0.copy()
+        self.circ.gen_matrices()
+        numpy.testing.assert_allclose(M0, self.circ.M0)
+        self.step.restore(self.circ)
+
+    def test_divider(self):
+        res = self.step.run(self.circ, self.analyses)['OP']
+        numpy.testing.assert_allclose(res['R2'], [1e3, 2e3, 3e3])
+        numpy.testing.assert_allclose(res['V(2)'], [5., 20/3, 7.5])
+        # the circuit is left as it was parsed
+        self.assertEqual(self.circ[2].value, 1e3)
+
+    def test_jobs(self):
+        serial = self.step.run(self.circ, self.analyses)['OP']
+        self.step.jobs = 2
+        parallel = self.step.run(self.circ, self.analyses)['OP']
+        for k in serial:
+            numpy.testing.assert_allclose(serial[k], parallel[k])
+
+class MonteCarloTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+        self.circ, analyses = parser.parse_network('tests/data/netlists/MC.net')
+        self.mc = analyses[-1]
+        self.analyses = analyses[:-1]
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def samples(self):
+        return results.Solution(filename='test.OP', sol_type='OP').as_dict()[1]
+
+    def test_parse(self):
+        self.assertEqual(self.mc.runs, 20)
+        self.assertEqual(self.mc.seed, 7)
+        self.assertAlmostEqual(self.mc.told, 0.1)
+
+    def test_parse_tolerances(self):
+        mc = type(self.mc)('.mc runs=5 tol=50m tolr=10m tolc=0.2')
+        self.assertEqual((mc.tol, mc.tolr, mc.tolc, mc.toll, mc.told), (0.05, 0.01, 0.2, 0.05, 0.05))
+
+    def test_samples_within_tolerance(self):
+        self.mc.prepare(self.circ)
+        self.mc.apply(self.circ, 3)
+        for elem, attr, tol, nominal in self.mc._elements + self.mc._models:
+            self.assertLessEqual(abs(getattr(elem, attr) - nominal), tol * abs(nominal))
+        self.mc.restore(self.circ)
+        self.assertEqual(self.circ[1].value, 1e3)
+
+    def test_statistics(self):
+        stats = self.mc.run(self.circ, self.analyses)['OP']
+        samples = self.samples()
+        numpy.testing.assert_array_equal(samples['SAMPLE'], numpy.arange(20))
+        numpy.testing.assert_allclose(stats['MEAN(V(2))'], samples['V(2)'].mean())
+        numpy.testing.assert_allclose(stats['STD(V(2))'], samples['V(2)'].std(ddof=1))
+        numpy.testing.assert_allclose(stats['MAX(V(3))'], samples['V(3)'].max())
+        # scratch results of the samples are removed
+        self.assertEqual(sorted(p.name for p in Path(self.tmp.name).iterdir() if not p.name.endswith('.cols')),
+                         ['test.OP', 'test.OP.stats'])
+
+    def test_reproducible_across_jobs(self):
+        self.mc.run(self.circ, self.analyses)
+        serial = self.samples()
+        self.mc.jobs = 3
+        self.mc.run(self.circ, self.analyses)
+        parallel = self.samples()
+        for k in serial:
+            numpy.testing.assert_array_equal(serial[k], parallel[k])
+
+class DCSweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+        self.circ, (self.dc,) = parser.parse_network('tests/data/netlists/DIODE_DC.net')
+        self.jacobians = 0
+        generate_J_and_N = self.circ.generate_J_and_N
+        def counted(*args):
+            self.jacobians += 1
+            return generate_J_and_N(*args)
+        self.circ.generate_J_and_N = counted
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def test_matches_operating_points(self):
+        ZDC0 = self.circ.ZDC0.copy()
+        res = self.dc.run(self.circ)[1]
+        numpy.testing.assert_allclose(res['V1'], numpy.linspace(-2, 5, 141))
+        # the circuit is left at the nominal source value
+        numpy.testing.assert_array_equal(self.circ.ZDC0, ZDC0)
+        sweep = self.jacobians
+        self.jacobians = 0
+        v1 = self.circ[2]
+        for k in range(0, 141, 10):
+            v1.dc_value = res['V1'][k]
+            self.circ.gen_matrices()
+            x = op_solve(self.circ)[:, 0]
+            numpy.testing.assert_allclose([res[h][k] for h in list(res)[1:]], x, atol=1e-9)
+        # continuation needs less than a full solve every 10 points
+        self.assertLess(sweep, self.jacobians)
+
+    def test_repeated_runs(self):
+        first = self.dc.run(self.circ)[1]
+        second = self.dc.run(self.circ)[1]
+        for h in first:
+            numpy.testing.assert_array_equal(first[h], second[h])
+
+    def test_lubksb_is_stateless(self):
+        rng = numpy.random.default_rng(0)
+        A = rng.random((5, 5)) + numpy.eye(5)
+        LU, INDX, _, _ = ludcmp(A.copy(), 5)
+        b = numpy.zeros(5)
+        b[4] = 1.
+        for b in (b, rng.random(5)):
+            numpy.testing.assert_allclose(lubksb(LU, INDX, b.copy()), numpy.linalg.solve(A, b))
+
+class LinearDCSweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+        self.circ, (self.dc,) = parser.parse_network('tests/data/netlists/LADDER_DC.net')
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def test_matches_operating_points(self):
+        res = self.dc.run(self.circ)[1]
+        numpy.testing.assert_allclose(res['I1'], numpy.linspace(-2e-3, 2e-3, 9))
+        i1 = self.circ[-1]
+        for k, v in enumerate(res['I1']):
+            i1.dc_value = v
+            self.circ.gen_matrices()
+            x = op_solve(self.circ)[:, 0]
+            numpy.testing.assert_allclose([res[h][k] for h in list(res)[1:]], x, atol=1e-9)
+
+    def test_single_factorisation(self):
+        with unittest.mock.patch('turmeric.analyses.DC.ludcmp', wraps=ludcmp) as factor:
+            self.dc.run(self.circ)
+        self.assertEqual(factor.call_count, 1)
+
+class NestedDCSweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def check_operating_points(self, circ, res, sources, points):
+        for k in points:
+            for src, label in sources:
+                src.dc_value = res[label][k]
+            circ.gen_matrices()
+            x = op_solve(circ)[:, 0]
+            numpy.testing.assert_allclose([res[h][k] for h in list(res)[2:]], x, atol=1e-9)
+
+    def test_batched_diode_curves(self):
+        circ, (dc,) = parser.parse_network('tests/data/netlists/DIODE_DC2.net')
+        self.assertTrue(batch_solve.batchable(circ))
+        res = dc.run(circ)[1]
+        self.assertEqual(list(res)[:2], ['V1', 'I2'])
+        numpy.testing.assert_allclose(res['I2'], numpy.repeat(numpy.linspace(0, 0.01, 6), 141))
+        numpy.testing.assert_allclose(res['V1'], numpy.tile(numpy.linspace(-2, 5, 141), 6))
+        with unittest.mock.patch('turmeric.batch_solve.batchable', return_value=False):
+            nested = dc.run(circ)[1]
+        for h in res:
+            numpy.testing.assert_allclose(res[h], nested[h], atol=1e-9)
+        self.check_operating_points(circ, res, [(circ[0], 'V1'), (circ[3], 'I2')], range(0, 846, 97))
+
+    def test_failed_inner_start(self):
+        circ, (dc,) = parser.parse_network('tests/data/netlists/DIODE_DC2.net')
+        expected = dc.run(circ)[1]
+        batch_newton = batch_solve.batch_newton
+        calls = []
+        def fail_one_start(*args, **kwargs):
+            x, converged, iters, t = batch_newton(*args, **kwargs)
+            if not calls:
+                # the start of the third inner sweep diverges
+                x[2], converged[2] = 1e3, False
+            calls.append(1)
+            return x, converged, iters, t
+        with unittest.mock.patch('turmeric.batch_solve.batch_newton', fail_one_start):
+            res = dc.run(circ)[1]
+        missing = (expected['V1'] == -2) & numpy.isclose(expected['I2'], 0.004)
+        self.assertEqual(missing.sum(), 1)
+        self.assertEqual(len(res['V1']), len(expected['V1']) - 1)
+        for h in res:
+            numpy.testing.assert_allclose(res[h], expected[h][~missing], atol=1e-9)
+
+    def test_linear_grid(self):
+        circ, (dc,) = parser.parse_network('tests/data/netlists/LADDER_DC.net')
+        dc.src2, dc.start2, dc.stop2, dc.step2 = 'v1', 0., 2., 0.5
+        res = dc.run(circ)[1]
+        self.assertEqual(len(res['I1']), 45)
+        self.check_operating_points(circ, res, [(circ[-1], 'I1'), (circ[0], 'V1')], range(45))
+
+class TempTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+        self.circ, (self.op, self.temp) = parser.parse_network('tests/data/netlists/TEMP.net')
+        self.model = self.circ.models['dx']
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def test_scaled_parameters(self):
+        IS = self.model.IS
+        nominal = self.model.scaled(self.model.T)
+        self.assertEqual(nominal.IS, IS)
+        hot = self.model.scaled(units.Kelvin(celsius=100))
+        self.assertGreater(hot.IS, nominal.IS)
+        # cached, and the model is left as it was
+        self.assertIs(self.model.scaled(units.Kelvin(celsius=100)), hot)
+        self.assertEqual(self.model.IS, IS)
+        with self.assertRaises(AttributeError):
+            hot.IS = 0
+
+    def test_mixed_temperatures(self):
+        res = self.op.run(self.circ)[1]
+        # d2 is at 350 K, between the 75 and 100 C steps of d1
+        swept = self.temp.run(self.circ, [self.op])['OP']
+        numpy.testing.assert_allclose(swept['TEMP'], [0, 25, 50, 75, 100])
+        numpy.testing.assert_allclose(swept['V(2)'], swept['V(3)'])
+        self.assertTrue(swept['V(2)'][4] < res['V(3)'][0] < swept['V(2)'][3])
+        self.assertAlmostEqual(res['V(2)'][0], numpy.interp(26.85, swept['TEMP'], swept['V(2)']), places=3)
+        # the devices are back at their own temperatures
+        self.assertEqual([d.T for d in self.circ if d.is_nonlinear], [units.Kelvin(celsius=26.85), 350.])
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_output_directories(self):
+        dirs = batch.output_directories(['a/RC.net', 'b/RC.net', 'b/rc.cir', 'VRD.net'], 'out')
+        self.assertEqual([Path(d).name for d in dirs], ['RC', 'RC-2', 'rc-3', 'VRD'])
+
+    def test_run_batch(self):
+        netlists = ['tests/data/netlists/R*.net', 'tests/data/netlists/STEP.net', 'tests/data/netlists/missing.net']
+        res = batch.run_batch(netlists, jobs=2, outprefix='test', output_directory=self.tmp.name)
+        self.assertEqual([Path(r.netlist).name for r in res], ['RC.net', 'STEP.net', 'missing.net'])
+        self.assertEqual([r.status for r in res], ['ok', 'ok', 'error'])
+        self.assertEqual(len({r.output_directory for r in res}), 3)
+        for r in res[:2]:
+            self.assertTrue((Path(r.output_directory) / 'test.log').is_file())
+            self.assertTrue(any(Path(r.output_directory).glob('test.*')))
+        self.assertTrue((Path(res[1].output_directory) / 'test.OP').is_file())
+        self.assertIn('2/3 ok', batch.summary(res))
+
+    def test_missing_include(self):
+        bad = Path(self.tmp.name) / 'bad.net'
+        bad.write_text('* missing include\n.include nowhere.net\n.op\n')
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                out = Path(self.tmp.name) / f'out{jobs}'
+                res = batch.run_batch([str(bad), 'tests/data/netlists/RC.net'], jobs=jobs, outprefix='test', output_directory=str(out))
+                self.assertEqual([r.status for r in res], ['error', 'ok'])
+                self.assertIn('FileNotFoundError', res[0].message)
+
+    def test_job_logs(self):
+        root = logging.getLogger()
+        level = root.level
+        root.setLevel(logging.INFO)
+        log.start(logging.NullHandler())
+        try:
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    out = Path(self.tmp.name) / f'out{jobs}'
+                    netlists = ['tests/data/netlists/RC.net', 'tests/data/netlists/STEP.net']
+                    res = batch.run_batch(netlists, jobs=jobs, outprefix='test', output_directory=str(out))
+                    for r, other in zip(res, reversed(netlists)):
+                        # written through the listener, with the records of its own job only
+                        text = (Path(r.output_directory) / 'test.log').read_text()
+                        self.assertIn(f"Parsing netlist file `{r.netlist}'", text)
+                        self.assertNotIn(other, text)
+        finally:
+            log.stop()
+            root.setLevel(level)
+
+class AsyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_events(self):
+        async def events():
+            return [e async for e in aio.simulate('tests/data/netlists/RC.net', 'test', self.tmp.name, chunk_rows=4)]
+        events = asyncio.run(events())
+        ticks = [e.data for e in events if e.kind == 'progress']
+        self.assertTrue(ticks[-1].done)
+        self.assertEqual(ticks[-1].analysis, 'TRAN')
+        events = [e for e in events if e.kind != 'progress']
+        self.assertEqual([e.kind for e in events][:2], ['open', 'rows'])
+        self.assertEqual([e.kind for e in events][-2:], ['close', 'done'])
+        self.assertEqual(events[-1].data, {'TRAN' : True})
+        rows = numpy.concatenate([e.data for e in events if e.kind == 'rows'])
+        with unittest.mock.patch.object(settings, 'output_directory', self.tmp.name):
+            written = results.Solution(filename='test.TRAN', sol_type='TRAN').as_dict()[1]
+        self.assertEqual(events[0].data, list(written))
+        numpy.testing.assert_allclose(rows, numpy.column_stack(list(written.values())))
+
+    def test_run(self):
+        res = asyncio.run(aio.run('tests/data/netlists/STEP.net', 'test', self.tmp.name))
+        self.assertEqual(list(res), ['OP'])
+        self.assertEqual(list(res['OP'])[0], 'R2')
+
+    def test_run_mc(self):
+        with unittest.mock.patch.object(settings, 'results_column_store', False):
+            res = asyncio.run(aio.run('tests/data/netlists/MC.net', 'test', self.tmp.name))
+        # the statistics, as turmeric.main returns them, in the settings of this process
+        self.assertEqual(list(res['OP'])[:4], ['MEAN(V(1))', 'STD(V(1))', 'MIN(V(1))', 'MAX(V(1))'])
+        self.assertEqual(sorted(p.name for p in Path(self.tmp.name).glob('test.*')), ['test.OP', 'test.OP.stats'])
+
+    def test_cancel(self):
+        async def cancelled():
+            task = asyncio.create_task(aio.run('tests/data/netlists/MC.net', 'test', self.tmp.name))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(cancelled())
+        self.assertEqual(multiprocessing.active_children(), [])
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.use_netlist_cache)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.use_netlist_cache = False
+
+    def tearDown(self):
+        profiler.disable()
+        settings.output_directory, settings.outprefix, settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def test_report(self):
+        profiler.enable()
+        with profiler.record('parse'):
+            circ, analyses = parser.parse_network('tests/data/netlists/DIODE_DC.net')
+        turmeric.turmeric.run(circ, analyses)
+        path = profiler.write_report('DIODE_DC.net')
+        self.assertEqual(path, Path(self.tmp.name) / 'test.profile.json')
+        with path.open() as f:
+            report = json.load(f)
+        parse, dc = report['profiles']
+        self.assertEqual(parse['analysis'], 'parse')
+        self.assertIn('assembly', parse['phases'])
+        self.assertEqual(dc['analysis'], 'DC')
+        for phase in ('devices', 'lu_factor', 'lu_solve', 'io'):
+            self.assertGreater(dc['phases'][phase], 0)
+        self.assertAlmostEqual(sum(dc['phases'].values()), dc['wall'])
+        self.assertGreater(dc['counters']['newton_iterations'], 0)
+
+    def test_disabled(self):
+        circ, analyses = parser.parse_network('tests/data/netlists/DIODE_DC.net')
+        with profiler.record('DC'):
+            turmeric.turmeric.run(circ, analyses)
+        self.assertFalse(profiler.enabled())
+        self.assertEqual(profiler.report()['profiles'], [])
+
+class HomotopyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = settings.use_netlist_cache
+        settings.use_netlist_cache = False
+
+    def tearDown(self):
+        profiler.disable()
+        settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def scales(self, stepper, iterations):
+        """The source scales stepper tries, given the outcome of each step"""
+        tried = []
+        for n_iter in iterations:
+            if stepper.finished or stepper.failed:
+                break
+            tried.append(stepper.operate_on_M_and_ZDC(numpy.eye(1), numpy.ones(1), numpy.zeros(1))[1][0])
+            stepper.step_result(n_iter is not None, n_iter)
+        return tried
+
+    def test_source_stepping_reaches_full_source(self):
+        stepper = solvers.SourceStepper()
+        numpy.testing.assert_allclose(self.scales(stepper, [1] * 10), [0, .1, .3, .7, 1])
+        self.assertTrue(stepper.finished)
+
+    def test_bisection(self):
+        stepper = solvers.SourceStepper(step=.4)
+        # the steps to 1 and .8 fail, and from .6 on steps take long
+        tried = self.scales(stepper, [1, 1, None, None, 20, 20, 20])
+        numpy.testing.assert_allclose(tried, [0, .4, 1, .8, .6, .8, 1])
+        self.assertTrue(stepper.finished)
+        stepper = solvers.SourceStepper(min_step=.01)
+        self.scales(stepper, [1] + [None] * 10)
+        self.assertTrue(stepper.failed)
+
+    def test_gmin_stepping_stops_at_gmin(self):
+        stepper = solvers.GminStepper()
+        G = numpy.full(1, settings.gmin)
+        gmins = []
+        while not stepper.finished:
+            gmins.append(stepper.operate_on_M_and_ZDC(numpy.zeros(1), numpy.zeros(1), G.copy())[0][0])
+            stepper.step_result(True, 1)
+        numpy.testing.assert_allclose(gmins, [1e-1, 1e-2, 1e-4, 1e-8, settings.gmin])
+
+    def test_op_homotopy(self):
+        net = Path(self.tmp.name) / 'hard.net'
+        net.write_text("* forward biased diode\nv1 1 0 type=vdc vdc=50\nr1 1 2 0.1\nd1 2 0 dx\n.model d dx is=10f\n")
+        circ = parser.parse_network(str(net))[0]
+        profiler.enable()
+        with profiler.record('OP'):
+            x = op_solve(circ)
+        counters = profiler.report()['profiles'][0]['counters']
+        self.assertIn('solver:source_stepping', counters)
+        self.assertLess(counters['newton_iterations'], 1500)
+        # the diode current matches the resistor's
+        v, i = x[1, 0], -x[2, 0]
+        self.assertAlmostEqual(i, (50 - v) / 0.1, places=3)
+        self.assertAlmostEqual(i, 10e-15 * numpy.expm1(v / 0.025851), delta=1e-2 * i)
+
+    def test_op_capacitor_node_quiet(self):
+        net = Path(self.tmp.name) / 'divider.net'
+        net.write_text("* capacitive divider\nv1 1 0 type=vdc vdc=1\nc1 1 2 1u\nc2 2 0 1u\nr1 1 0 1k\n")
+        circ = parser.parse_network(str(net))[0]
+        with self.assertLogs('turmeric', level='WARNING') as logs:
+            x = op_solve(circ)
+        self.assertAlmostEqual(x[0, 0], 1.)
+        self.assertFalse(any('Singular' in r or 'Newton iterations' in r for r in logs.output))
+        self.assertEqual(len(logs.output), 2)
+
+    def test_op_failure_dumps_trace_once(self):
+        for name in ('use_gmin_stepping', 'use_source_stepping', 'use_pseudo_transient'):
+            self.addCleanup(setattr, settings, name, getattr(settings, name))
+            setattr(settings, name, False)
+        net = Path(self.tmp.name) / 'ptran.net'
+        net.write_text("* current driven diode\ni1 0 1 type=idc idc=1\nd1 1 0 dx\n.model d dx is=0.1f\n")
+        circ = parser.parse_network(str(net))[0]
+        with self.assertLogs('turmeric', level='WARNING') as logs:
+            self.assertIsNone(op_solve(circ))
+        dumps = [r for r in logs.output if 'Newton iterations' in r]
+        self.assertEqual(len(dumps), 1)
+        self.assertIn('op_solve() failed', dumps[0])
+
+    def test_pseudo_transient_steps(self):
+        stepper = solvers.PtranStepper(step=6)
+        G = numpy.diag([settings.gmin, settings.gmin, 0])
+        x = numpy.array([[1.], [2.], [3.]])
+        M, Z = stepper.operate_on_M_and_ZDC(numpy.zeros((3, 3)), numpy.zeros((3, 1)), G.copy(), x)
+        # one farad per second on the nodes, pulling them towards x
+        numpy.testing.assert_allclose(M, G + numpy.diag([1, 1, 0]))
+        numpy.testing.assert_allclose(Z, [[-1], [-2], [0]])
+        stepper.step_result(True, 1)
+        stepper.operate_on_M_and_ZDC(numpy.zeros((3, 3)), numpy.zeros((3, 1)), G.copy(), x)
+        stepper.step_result(True, 1)
+        M, Z = stepper.operate_on_M_and_ZDC(numpy.zeros((3, 3)), numpy.zeros((3, 1)), G.copy(), x)
+        # the last step is at DC
+        numpy.testing.assert_allclose(M, G)
+        numpy.testing.assert_allclose(Z, 0)
+        stepper.step_result(True, 1)
+        self.assertTrue(stepper.finished)
+
+    def test_op_pseudo_transient(self):
+        self.addCleanup(setattr, settings, 'use_gmin_stepping', settings.use_gmin_stepping)
+        self.addCleanup(setattr, settings, 'use_source_stepping', settings.use_source_stepping)
+        settings.use_gmin_stepping = settings.use_source_stepping = False
+        net = Path(self.tmp.name) / 'ptran.net'
+        net.write_text("* current driven diode\ni1 0 1 type=idc idc=1\nd1 1 0 dx\n.model d dx is=0.1f\n")
+        circ = parser.parse_network(str(net))[0]
+        profiler.enable()
+        with profiler.record('OP'):
+            x = op_solve(circ)
+        counters = profiler.report()['profiles'][0]['counters']
+        self.assertIn('solver:pseudo_transient', counters)
+        self.assertAlmostEqual(x[0, 0], 0.025851 * numpy.log(1 / 0.1e-15), delta=1e-3)
+
+class ProgressTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.progress_interval)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        self.events = []
+        progress.add_listener(self.events.append)
+        self.circ, self.analyses = parser.parse_network('tests/data/netlists/RC.net')
+
+    def tearDown(self):
+        progress.remove_listener(self.events.append)
+        settings.output_directory, settings.outprefix, settings.progress_interval = self.saved
+        self.tmp.cleanup()
+
+    def test_tran(self):
+        settings.progress_interval = 0
+        self.analyses[0].run(self.circ)
+        self.assertTrue(all(e.analysis == 'TRAN' and e.unit == 's' for e in self.events))
+        fractions = [e.fraction for e in self.events]
+        self.assertEqual(fractions[0], 0)
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertGreater(len(self.events), 10)
+        last = self.events[-1]
+        self.assertTrue(last.done)
+        self.assertEqual(last.fraction, 1)
+        self.assertAlmostEqual(last.value, 1e-3)
+        self.assertFalse(any(e.done for e in self.events[:-1]))
+
+    def test_tran_failed(self):
+        settings.progress_interval = 0
+        import turmeric.analyses.TRAN as TRAN
+        solve, calls = TRAN.dc_solve, []
+        def fail_tenth_step(*args, **kwargs):
+            calls.append(None)
+            x, error, solved, n_iter = solve(*args, **kwargs)
+            return x, error, solved and len(calls) < 10, n_iter
+        with unittest.mock.patch.object(TRAN, 'dc_solve', fail_tenth_step):
+            self.assertIsNone(self.analyses[0].run(self.circ))
+        last = self.events[-1]
+        self.assertTrue(last.done and last.failed)
+        self.assertTrue(0 < last.fraction < 1)
+        self.assertFalse(any(e.failed for e in self.events[:-1]))
+        out = io.StringIO()
+        progress.console_bar(last, length=10, stream=out)
+        self.assertTrue(out.getvalue().endswith(" failed\n"))
+
+    def test_throttled(self):
+        settings.progress_interval = 3600
+        self.analyses[0].run(self.circ)
+        # the start, the first step and the end
+        self.assertEqual(len(self.events), 3)
+        self.assertTrue(self.events[-1].done)
+
+    def test_no_listener(self):
+        progress.remove_listener(self.events.append)
+        reporter = progress.start('TRAN', 10)
+        reporter.update(5)
+        reporter.finish()
+        progress.add_listener(self.events.append)
+        self.assertEqual(self.events, [])
+
+    def test_console_bar(self):
+        out = io.StringIO()
+        progress.console_bar(progress.ProgressEvent('AC', .5, 1e3, 'Hz', 10., 2., False), length=10, stream=out)
+        self.assertEqual(out.getvalue(), "\rAC analysis |#####-----| 50.0% ETA 2.0 s")
+
+class NewtonTraceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (settings.use_netlist_cache, settings.newton_trace_length)
+        settings.use_netlist_cache = False
+        settings.newton_trace_length = 8
+        self.circ = parser.parse_network('tests/data/netlists/DIODE_DC.net')[0]
+
+    def tearDown(self):
+        settings.use_netlist_cache, settings.newton_trace_length = self.saved
+
+    def test_ring_buffer(self):
+        t = trace.NewtonTrace(4)
+        for k in range(10):
+            t.record(k, numpy.array([[3.], [4.]]), numpy.array([[k], [-2. * k]]))
+        entries = t.entries(self.circ)
+        self.assertEqual([e['iteration'] for e in entries], [6, 7, 8, 9])
+        self.assertEqual(entries[-1]['residual'], 5.)
+        self.assertEqual(entries[-1]['max_dx'], 18.)
+        self.assertEqual(entries[-1]['unknown'], trace.unknown_names(self.circ)[1])
+
+    def test_dump_on_failure(self):
+        next(e for e in self.circ if e.part_id == '1' and e.name == 'v').dc_value = 5
+        self.circ.gen_matrices()
+        M, Z = self.circ.M0[1:, 1:], self.circ.ZDC0[1:]
+        with self.assertLogs(level='WARNING') as logs:
+            converged = dc_solve(M, Z, self.circ, MAXIT=3)[2]
+        self.assertFalse(converged)
+        dump = [r for r in logs.output if 'Newton iterations' in r]
+        self.assertEqual(len(dump), 1)
+        self.assertIn('standard', dump[0])
+        entries = trace.newton_trace.entries(self.circ)
+        self.assertEqual(len(entries), 3)
+        self.assertTrue(all(e['unknown'] in trace.unknown_names(self.circ) for e in entries))
@@ -0,0 +1,41 @@
+import unittest
+import numpy
+
+from .context import turmeric
+
+from turmeric.gui import decimate
+
+class DecimateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.x = numpy.linspace(0, 1, 100001)
+        self.y = numpy.sin(2 * numpy.pi * 50 * self.x)
+        # a single sample spike that must survive min/max decimation
+        self.y[31415] = 5.0
+
+    def test_minmax_keeps_extremes(self):
+        x, y = decimate.minmax(self.x, self.y, 1000)
+        self.assertLessEqual(len(x), 1004)
+        self.assertEqual(y.max(), 5.0)
+        self.assertEqual(y.min(), self.y.min())
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertTrue(numpy.all(numpy.diff(x) > 0))
+
+    def test_lttb(self):
+        x, y = decimate.lttb(self.x, self.y, 1000)
+        self.assertEqual(len(x), 1000)
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertTrue(numpy.all(numpy.diff(x) > 0))
+        self.assertIn(5.0, y)
+
+    def test_short_input_unchanged(self):
+        for method in decimate.decimation_methods:
+            x, y = decimate.decimate(self.x[:10], self.y[:10], 1000, method)
+            self.assertEqual(len(x), 10)
+        self.assertRaises(ValueError, decimate.decimate, self.x, self.y, 1000, 'cubic')
+
+    def test_visible(self):
+        w = decimate.visible(self.x, 0.25, 0.5)
+        self.assertLess(self.x[w][0], 0.25)
+        self.assertGreater(self.x[w][-1], 0.5)
+        self.assertEqual(w.stop - w.start, 25003)
@@ -0,0 +1,62 @@
+import logging
+import logging.handlers
+import threading
+import unittest
+
+from .context import turmeric
+
+from turmeric import log
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.name, record.levelname, record.getMessage(), threading.current_thread()))
+
+class LogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loggers = {name : logging.getLogger(name).level for name in ('turmeric.a', 'turmeric.b', '')}
+
+    def tearDown(self):
+        log.stop()
+        for name, level in self.loggers.items():
+            logging.getLogger(name).setLevel(level)
+
+    def test_parse_levels(self):
+        self.assertEqual(log.parse_levels(' turmeric.a=info, root=WARNING,'), {'turmeric.a' : 'INFO', '' : 'WARNING'})
+        self.assertEqual(log.parse_levels(''), {})
+        for bad in ('turmeric.a', 'turmeric.a=LOUD'):
+            with self.assertRaises(ValueError):
+                log.parse_levels(bad)
+
+    def test_levels_per_subsystem(self):
+        logging.getLogger().setLevel(logging.DEBUG)
+        log.apply_levels('turmeric.a=WARNING,turmeric.b=DEBUG')
+        handler = _Records()
+        log.start(handler)
+        logging.getLogger('turmeric.a').debug("dropped %d", 1)
+        logging.getLogger('turmeric.a').warning("kept %d", 2)
+        logging.getLogger('turmeric.b').debug("kept %d", 3)
+        log.stop()
+        self.assertEqual([r[:3] for r in handler.records],
+                         [('turmeric.a', 'WARNING', 'kept 2'), ('turmeric.b', 'DEBUG', 'kept 3')])
+        # written out by the listener, not by the logging thread
+        self.assertTrue(all(r[3] is not threading.current_thread() for r in handler.records))
+        self.assertFalse(any(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers))
+
+    def test_add_handler(self):
+        logging.getLogger('turmeric.a').setLevel(logging.INFO)
+        console, job = _Records(), _Records()
+        log.start(console)
+        logging.getLogger('turmeric.a').info("before")
+        log.add_handler(job)
+        logging.getLogger('turmeric.a').info("during")
+        log.remove_handler(job)
+        logging.getLogger('turmeric.a').info("after")
+        log.stop()
+        self.assertEqual([r[2] for r in console.records], ['before', 'during', 'after'])
+        self.assertEqual([r[2] for r in job.records], ['during'])
+        self.assertIsNot(job.records[0][3], threading.current_thread())
@@ -1,5 +1,7 @@
 import unittest
+import unittest.mock
 from pathlib import Path
+import tempfile
 import numpy, codecs, json
 
 from .context import turmeric
@@ -47,7 +49,12 @@ class MatrixStampingTestCase(unittest.TestCase):
         [f.close() for f in [i for sublist in matfiledict.values() for i in sublist]]
 
         self.netlists = [str(datapath / 'netlists' / (prefix + '.net')) for prefix in data_prefixes ]
-        self.genMats = {t : [getattr(np.parse_network(fn)[0],t) for fn in self.netlists] for t in mattypes}
+        saved = turmeric.settings.use_netlist_cache
+        turmeric.settings.use_netlist_cache = False
+        try:
+            self.genMats = {t : [getattr(np.parse_network(fn)[0],t) for fn in self.netlists] for t in mattypes}
+        finally:
+            turmeric.settings.use_netlist_cache = saved
 
     def test_M0_generation(self):
         for m, gm, n in zip(self.mats['M0'], self.genMats['M0'], self.netlists):
@@ -58,3 +65,185 @@ class MatrixStampingTestCase(unittest.TestCase):
         for m, gm, n in zip(self.mats['ZDC0'], self.genMats['ZDC0'], self.netlists):
             self.assertEqual(gm.tolist(), m.tolist())
 
+
+class TokenizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.circ = turmeric.circuit.Circuit('tokenizer test')
+
+    def test_fast_path_matches_regex(self):
+        from turmeric.components.Parseable import _line_pattern
+        lines = ['r1 1 2 1k', 'R2  3   0 4.7meg * comment', 'r3 1 2 10kohm', 'c1 1 0 1.5e-3u', 'l1 1 0 inf']
+        for line in lines:
+            with self.subTest(line=line):
+                elem = turmeric.components.__dict__[line[0].upper()](line, self.circ)
+                r, pattern, checks = _line_pattern('', elem.name, elem.net_objs)
+                regex_groups = list(pattern.search(line.strip().lower()).groups())
+                self.assertEqual([str(t) for t in elem.tokens], [str(n(g)) for n, g in zip(elem.net_objs, regex_groups)])
+
+    def test_bad_line_not_split(self):
+        r = turmeric.components.R.__new__(turmeric.components.R)
+        r.net_objs = [turmeric.components.tokens.Label, turmeric.components.tokens.Node, turmeric.components.tokens.Node, turmeric.components.tokens.Value]
+        turmeric.components.Parseable.Parseable.__init__(r, 'r 1 2 3')
+        self.assertFalse(hasattr(r, 'tokens'))
+
+    def test_values(self):
+        from turmeric.components.tokens import Value, KVParam
+        self.assertAlmostEqual(float(Value('4.7meg')), 4.7e6)
+        self.assertEqual(float(Value('inf')), float('inf'))
+        self.assertEqual(str(Value('10k')), '10.0k')
+        self.assertRaises(ValueError, Value, '1x')
+        kv = KVParam('a=b=c')
+        self.assertEqual((kv.key, kv.value), ('a=b', 'c'))
+
+    def test_allowed_params_pattern_reused(self):
+        from turmeric.components.Parseable import _patterns
+        saved = turmeric.settings.use_netlist_cache
+        turmeric.settings.use_netlist_cache = False
+        try:
+            np.parse_network('tests/data/netlists/VRD.net')
+            n = len(_patterns)
+            np.parse_network('tests/data/netlists/VRD.net')
+            self.assertEqual(len(_patterns), n)
+        finally:
+            turmeric.settings.use_netlist_cache = saved
+
+    def test_patterns_do_not_keep_parents(self):
+        import gc, weakref
+        from turmeric.components.Parseable import _patterns
+        op = np.parse_directive('.op')
+        parent = weakref.ref(op)
+        del op
+        gc.collect()
+        self.assertIsNone(parent())
+        self.assertFalse(any(isinstance(o, turmeric.components.tokens._Bound) for key in _patterns for o in key[2]))
+
+class NetlistCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (turmeric.settings.use_netlist_cache, turmeric.settings.netlist_cache_directory)
+        turmeric.settings.use_netlist_cache = True
+        turmeric.settings.netlist_cache_directory = str(Path(self.tmp.name) / 'cache')
+        self.netlist = Path(self.tmp.name) / 'top.net'
+        self.included = Path(self.tmp.name) / 'parts.net'
+        self.netlist.write_text('* cache test\nv1 1 0 type=vdc vdc=5\n.include parts.net\n.op\n')
+        self.included.write_text('* parts\nr1 1 2 1k\nr2 2 0 1k\n')
+
+    def tearDown(self):
+        turmeric.settings.use_netlist_cache, turmeric.settings.netlist_cache_directory = self.saved
+        self.tmp.cleanup()
+
+    def cache_entries(self):
+        return sorted(Path(turmeric.settings.netlist_cache_directory).glob('*.pickle'))
+
+    def test_cached_parse_is_reused(self):
+        circ, analyses = np.parse_network(str(self.netlist))
+        entries = self.cache_entries()
+        self.assertEqual(len(entries), 1)
+        cached, cached_analyses = np.parse_network(str(self.netlist))
+        self.assertEqual(self.cache_entries(), entries)
+        self.assertEqual(repr(cached), repr(circ))
+        self.assertEqual(cached.M0.tolist(), circ.M0.tolist())
+        self.assertEqual([repr(a) for a in cached_analyses], [repr(a) for a in analyses])
+
+    def test_included_file_changes_key(self):
+        key = turmeric.netlist_cache.netlist_key(str(self.netlist))
+        self.included.write_text('* parts\nr1 1 2 2k\nr2 2 0 1k\n')
+        self.assertNotEqual(turmeric.netlist_cache.netlist_key(str(self.netlist)), key)
+        circ = np.parse_network(str(self.netlist))[0]
+        self.assertEqual(circ[1].value, 2000.)
+
+    def test_key_hashed_in_chunks(self):
+        key = turmeric.netlist_cache.netlist_key(str(self.netlist))
+        with unittest.mock.patch.object(turmeric.netlist_cache, '_HASH_CHUNK', 7):
+            self.assertEqual(turmeric.netlist_cache.netlist_key(str(self.netlist)), key)
+
+    def test_default_directory(self):
+        out = Path(self.tmp.name) / 'out'
+        with unittest.mock.patch.multiple(turmeric.settings, netlist_cache_directory='', output_directory=str(out)):
+            np.parse_network(str(self.netlist))
+        self.assertEqual(len(list((out / '.turmeric_cache').glob('*.pickle'))), 1)
+
+    def test_bad_entry_is_reparsed(self):
+        key = turmeric.netlist_cache.netlist_key(str(self.netlist))
+        path = Path(turmeric.settings.netlist_cache_directory) / f'{key}.pickle'
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'not a pickle')
+        circ = np.parse_network(str(self.netlist))[0]
+        self.assertEqual(len(circ), 3)
+
+class StreamingReaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = turmeric.settings.use_netlist_cache
+        turmeric.settings.use_netlist_cache = False
+
+    def tearDown(self):
+        turmeric.settings.use_netlist_cache = self.saved
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = Path(self.tmp.name) / name
+        path.write_text(text)
+        return str(path)
+
+    def test_read_netlist_streams_includes(self):
+        self.write('parts.net', '* parts title\nR2 2 0 1k\n.end\nr3 2 0 1k\n')
+        top = self.write('top.net', '* Top\nv1 1 0 type=vdc vdc=5\n\n* comment\n.include parts.net\nR1 1 2 1k\n.op\n.end\nr4 1 0 1\n')
+        lines = np.read_netlist(top)
+        self.assertEqual(next(lines), 'v1 1 0 type=vdc vdc=5')
+        self.assertEqual(list(lines), ['r2 2 0 1k', 'r1 1 2 1k', '.op'])
+        self.assertEqual(np.read_title(top), ' top')
+
+    def test_model_after_diode(self):
+        before = self.write('before.net', '* diode\nv1 1 0 type=vdc vdc=5\n.model D d\nR1 2 1 5k\nD1 2 0 D\n.op\n')
+        after = self.write('after.net', '* diode\nv1 1 0 type=vdc vdc=5\nD1 2 0 D\nR1 2 1 5k\n.op\n.model D d\n')
+        circ = np.parse_network(after)[0]
+        self.assertIsInstance(circ[1], turmeric.components.D)
+        self.assertEqual(circ[1].n1, circ.nodes_dict['2'])
+        self.assertEqual(circ.nodes_dict['2'], 2)
+        self.assertEqual(sorted(map(str, circ.nodes_dict.items())), sorted(map(str, np.parse_network(before)[0].nodes_dict.items())))
+
+    def test_undefined_model(self):
+        netlist = self.write('missing.net', '* diode\nv1 1 0 type=vdc vdc=5\nD1 1 0 X\n')
+        self.assertRaises(ValueError, np.parse_network, netlist)
+
+class SubcircuitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = turmeric.settings.use_netlist_cache
+        turmeric.settings.use_netlist_cache = False
+        self.circ = np.parse_network('tests/data/netlists/SUBCKT.net')[0]
+        self.flat = np.parse_network('tests/data/netlists/SUBCKT_FLAT.net')[0]
+
+    def tearDown(self):
+        turmeric.settings.use_netlist_cache = self.saved
+
+    def by_node_name(self, circ, mat):
+        # reorder the node rows and columns of an MNA matrix by node name
+        names = sorted(k for k in circ.nodes_dict if isinstance(k, str))
+        order = [circ.nodes_dict[n] for n in names] + list(range(circ.nnodes, mat.shape[0]))
+        return mat[numpy.ix_(order, order)]
+
+    def test_matches_flat_netlist(self):
+        self.assertEqual(sorted(repr(e).split()[0] for e in self.circ), sorted(repr(e).split()[0] for e in self.flat))
+        for m in ['M0', 'D0']:
+            with self.subTest(matrix=m):
+                self.assertEqual(self.by_node_name(self.circ, getattr(self.circ, m)).tolist(),
+                                 self.by_node_name(self.flat, getattr(self.flat, m)).tolist())
+
+    def test_template_parsed_once(self):
+        divider = self.circ.subcircuits['divider']
+        self.assertEqual(divider.body, [])
+        template = divider.template(self.circ)
+        self.assertNotIn(template[0], self.circ)
+        self.assertEqual(len([e for e in self.circ if e.part_id.endswith('.r1')]), 2)
+
+    def test_bad_instances(self):
+        for netlist in ['* ports\nv1 1 0 type=vdc vdc=1\n.subckt s a b\nr1 a b 1k\n.ends\nx1 1 s\n',
+                        '* undefined\nv1 1 0 type=vdc vdc=1\nx1 1 0 s\n',
+                        '* no ends\nv1 1 0 type=vdc vdc=1\n.subckt s a b\nr1 a b 1k\n']:
+            with self.subTest(netlist=netlist):
+                self.assertRaises(ValueError, np.main_parser, turmeric.circuit.Circuit('bad'), netlist.splitlines()[1:])
@@ -0,0 +1,114 @@
+import unittest
+import tempfile
+import numpy
+
+from .context import turmeric
+
+from turmeric import parser, results, settings
+
+class ColumnStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.results_column_store)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.results_column_store = True
+        self.circ = parser.parse_network('tests/data/netlists/VRD.net')[0]
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.results_column_store = self.saved
+        self.tmp.cleanup()
+
+    def write_sweep(self, ts):
+        sol = results.Solution(self.circ, sol_type='TRAN', extra_header='t')
+        for t in ts:
+            sol.write_data([t] + [t * (k + 1) for k in range(len(sol.headers) - 1)])
+        sol.close()
+        return sol
+
+    def test_columns_match_csv(self):
+        sol = self.write_sweep(numpy.linspace(0, 1, 11))
+        cols = sol.columns()
+        self.assertIsInstance(cols['V(1)'], numpy.memmap)
+        settings.results_column_store = False
+        csv = results.Solution(filename='test.TRAN', sol_type='TRAN')
+        csv.colpath = csv.colpath.with_name('missing')
+        csvdata = csv.as_dict()[1]
+        for h in cols:
+            self.assertEqual(cols[h].tolist(), csvdata[h].tolist())
+
+    def test_listener(self):
+        events = []
+        listener = lambda event, sol, rows: events.append((event, sol.filepath.name, None if rows is None else rows.shape))
+        results.add_listener(listener)
+        try:
+            self.write_sweep(numpy.linspace(0, 1, 3))
+        finally:
+            results.remove_listener(listener)
+        self.write_sweep(numpy.linspace(0, 1, 3))
+        n = len(self.write_sweep([0]).headers)
+        self.assertEqual(events, [('open', 'test.TRAN', None)] + [('rows', 'test.TRAN', (1, n))] * 3 + [('close', 'test.TRAN', None)])
+
+    def test_window_slices_by_sweep_value(self):
+        ts = numpy.linspace(0, 1, 101)
+        cols = self.write_sweep(ts).columns()
+        w = cols.window(0.25, 0.5)
+        self.assertEqual(cols.index[w].tolist(), ts[(ts >= 0.25) & (ts <= 0.5)].tolist())
+        self.assertEqual(cols.select('t', stop=0.1).tolist(), ts[ts <= 0.1].tolist())
+
+    def test_empty_solution(self):
+        cols = self.write_sweep([]).columns()
+        self.assertEqual(len(cols['t']), 0)
+        self.assertEqual(cols.window(0, 1), slice(0, 0))
+
+    def test_store_disabled(self):
+        settings.results_column_store = False
+        self.assertIsNone(self.write_sweep([0., 1.]).columns())
+
+class SaveDirectiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.results_column_store)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        self.circ = parser.parse_network('tests/data/netlists/VRD.net')[0]
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.results_column_store = self.saved
+        self.tmp.cleanup()
+
+    def test_parse_save_directive(self):
+        self.assertEqual(parser.parse_save_directive('.save v(2) i(v1) * comment'), ['V(2)', 'I(V1)'])
+        self.assertEqual(parser.parse_save_directive('.save all'), [])
+        self.assertRaises(ValueError, parser.parse_save_directive, '.save')
+
+    def test_saved_columns_only(self):
+        self.circ.saves = ['I(V1)']
+        sol = results.Solution(self.circ, sol_type='DC', extra_header='V1')
+        self.assertEqual(sol.headers, ['V1', 'I(V1)'])
+        sol.write_data([1.0, 0.5, 0.25, -1e-3])
+        sol.close()
+        data = sol.as_dict()[1]
+        self.assertEqual({k : v.tolist() for k, v in data.items()}, {'V1' : [1.0], 'I(V1)' : [-1e-3]})
+
+    def test_saved_columns_written(self):
+        self.circ.saves = ['I(V1)', 'V(2)']
+        settings.results_column_store = True
+        sol = results.Solution(self.circ, sol_type='DC', extra_header='V1')
+        # full rows, of every signal, as the analyses write them
+        sol.write_data([1.0, 0.5, 0.25, -1e-3])
+        sol.write_block([[2.0, 1.0, 0.5, -2e-3], [3.0, 1.5, 0.75, -3e-3]])
+        sol.close()
+        expected = {'V1' : [1.0, 2.0, 3.0], 'V(2)' : [0.25, 0.5, 0.75], 'I(V1)' : [-1e-3, -2e-3, -3e-3]}
+        cols = sol.columns()
+        self.assertEqual({h : cols[h].tolist() for h in cols}, expected)
+        settings.results_column_store = False
+        csv = results.Solution(filename='test.DC', sol_type='DC')
+        csv.colpath = csv.colpath.with_name('missing')
+        self.assertEqual({k : v.tolist() for k, v in csv.as_dict()[1].items()}, expected)
+
+    def test_unknown_signal(self):
+        self.circ.saves = ['V(42)']
+        self.assertRaises(ValueError, results.Solution, self.circ, sol_type='DC', extra_header='V1')
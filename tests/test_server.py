@@ -0,0 +1,63 @@
+import io
+import json
+import tempfile
+import unittest
+import numpy
+
+from .context import turmeric
+
+from turmeric import server, settings
+
+DIVIDER = "* divider\nv1 1 0 type=vdc vdc=2\nr1 1 2 1k\nr2 2 0 3k\n.op\n"
+
+class ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix = self.saved
+        self.tmp.cleanup()
+
+    def serve(self, *requests):
+        out = io.BytesIO()
+        server.serve(io.BytesIO(b''.join(json.dumps(r).encode() + b'\n' for r in requests)), out)
+        out.seek(0)
+        return out
+
+    def test_json(self):
+        response, buffers = server.handle({'id' : 7, 'netlist' : DIVIDER})
+        self.assertEqual(buffers, [])
+        self.assertEqual(response['id'], 7)
+        self.assertEqual(response['status'], 'ok')
+        self.assertAlmostEqual(response['results']['OP']['V(2)'][0], 1.5)
+
+    def test_binary(self):
+        out = self.serve({'id' : 1, 'netlist' : DIVIDER, 'format' : 'binary'},
+                         {'id' : 2, 'path' : 'tests/data/netlists/STEP.net', 'format' : 'binary'})
+        for n in (1, 2):
+            response = json.loads(out.readline())
+            self.assertEqual(response['id'], n)
+            op = response['results']['OP']
+            data = numpy.frombuffer(out.read(response['nbytes']), dtype=op['dtype']).reshape(op['rows'], -1)
+            self.assertEqual(data.shape, (op['rows'], len(op['headers'])))
+        self.assertEqual(op['headers'][0], 'R2')
+        numpy.testing.assert_allclose(data[:, 0], [1e3, 2e3, 3e3])
+        self.assertEqual(out.read(), b'')
+
+    def test_overrides(self):
+        response = server.handle({'netlist' : DIVIDER, 'analyses' : ['.dc src=v1 start=0 stop=2 step=1'],
+                                  'settings' : {'outprefix' : 'other'}})[0]
+        self.assertEqual(list(response['results']), ['DC'])
+        self.assertAlmostEqual(response['results']['DC']['V(2)'][-1], 1.5)
+        self.assertEqual(settings.outprefix, 'test')
+
+    def test_errors(self):
+        out = self.serve({'id' : 1, 'path' : 'missing.net'}, {'id' : 2, 'netlist' : DIVIDER, 'settings' : {'nosuch' : 1}},
+                         {'id' : 3, 'netlist' : DIVIDER})
+        responses = [json.loads(line) for line in out]
+        self.assertEqual([(r['id'], r['status']) for r in responses], [(1, 'error'), (2, 'error'), (3, 'ok')])
+        self.assertIn('nosuch', responses[1]['message'])
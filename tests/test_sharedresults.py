@@ -0,0 +1,69 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy
+
+from .context import turmeric
+
+from turmeric import results, settings
+from turmeric.gui import sharedresults
+
+# What the console does with a descriptor, printing what it attached
+CONSOLE = """
+import pickle, sys
+from turmeric.gui import sharedresults
+res = sharedresults.attach(pickle.loads(sys.stdin.buffer.read()))
+tran = res['TRAN']
+print(tran['t'].sum(), tran['V(1)'][-1], tran['t'].flags.writeable, len(tran['empty']))
+print(res['AC'][0].dtype, res['AC'][0][1], res['AC'][1])
+print(type(res['cols']).__name__, res['cols']['b'].sum())
+"""
+
+class SharedResultsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (settings.output_directory, settings.outprefix, settings.results_column_store)
+        settings.output_directory = self.tmp.name
+        settings.outprefix = 'test'
+        settings.results_column_store = True
+
+    def tearDown(self):
+        settings.output_directory, settings.outprefix, settings.results_column_store = self.saved
+        self.tmp.cleanup()
+
+    def attach_in_console(self, descriptor):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        out = subprocess.run([sys.executable, '-c', CONSOLE], input=pickle.dumps(descriptor),
+                             capture_output=True, cwd=root, check=True)
+        self.assertEqual(out.stderr, b'')
+        return out.stdout.decode().splitlines()
+
+    def test_console_attaches(self):
+        sol = results.Solution(sol_type='DC', headers=['a', 'b'])
+        sol.write_block(numpy.array([[0., 1.], [1., 2.], [2., 3.]]))
+        sol.close()
+        t = numpy.linspace(0, 1, 100001)
+        value = {'TRAN' : {'t' : t, 'V(1)' : 2 * t, 'empty' : numpy.empty(0)},
+                 'AC' : (numpy.array([1, 2j]), 'Hz'),
+                 'cols' : sol.columns()}
+        with sharedresults.share(value) as handle:
+            self.assertEqual(len(handle.blocks), 4)
+            # the arrays themselves are not in the descriptor
+            self.assertLess(len(pickle.dumps(handle.descriptor)), 1000)
+            tran, ac, cols = self.attach_in_console(handle.descriptor)
+        self.assertEqual(tran, f"{t.sum()} 2.0 False 0")
+        self.assertEqual(ac, "complex128 2j Hz")
+        self.assertEqual(cols, "ResultColumns 6.0")
+        self.assertEqual(handle.blocks, [])
+
+    def test_release(self):
+        handle = sharedresults.share({'x' : numpy.arange(10)})
+        name = handle.descriptor[1][0][1][1]
+        handle.release()
+        with self.assertRaises(FileNotFoundError):
+            sharedresults.attach(handle.descriptor)
+        self.assertNotIn(name, sharedresults._attached)
@@ -0,0 +1,59 @@
+"""
+What starting turmeric imports, and how long it takes
+
+    python -m tests.test_startup
+
+prints the best of a few startup times of the CLI and of simple runs.
+"""
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def run(*args, **kwargs):
+    return subprocess.run([sys.executable] + list(args), cwd=ROOT, capture_output=True, text=True, check=True, **kwargs)
+
+def imported(*args):
+    """The modules imported by running python with args, from -X importtime"""
+    err = run('-X', 'importtime', *args).stderr
+    return {line.split('|')[-1].strip() for line in err.splitlines() if line.startswith('import time:')}
+
+def best_time(*args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_version_is_light(self):
+        modules = imported('-m', 'turmeric', '--version')
+        self.assertNotIn('numpy', modules)
+        self.assertNotIn('turmeric.parser', modules)
+
+    def test_import_is_light(self):
+        modules = imported('-c', 'import turmeric')
+        self.assertNotIn('numpy', modules)
+
+    def test_only_used_analyses_are_imported(self):
+        script = ("import sys; from turmeric import parser, settings; settings.use_netlist_cache = False; "
+                  "parser.parse_network('tests/data/netlists/STEP.net'); print(' '.join(sys.modules))")
+        modules = set(run('-c', script).stdout.split())
+        self.assertIn('turmeric.analyses.OP', modules)
+        for heavy in ('scipy', 'turmeric.analyses.AC', 'turmeric.analyses.DC', 'turmeric.analyses.TRAN',
+                      'turmeric.ODEsolvers', 'concurrent.futures.process'):
+            self.assertNotIn(heavy, modules)
+
+if __name__ == '__main__':
+    baseline = best_time('-c', 'pass')
+    print(f"{'python -c pass':<40} {baseline * 1e3:7.1f} ms")
+    for label, args in (('import numpy', ('-c', 'import numpy')),
+                        ('import turmeric', ('-c', 'import turmeric')),
+                        ('python -m turmeric --version', ('-m', 'turmeric', '--version')),
+                        ('import turmeric.turmeric', ('-c', 'import turmeric.turmeric'))):
+        print(f"{label:<40} {best_time(*args) * 1e3:7.1f} ms")
@@ -89,8 +89,11 @@
  REAL(8), intent(inout) :: B(N)
 !f2py intent(in, out) :: B
  
- INTEGER :: I, J, LL, II = 0
+ INTEGER :: I, J, LL, II
 
+! II must not be initialised in its declaration: that implies SAVE and
+! keeps the index of the first non-zero of B from one call to the next
+ II = 0
  DO I=1,N
    LL = INDX(I)
    SUM = B(LL)
@@ -1,4 +1,10 @@
-from turmeric.turmeric import main
 from turmeric.__version__ import __version__
 
 __all__ = ['main']
+
+def __getattr__(name):
+    # importing the simulator pulls in numpy, so wait until it is used
+    if name == 'main':
+        from turmeric.turmeric import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
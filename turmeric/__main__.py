@@ -1,14 +1,16 @@
+import glob
 import sys
 import logging
 from optparse import OptionParser
 from pathlib import Path
 
-from . import turmeric, settings
+from . import settings
+from .config import load_config
 from .__version__ import __version__
 
 def _cli():
-    usage = f"usage: \t%prog [settings] <filename>\n\n"\
-            f"filename - netlist of circuit to simulate.\n\n"\
+    usage = f"usage: \t%prog [settings] <filename> [<filename> ...]\n\n"\
+            f"filename - netlist of circuit to simulate, or a glob of netlists to run as a batch.\n\n"\
             f"Welcome to Turmeric, version {__version__}\n"
     parser = OptionParser(usage, version="%prog " + __version__)
 
@@ -16,10 +18,20 @@ def _cli():
             dest="verbose", default=False, help="Verbose output")
     parser.add_option("-o", "--outprefix", action="store", type="string",
                       dest="outprefix", default=settings.outprefix, help=f"Prefix to use for generated files. Defaults to `{settings.outprefix}'.")
+    parser.add_option("-j", "--jobs", action="store", type="int",
+                      dest="jobs", default=1, help="Number of netlists of a batch simulated in parallel. Defaults to 1.")
+    parser.add_option("--profile", action="store_true",
+                      dest="profile", default=False, help="Write the time spent in each phase of each analysis to <outprefix>.profile.json.")
+    parser.add_option("--server", action="store_true",
+                      dest="server", default=False, help="Serve JSON-lines simulation requests on stdin.")
+    parser.add_option("--socket", action="store", type="string",
+                      dest="socket", default=None, help="Serve JSON-lines simulation requests on this Unix socket.")
     (opt, remaning_args) = parser.parse_args()
+    # the simulator is only imported once the options are known to need it
+    from . import batch, log, server, turmeric
 
-    if not len(remaning_args) == 1:
-        print("Usage: python -m turmeric [settings] <filename>\npython -m turmeric -h for help")
+    if len(remaning_args) < 1 and not (opt.server or opt.socket):
+        print("Usage: python -m turmeric [settings] <filename> [<filename> ...]\npython -m turmeric -h for help")
         sys.exit(1)
 
     logger = logging.getLogger()
@@ -33,13 +45,42 @@ def _cli():
         sh.setLevel(logging.WARNING)
     sh.setFormatter(formatter)
 
+    if opt.server or opt.socket:
+        log.start(sh)
+        load_config()
+        log.apply_levels(settings.log_levels)
+        settings.outprefix = opt.outprefix
+        if opt.socket:
+            server.serve_socket(opt.socket)
+        else:
+            server.serve_stdio()
+        sys.exit(0)
+
+    if len(remaning_args) > 1 or opt.jobs > 1 or glob.has_magic(remaning_args[0]):
+        # each job of a batch adds the log file of its own output directory
+        log.start(sh)
+        res = batch.run_batch(remaning_args, jobs=opt.jobs, outprefix=opt.outprefix)
+        print(batch.summary(res))
+        sys.exit(0 if all(r.status == 'ok' for r in res) else 1)
+
     lfh = logging.FileHandler(f'{Path(settings.output_directory)/opt.outprefix}.log',mode='w',encoding='utf8')
     lfh.setLevel(logging.DEBUG)
     lfh.setFormatter(formatter)
-    logger.addHandler(lfh)
-    logger.addHandler(sh)
+    # records are written out on a background thread
+    log.start(lfh, sh)
 
-    turmeric.main(filename=remaning_args[0],outprefix=opt.outprefix)
+    # the progress bar, which the GUI also reads from the output
+    from . import progress
+    progress.add_listener(progress.console_bar)
+
+    if opt.profile:
+        from . import profiler
+        profiler.enable()
+    try:
+        turmeric.main(filename=remaning_args[0],outprefix=opt.outprefix)
+    except FileNotFoundError:
+        # already logged
+        sys.exit(1)
 
     sys.exit(0)
 
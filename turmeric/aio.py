@@ -0,0 +1,177 @@
+"""
+asyncio interface to the simulator
+
+    async for event in aio.simulate('netlist.net'):
+        if event.kind == 'rows':
+            plot(event.file, event.data)
+
+simulate() runs a netlist in a worker process, so that any number of
+simulations can run at once without blocking the event loop, each with a
+copy of the settings of this process, and yields events as the results are
+written:
+
+    open  - a solution file was created, data is its list of headers
+    rows  - a chunk of new rows of a solution, as a 2D array
+    close - a solution is complete
+    done  - the simulation finished, data maps each analysis to whether it
+            succeeded
+    error - the simulation raised or its process died, data is the message
+    progress - data is the progress.ProgressEvent of the running analysis
+
+Rows are sent in chunks of up to chunk_rows rows, or whatever was written
+during the last interval seconds. Cancelling the task iterating over
+simulate(), or closing the generator, stops the worker process.
+"""
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from turmeric import log
+from turmeric import parallel
+from turmeric import progress
+from turmeric import results
+from turmeric import settings
+
+logger = logging.getLogger(__name__)
+
+#: An event of a simulation. analysis and file are those of the solution
+#: concerned, None for done and error.
+Event = namedtuple('Event', 'kind analysis file data')
+
+class _Forwarder(object):
+    """Result listener putting the events of the solutions on a queue"""
+    def __init__(self, events, chunk_rows, interval):
+        self.events = events
+        self.chunk_rows = chunk_rows
+        self.interval = interval
+        self._pending = {}
+
+    def __call__(self, event, sol, rows):
+        name = sol.filepath.name
+        if event == 'open':
+            self._pending[name] = ([], 0, time.monotonic())
+            self.events.put(Event('open', sol.sol_type, name, list(sol.headers)))
+        elif event == 'rows':
+            chunks, n, last = self._pending[name]
+            chunks.append(rows)
+            n += len(rows)
+            if n >= self.chunk_rows or time.monotonic() - last >= self.interval:
+                self.flush(sol)
+            else:
+                self._pending[name] = (chunks, n, last)
+        elif event == 'close':
+            self.flush(sol)
+            del self._pending[name]
+            self.events.put(Event('close', sol.sol_type, name, None))
+
+    def flush(self, sol):
+        name = sol.filepath.name
+        chunks, n, last = self._pending[name]
+        if chunks:
+            self.events.put(Event('rows', sol.sol_type, name, np.concatenate(chunks)))
+        self._pending[name] = ([], 0, time.monotonic())
+
+def _simulate(events, filename, outprefix, output_directory, snapshot, chunk_rows, interval):
+    # imported here so that the parent process does not pay for the simulator
+    from turmeric import parser, turmeric
+    # the settings of the calling process, not those of config.json
+    parallel.apply_settings(snapshot)
+    log.apply_levels(settings.log_levels)
+    settings.outprefix = outprefix
+    if output_directory is not None:
+        settings.output_directory = output_directory
+    forwarder = _Forwarder(events, chunk_rows, interval)
+    results.add_listener(forwarder)
+    def forward_progress(e):
+        events.put(Event('progress', e.analysis, None, e))
+    progress.add_listener(forward_progress)
+    try:
+        circ, analyses = parser.parse_network(filename)
+        res = turmeric.run(circ, analyses)
+        events.put(Event('done', None, None, {an : r is not None for an, r in (res or {}).items()}))
+    except BaseException as e:
+        logger.exception(f"Simulating {filename} raised")
+        events.put(Event('error', None, None, f"{type(e).__name__}: {e}"))
+    finally:
+        results.remove_listener(forwarder)
+        progress.remove_listener(forward_progress)
+        events.close()
+        events.join_thread()
+
+def _get(events, timeout):
+    try:
+        return events.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+async def simulate(filename, outprefix=None, output_directory=None, chunk_rows=4096, interval=0.1):
+    """
+    Simulate the netlist filename in a worker process, yielding an Event
+    whenever the worker writes results.
+    """
+    ctx = multiprocessing.get_context()
+    events = ctx.Queue()
+    outprefix = settings.outprefix if outprefix is None else outprefix
+    proc = ctx.Process(target=_simulate, name=f"turmeric {filename}",
+                       args=(events, filename, outprefix, output_directory,
+                             parallel.settings_snapshot(), chunk_rows, interval))
+    proc.start()
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            event = await loop.run_in_executor(None, _get, events, interval)
+            if event is None:
+                if proc.is_alive():
+                    continue
+                # the last events may still have been in the pipe
+                event = _get(events, interval)
+                if event is None:
+                    yield Event('error', None, None, f"Simulation process exited with code {proc.exitcode}")
+                    return
+            yield event
+            if event.kind in ('done', 'error'):
+                return
+    finally:
+        if proc.is_alive():
+            logger.info(f"Stopping the simulation of {filename}")
+            proc.terminate()
+        proc.join()
+        events.close()
+
+async def run(filename, outprefix=None, output_directory=None):
+    """
+    Simulate filename without blocking the event loop.
+
+    **Returns:**
+    res : dict
+        The results of each analysis as columns, as returned by
+        turmeric.main, or None for a failed analysis. Those of a .mc are
+        the statistics over its samples.
+    """
+    outprefix = settings.outprefix if outprefix is None else outprefix
+    headers, chunks, res = {}, {}, {}
+    async for event in simulate(filename, outprefix, output_directory):
+        if event.kind == 'open':
+            headers[event.file] = event.data
+            chunks[event.file] = []
+        elif event.kind == 'rows':
+            chunks[event.file].append(event.data)
+        elif event.kind == 'error':
+            raise RuntimeError(f"Simulating {filename} failed: {event.data}")
+        elif event.kind == 'done':
+            for an, ok in event.data.items():
+                # .mc returns the statistics, which it writes apart from the samples
+                name = f"{outprefix}.{an}.stats"
+                if name not in headers:
+                    name = f"{outprefix}.{an}"
+                if not ok or name not in headers:
+                    res[an] = None
+                    continue
+                block = np.concatenate(chunks[name]) if chunks[name] else np.zeros((0, len(headers[name])))
+                res[an] = {h : block[:, i] for i, h in enumerate(headers[name])}
+    return res
@@ -1,11 +1,14 @@
 import numpy as np
 import logging
 
+from turmeric import progress
 from turmeric import results
 from turmeric import complex_solve
 from turmeric.analyses.Analysis import Analysis
 from turmeric.components.tokens import ParamDict, Value
 
+logger = logging.getLogger(__name__)
+
 SWEEP_LOG = "LOG"
 SWEEP_LIN = "LIN"
 
@@ -83,8 +86,8 @@ class AC(Analysis):
         else:
             raise ValueError(f"ac_analysis(): unknown sweep type {self.type}")
 
-        logging.info(f"Starting AC analysis")
-        logging.info(f"Start Freq. : {self.start} Hz\tStop Freq. : {self.stop} Hz\n \
+        logger.info(f"Starting AC analysis")
+        logger.info(f"Start Freq. : {self.start} Hz\tStop Freq. : {self.stop} Hz\n \
                      Using {self.nsteps} points on a {self.type.lower()} axis")    
         
         # get and reduce MNA equations
@@ -99,13 +102,16 @@ class AC(Analysis):
         sol = results.Solution(circ, sol_type='AC', extra_header='f')
         
         # solve for all specified frequencies
-        for f in fs:
+        reporter = progress.start('AC', len(fs), 'Hz')
+        for k, f in enumerate(fs):
             IMP = f * np.pi * 2 * j * D
             x = complex_solve.solver((M + IMP), -ZAC)
             data = [f]
             data.extend(x.transpose().tolist()[0])
             sol.write_data(data)
+            reporter.update(k + 1, f)
        
         sol.close()
+        reporter.finish(fs[-1] if len(fs) else None)
         
         return sol.as_dict(v_type=complex)
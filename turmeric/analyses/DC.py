@@ -5,10 +5,16 @@ import numpy as np
 from turmeric import components
 from turmeric import settings
 from turmeric import results
-from turmeric.analyses.OP import op_analysis
+from turmeric import batch_solve
+from turmeric import profiler
+from turmeric import progress
+from turmeric.trace import newton_trace
+from turmeric.analyses.OP import op_solve, has_converged, ludcmp, lubksb
 from turmeric.analyses.Analysis import Analysis
 from turmeric.components.tokens import ParamDict, Value
 
+logger = logging.getLogger(__name__)
+
 class DC(Analysis):
     def __init__(self, line):
         self.net_objs = [ParamDict.allowed_params(self, {
@@ -16,6 +22,11 @@ class DC(Analysis):
             'start' : { 'type' : lambda v: float(Value(v)) , 'default': None },
             'stop'  : { 'type' : lambda v: float(Value(v)) , 'default': None },
             'step'  : { 'type' : lambda v: float(Value(v)) , 'default': None },
+            # optional outer sweep of a second source
+            'src2'  : { 'type' : str                       , 'default': ''   },
+            'start2': { 'type' : lambda v: float(Value(v)) , 'default': '0'  },
+            'stop2' : { 'type' : lambda v: float(Value(v)) , 'default': '0'  },
+            'step2' : { 'type' : lambda v: float(Value(v)) , 'default': '1'  },
             'x0'    : { 'type' : lambda v: [float(val) for val in list(v)], 'default' : [] }
             })]
         super().__init__(line)
@@ -24,89 +35,356 @@ class DC(Analysis):
 
     def __repr__(self):
         """
-        .DC src=<src_part_id> start=<Value> stop=<Value> step=<Value> [x0=\[<Value>...\]]
+        .DC src=<src_part_id> start=<Value> stop=<Value> step=<Value> [src2=<src_part_id> start2=<Value> stop2=<Value> step2=<Value>] [x0=\[<Value>...\]]
         """
         r = f".DC src={self.src} start={self.start} stop={self.stop} step={self.step}"
+        r += f" src2={self.src2} start2={self.start2} stop2={self.stop2} step2={self.step2}" if self.src2 else ''
         r += ' x0=['+''.join(str(v) for v in self.x0) + ']' if self.x0 is not None else ''
         return r
 
 
     def run(self, circ, sweep_type='LINEAR', guess=True, x0=None, outfile="stdout"):
+        """
+        Sweep the source by continuation: each point is predicted from the
+        previous one along the tangent dx/dsrc and corrected by a few Newton
+        iterations. The step is halved where the correction struggles, e.g.
+        around sharp transitions, and grows back once it converges quickly.
+        Only if the step becomes too small is the point solved from scratch,
+        with Gmin and source stepping.
+
+        A linear circuit has the same matrix at every point, so it is factored
+        once and the whole sweep is solved by substitution.
+
+        With src2, the sweep of src is repeated at every value of src2. The
+        sweeps at all values of src2 advance together as one batch, see
+        batch_solve, when the nonlinear elements support it.
+        """
         
-        logging.info("Starting DC sweep...")
+        logger.info("Starting DC sweep...")
         source_label = self.src.upper()
-        
-        points = int((self.stop - self.start) / self.step)
         sweep_type = sweep_type.upper()[:3]
         
-        if sweep_type == 'LOG' and self.stop - self.start < 0:
-            logging.error("dc_analysis(): DC analysis has log sweeping and negative stepping.")
+        dcs = self._sweep_values(self.start, self.stop, self.step, sweep_type)
+        src = self._find_source(circ, source_label)
+        srcs = [src]
+        labels = [source_label]
+        if self.src2:
+            dcs2 = self._sweep_values(self.start2, self.stop2, self.step2, sweep_type)
+            srcs.append(self._find_source(circ, self.src2.upper()))
+            labels.append(self.src2.upper())
+        
+        M = circ.M0[1:, 1:]
+        Z0, dZs = self._source_rhs(circ, *srcs)
+        x = self._format_estimate(x0 if x0 is not None else self.x0, M.shape[0])
+        logger.info("dc_analysis(): DC analysis starting...")
+        sol = results.Solution(circ, None, 'DC', extra_header=labels)
+        unit = 'V' if source_label[0] == 'V' else 'A'
+        self._reporter = progress.start('DC', len(dcs) * (len(dcs2) if self.src2 else 1), unit)
+        try:
+            if not self.src2:
+                solved = not circ.is_nonlinear and self._linear_sweep(M, Z0, dZs[0], dcs, sol)
+                if not solved:
+                    for k, (v, x) in enumerate(self._continuation(circ, M, Z0, dZs[0], dcs, x)):
+                        sol.write_data([v] + x[:, 0].tolist())
+                        self._reporter.update(k + 1, v)
+                        solved = True
+            elif not circ.is_nonlinear:
+                solved = self._linear_sweep2(circ, M, Z0, dZs, dcs, dcs2, sol)
+            elif batch_solve.batchable(circ):
+                solved = self._batch_sweep2(circ, M, Z0, dZs, dcs, dcs2, x, sol)
+            else:
+                solved = False
+                for k2, v2 in enumerate(dcs2):
+                    for v, x in self._continuation(circ, M, Z0 + v2 * dZs[1], dZs[0], dcs, x):
+                        sol.write_data([v, v2] + x[:, 0].tolist())
+                        solved = True
+                    self._reporter.update((k2 + 1) * len(dcs), v2)
+        finally:
+            sol.close()
+        self._reporter.finish(failed=not solved)
+        
+        logger.info("dc_analysis(): Finished DC analysis")
+        if not solved:
+            logger.error("dc_analysis(): Couldn't solve for values in DC sweep")
+            return None
+        
+        return sol.as_dict()
+
+    def _sweep_values(self, start, stop, step, sweep_type):
+        """The values of a sweep, start and stop included"""
+        if sweep_type == 'LOG' and (start <= 0 or stop <= 0):
+            logger.error("dc_analysis(): DC analysis has log sweeping and non-positive values.")
             raise ValueError
-        if (self.stop - self.start) * self.step < 0:
-            logging.error("Unbounded stepping in DC analysis.")
+        if step == 0 or (stop - start) * step < 0:
+            logger.error("Unbounded stepping in DC analysis.")
             raise ValueError
         
+        points = int(round((stop - start) / step)) + 1
         if sweep_type == 'LOG':
-            dcs = np.logspace(int(self.start), np.log(int(self.stop)), num=int(points), endpoint=True)
-        elif sweep_type == 'LIN' or sweep_type is None:
-            dcs = np.linspace(int(self.start), int(self.stop), num=int(points), endpoint=True)
+            return np.geomspace(start, stop, num=points)
+        return np.linspace(start, stop, num=points)
 
-        if source_label[0] != ('V' or 'I'):
-            logging.error("Sweeping is possible only with voltage and current sources.")
+    def _find_source(self, circ, source_label):
+        """The independent source called source_label, e.g. V1"""
+        if source_label[0] not in ('V', 'I'):
+            logger.error("Sweeping is possible only with voltage and current sources.")
             raise ValueError(f"Source is type: {source_label[0]}")
           
-        self.src = None
-        for elem in [src for src in circ if isinstance(src, (components.sources.V, components.sources.I))]:
-            identifier = f"{elem.name.upper()}{elem.part_id}"
-            if identifier == source_label:
-                self.src = elem
-                logging.debug("dc_analysis(): Source found!")
-                break
-            logging.error("dc_analysis(): Specified source was not found")
-            raise ValueError("dc_analysis(): source {self.src} was not found")
-        
-        # store this value to reassign later
-        val_ = self.src.dc_value
-         
-        M_size = circ.M0.shape[0] - 1
-        x = self._format_estimate(x0, M_size)
-        logging.info("dc_analysis(): DC analysis starting...")
-        sol = results.Solution(circ, None, 'DC', extra_header=source_label)
-        # sweep setup
-        solved = False
-        for i, sweep_value in enumerate(dcs):
-            self.src.dc_value = sweep_value
-            # regenerate the matrices with new sweep value
-            _ = circ.gen_matrices()
-            # now call an operating point analysis
-            x = op_analysis(circ, x0=x)[1]
-            if x is None:
-                logging.warning("dc_analysis(): Coudn't compute \
-                                operating point for {sweep_value}. \
-                                    Skipping...")
-                # skip
-                continue
-            x = np.array([float(value[0]) for value in x.values()])
-            
-            
-            row = [sweep_value]
-            row.extend(x)
-            sol.write_data(row)
-            x=x[np.newaxis].T
-            # only flag as solved if loop doesn't skip any values
-            solved = True
-        
-        logging.info("dc_analysis(): Finished DC analysis")
-        if not solved:
-            logging.error("dc_analysis(): Couldn't solve for values in DC sweep")
-            sol.close()
+        for elem in [s for s in circ if isinstance(s, (components.sources.V, components.sources.I))]:
+            if f"{elem.name.upper()}{elem.part_id.upper()}" == source_label:
+                logger.debug("dc_analysis(): Source found!")
+                return elem
+        logger.error("dc_analysis(): Specified source was not found")
+        raise ValueError(f"dc_analysis(): source {source_label} was not found")
+
+    def _source_rhs(self, circ, *srcs):
+        """
+        The unreduced DC source vector of circ split as Z0 + sum(v*dZ), where
+        v are the values of the swept sources srcs. Returns Z0 and the list of
+        dZ. The circuit is left as it was.
+        """
+        vals_ = [src.dc_value for src in srcs]
+        try:
+            for src in srcs:
+                src.dc_value = 0.
+            circ.gen_matrices()
+            Z0 = circ.ZDC0
+            dZs = []
+            for src in srcs:
+                src.dc_value = 1.
+                circ.gen_matrices()
+                dZs.append(circ.ZDC0 - Z0)
+                src.dc_value = 0.
+        finally:
+            for src, val_ in zip(srcs, vals_):
+                src.dc_value = val_
+            circ.gen_matrices()
+        return Z0, dZs
+
+    def _linear_sweep(self, M, Z0, dZ, dcs, sol):
+        """
+        Write the solutions of the linear system M x + Z0 + v*dZ = 0 at every
+        sweep value v in dcs to sol. By linearity they are x0 + v*dx, with x0
+        and dx substituted through a single factorisation of M. Returns False,
+        having written nothing, if M is singular.
+        """
+        xs = self._linear_solutions(M, Z0, [dZ], [dcs])
+        if xs is None:
+            return False
+        sol.write_block(np.column_stack([dcs, xs]))
+        return True
+
+    def _linear_sweep2(self, circ, M, Z0, dZs, dcs, dcs2, sol):
+        """
+        As _linear_sweep, over the grid of values of two sources. Falls back
+        to continuation one sweep of the inner source at a time if M is
+        singular.
+        """
+        v, v2 = [g.ravel() for g in np.meshgrid(dcs, dcs2)]
+        xs = self._linear_solutions(M, Z0, dZs, [v, v2])
+        if xs is None:
+            solved = False
+            x = np.zeros((M.shape[0], 1))
+            for v2 in dcs2:
+                for v, x in self._continuation(circ, M, Z0 + v2 * dZs[1], dZs[0], dcs, x):
+                    sol.write_data([v, v2] + x[:, 0].tolist())
+                    solved = True
+            return solved
+        sol.write_block(np.column_stack([v, v2, xs]))
+        return True
+
+    def _linear_solutions(self, M, Z0, dZs, values):
+        """
+        Solutions of M x + Z0 + sum(v*dZ) = 0 for the arrays of source values,
+        one array per dZ, or None if M is singular.
+        """
+        LU, INDX, _, C = ludcmp(np.array(M), M.shape[0])
+        if C == 1:
+            logger.info("dc_analysis(): singular linear circuit, solving point by point")
             return None
-        
-        sol.close()
-        # ensure that DC source retains initial value
-        self.src.dc_value = val_
-        
-        return sol.as_dict()
+        xs = lubksb(LU, INDX, -Z0[1:, 0])
+        for dZ, v in zip(dZs, values):
+            xs = xs + np.multiply.outer(v, lubksb(LU, INDX, -dZ[1:, 0]))
+        if not np.all(np.isfinite(xs)):
+            return None
+        logger.info(f"dc_analysis(): solved {len(values[0])} points of a linear circuit with one factorisation")
+        return xs
+
+    def _continuation(self, circ, M, Z0, dZ, dcs, x):
+        """
+        Yield (v, x) for every sweep value v in dcs that could be solved.
+        """
+        Z = lambda v: (Z0 + v * dZ)[1:]
+        maxit = settings.dc_corrector_max_iterations
+        iters = 0
+        t = None
+        h = 0.
+        for i, target in enumerate(dcs):
+            gap = target - dcs[i - 1] if i else 0.
+            v = target - gap
+            if h == 0. or abs(h) > abs(gap):
+                h = gap
+            while t is not None and v != target:
+                h_try = target - v if abs(target - v) <= abs(h) else h
+                x_new, converged, n_iter, lu = self._newton(circ, M, Z(v + h_try), x + h_try * t, maxit)
+                iters += n_iter
+                if converged:
+                    v = target if h_try == target - v else v + h_try
+                    x = x_new
+                    t = self._tangent(lu, dZ)
+                    if n_iter <= maxit // 3:
+                        h = 2 * h if abs(2 * h) <= abs(gap) else gap
+                else:
+                    h = h_try / 2
+                    profiler.count('rejected_steps')
+                    logger.debug("dc_analysis(): halving the sweep step to %g at %g", h, v)
+                    if abs(h) < settings.dc_min_step_fraction * abs(gap):
+                        break
+            if t is None or v != target:
+                # no previous point, or continuation stalled
+                x, t, n_iter = self._homotopy(circ, Z0, dZ, target, x, maxit)
+                iters += n_iter
+                h = 0.
+            if t is None:
+                logger.warning(f"dc_analysis(): Couldn't compute operating point for {target}.")
+                if not settings.dc_sweep_skip_allowed:
+                    break
+                logger.warning("dc_analysis(): Skipping...")
+                continue
+            yield target, x
+        logger.info(f"dc_analysis(): {iters} Newton iterations over {len(dcs)} points")
+
+    def _batch_sweep2(self, circ, M, Z0, dZs, dcs, dcs2, x, sol):
+        """
+        Write the solutions over the grid of values of two sources to sol.
+        The starts of the inner sweeps are found by continuation along the
+        outer source. The inner sweeps then advance together, each step
+        solved for all of them at once by batch_solve.batch_newton.
+        Returns whether any point was solved.
+        """
+        maxit = settings.dc_corrector_max_iterations
+        dZ, dZ2 = dZs
+        d1 = dZ[1:, 0]
+        Z = lambda v, k: (Z0[1:, 0] + v * d1) + np.multiply.outer(dcs2[k], dZ2[1:, 0])
+        X = np.full((len(dcs), len(dcs2), M.shape[0]), np.nan)
+        # starting points at the first value of the inner source
+        x2 = np.full((len(dcs2), M.shape[0]), np.nan)
+        index2 = {v2 : k for k, v2 in enumerate(dcs2)}
+        for v2, x in self._continuation(circ, M, Z0 + dcs[0] * dZ, dZ2, dcs2, x):
+            x2[index2[v2]] = x[:, 0]
+        alive = np.all(np.isfinite(x2), axis=1)
+        x2[alive], converged, iters, t2 = batch_solve.batch_newton(circ, M, Z(dcs[0], alive), x2[alive], maxit, dZ=d1)
+        t = np.zeros(x2.shape)
+        t[alive] = t2
+        # inner sweeps whose start did not converge are left out, or solved
+        # from scratch at the next outer value if skipping is allowed
+        failed = np.zeros(len(dcs2), dtype=bool)
+        failed[alive] = ~converged
+        x2[failed] = np.nan
+        alive[alive] = converged
+        X[0] = x2
+        h = 0.
+        for i in range(1, len(dcs)):
+            target = dcs[i]
+            gap = target - dcs[i - 1]
+            v = dcs[i - 1]
+            if h == 0. or abs(h) > abs(gap):
+                h = gap
+            while alive.any() and v != target:
+                h_try = target - v if abs(target - v) <= abs(h) else h
+                x_new, converged, n_iter, t_new = batch_solve.batch_newton(
+                    circ, M, Z(v + h_try, alive), x2[alive] + h_try * t[alive], maxit, dZ=d1)
+                iters += n_iter
+                if converged.all():
+                    v = target if h_try == target - v else v + h_try
+                    x2[alive] = x_new
+                    t[alive] = t_new
+                    if n_iter <= maxit // 3:
+                        h = 2 * h if abs(2 * h) <= abs(gap) else gap
+                else:
+                    h = h_try / 2
+                    profiler.count('rejected_steps')
+                    logger.debug("dc_analysis(): halving the sweep step to %g at %g", h, v)
+                    if abs(h) < settings.dc_min_step_fraction * abs(gap):
+                        break
+            # solve the stalled sweeps, and those that failed before, from scratch
+            redo = alive.copy() if v != target else np.zeros(len(dcs2), dtype=bool)
+            if settings.dc_sweep_skip_allowed:
+                redo |= ~alive
+            if redo.any():
+                for k in np.flatnonzero(redo):
+                    x0 = x2[k][:, np.newaxis] if alive[k] else np.zeros((M.shape[0], 1))
+                    x, tk, n_iter = self._homotopy(circ, Z0 + dcs2[k] * dZ2, dZ, target, x0, maxit)
+                    iters += n_iter
+                    alive[k] = tk is not None
+                    if alive[k]:
+                        x2[k], t[k] = x[:, 0], tk[:, 0]
+                    else:
+                        logger.warning(f"dc_analysis(): Couldn't compute operating point for {target}, {dcs2[k]}. Skipping...")
+                h = 0.
+            X[i, alive] = x2[alive]
+            self._reporter.update((i + 1) * len(dcs2), target)
+        logger.info(f"dc_analysis(): {iters} batched Newton iterations over {len(dcs)} x {len(dcs2)} points")
+        solved = False
+        for k, v2 in enumerate(dcs2):
+            ok = np.all(np.isfinite(X[:, k]), axis=1)
+            if ok.any():
+                sol.write_block(np.column_stack([dcs[ok], np.full(ok.sum(), v2), X[ok, k]]))
+                solved = True
+        return solved
+
+    def _homotopy(self, circ, Z0, dZ, v, x, maxit):
+        """
+        Solve for the source value v from scratch, with Gmin and source
+        stepping. Returns (x, tangent, iterations), the tangent being None if
+        no solution was found.
+        """
+        logger.debug("dc_analysis(): solving %s=%g with homotopy", self.src, v)
+        ZDC0 = circ.ZDC0
+        circ.ZDC0 = Z0 + v * dZ
+        try:
+            x_op = op_solve(circ, x0=x)
+        finally:
+            circ.ZDC0 = ZDC0
+        if x_op is None:
+            return x, None, 0
+        # one more Newton iteration factors the Jacobian for the tangent
+        x_op, converged, n_iter, lu = self._newton(circ, circ.M0[1:, 1:], (Z0 + v * dZ)[1:], x_op, maxit)
+        return x_op, self._tangent(lu, dZ) if converged else None, n_iter
+
+    def _newton(self, circ, M, Z, x, maxit):
+        """
+        Undamped Newton iterations on M x + Z + N(x) = 0 from x. Returns
+        (x, converged, iterations, LU factors of the last Jacobian).
+        """
+        M_size = M.shape[0]
+        nl = circ.is_nonlinear
+        J = np.zeros((M_size, M_size))
+        N = np.zeros((M_size, 1))
+        for iters in range(1, maxit + 1):
+            profiler.count('newton_iterations')
+            if nl:
+                J[:, :] = 0.0
+                N[:, 0] = 0.0
+                J, N = circ.generate_J_and_N(J, N, x, None)
+            error = M.dot(x) + Z + nl*N
+            LU, INDX, _, C = ludcmp(M + nl*J, M_size)
+            if C == 1:
+                newton_trace.record(iters, error, None, 1., 'dc_continuation')
+                return x, False, iters, None
+            dx = lubksb(LU, INDX, -error[:, 0])[:, np.newaxis]
+            newton_trace.record(iters, error, dx, 1., 'dc_continuation')
+            if not np.all(np.isfinite(dx)):
+                return x, False, iters, None
+            x = x + dx
+            if not nl or has_converged(x, dx, error, circ.nnodes):
+                return x, True, iters, (LU, INDX)
+        return x, False, maxit, None
+
+    def _tangent(self, lu, dZ):
+        """dx/dv from (M + J) dx/dv = -dZ, using the factors lu of M + J"""
+        LU, INDX = lu
+        return lubksb(LU, INDX, -dZ[1:, 0])[:, np.newaxis]
 
     def _format_estimate(self, x0, dim):
         """
@@ -125,17 +403,19 @@ class DC(Analysis):
         """
         
         if x0 is None:
-            logging.info("No initial solution provided... Not ideal")
+            logger.info("No initial solution provided... Not ideal")
             x0 = np.zeros((dim, 1))
+        elif isinstance(x0, list):
+            x0 = np.array(x0, dtype=float)[np.newaxis].T
         else:
-            logging.info("Using provided x0")
+            logger.info("Using provided x0")
             if isinstance(x0, dict):
-                logging.info("Operating point solution provided as simulation result")
+                logger.info("Operating point solution provided as simulation result")
                 x0 = [value for value in x0.values()]
                 x0 = np.array(x0)
                 
                 
-        logging.debug("Initial estimate is...")
-        logging.debug(x0)
+        logger.debug("Initial estimate is...")
+        logger.debug(x0)
         
         return x0
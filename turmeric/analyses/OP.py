@@ -1,17 +1,25 @@
 import logging
 
-from turmeric.FORTRAN.LU import ludcmp, lubksb
+from turmeric.FORTRAN import LU
 from turmeric.FORTRAN.DC_SUBRS import gmin_mat
 
 from numpy.linalg import norm
 import numpy as np    
 
+from turmeric import profiler
+from turmeric import progress
 from turmeric import settings
 from turmeric import solvers as slv
+from turmeric.trace import newton_trace
 from turmeric import results
 from turmeric.components.tokens import ParamDict
 from turmeric.analyses.Analysis import Analysis
 
+logger = logging.getLogger(__name__)
+
+ludcmp = profiler.timed('lu_factor', LU.ludcmp)
+lubksb = profiler.timed('lu_solve', LU.lubksb)
+
 class OP(Analysis):
     """
     ~~~~~~~~~~~~~~~~~~
@@ -51,9 +59,9 @@ def op_analysis(circ, x0=None):
     The analysis sets up the MNA matrices using a circuit object and constructs
     the Gmin matrix used in the dc solver
     
-    A circuit solution is attempted twice:
-        - Once with a Gmin matrix and
-        - a second time without (to enhance results)
+    A solution is first attempted with plain Newton. Only if that fails is
+    the circuit solved with a Gmin matrix, by homotopy if need be, and then
+    again without it, starting from the Gmin solution.
         
     If the analysis cannot find a solution without Gmin, the Gmin solution is
     returned with a warning. In this case, a solution is heavily dependent on
@@ -66,46 +74,73 @@ def op_analysis(circ, x0=None):
     
     """
     
-    logging.debug("op_analysis(): getting and reducing M0 and ZDC0 from circuit")
+    reporter = progress.start('OP', 1)
+    x = op_solve(circ, x0)
+    reporter.finish(failed=x is None)
+    if x is None:
+        logger.critical(f"op_analysis(): No operating point found")
+        return None
+
+    # the full OP is kept regardless of .save: it seeds the DC sweep estimates
+    op = results.Solution(circ, sol_type='OP', apply_saves=False)
+    op.write_data(x.transpose().tolist()[0])
+    op.close()
+
+    return op.as_dict()
+
+def op_solve(circ, x0=None):
+    """
+    Solve for the operating point of circ: with plain Newton, or failing
+    that with a Gmin matrix and then without it, starting from the Gmin
+    solution.
+
+    Returns the solution vector of the reduced MNA system, or None if no
+    solution was found. Nothing is written to the results.
+    """
+    logger.debug("op_analysis(): getting and reducing M0 and ZDC0 from circuit")
     
     M = circ.M0[1:, 1:]
     ZDC = circ.ZDC0[1:]
     
-    logging.info("op_analysis(): Beginning operating point analysis")
+    logger.debug("op_analysis(): Beginning operating point analysis")
+    # a first, short attempt, expected to fail on hard circuits and on those
+    # with nodes which are only connected through capacitors
+    (x, e, converged, iters) = dc_solve(M, ZDC, circ, Gmin=None, x0=x0,
+                                        MAXIT=settings.op_newton_max_iterations, quiet=True)
+    if converged:
+        return x
 
-    logging.debug("op_analysis(): constructing Gmin matrix")
+    logger.debug("op_analysis(): constructing Gmin matrix")
     # take away a single node because we have reduced M
     Gmin_matrix = gmin_mat(settings.gmin, M.shape[0], circ.nnodes-1)
     
-    logging.info("op_analysis(): solving with Gmin")
-    # now solve
+    logger.debug("op_analysis(): solving with Gmin")
+    # Gmin makes a singular M solvable, but plain Newton which did not
+    # converge would not with Gmin either: go straight to the homotopies
+    solvers = slv.setup_solvers(Gmin=True, standard=e is None)
     (x_min, e_min, converged, iters_min) = dc_solve(M, ZDC,
-                                              circ, Gmin=Gmin_matrix, x0=x0)
+                                              circ, Gmin=Gmin_matrix, x0=x0, solvers=solvers, quiet=True)
     
-    op = results.Solution(circ, sol_type='OP')
     # convergence specifies a solution, but using Gmin
-    if converged:
-        logging.info("op_analysis(): now attempting without Gmin:")
-        (x, e, solved, iters) = dc_solve(
-            M, ZDC, circ, Gmin=None, x0=x_min)
-        
-        if not solved:
-            logging.error("Can't solve without Gmin.")
-            logging.warning("Solution is highly dependent on Gmin")
-            logging.info("Displaying valid results. Couldn't solve \
-                         circuit without Gmin")    
-        
-        op.write_data(x.transpose().tolist()[0])
-        op.close()
-        
-        return op.as_dict()
-        
-    logging.critical(f"op_analysis(): No operating point found")
-    
-    return None
+    if not converged:
+        newton_trace.dump(circ, "op_solve() failed")
+        return None
+
+    logger.debug("op_analysis(): now attempting without Gmin:")
+    (x, e, solved, iters) = dc_solve(
+        M, ZDC, circ, Gmin=None, x0=x_min, quiet=True)
+    
+    if not solved:
+        logger.error("Can't solve without Gmin.")
+        logger.warning("Solution is highly dependent on Gmin")
+        logger.info("Displaying valid results. Couldn't solve \
+                     circuit without Gmin")
+        return x_min
+
+    return x
 
 def dc_solve(M, Z, circ, Gmin=None, x0=None, time=None,
-             MAXIT=1000, locked_nodes=None):
+             MAXIT=1000, locked_nodes=None, solvers=None, quiet=False):
     
     """
     M   : the conductance matrix
@@ -114,6 +149,9 @@ def dc_solve(M, Z, circ, Gmin=None, x0=None, time=None,
             Gmin of None disables Gmin and source stepping
     MAXIT : Maximum number iterations for the newton method
     locked_nodes : a list of nodes connected to non-linear (diode) elements
+    solvers : the solvers to try, by default those of setup_solvers
+    quiet : log singular matrices at DEBUG and do not dump the Newton trace
+            on failure, for attempts which the caller expects may fail
     
     
     This method operates on the MNA matrices using the implemented
@@ -126,10 +164,14 @@ def dc_solve(M, Z, circ, Gmin=None, x0=None, time=None,
     M and ZDC are operated on by the solver objects, before being
     passed to Raphson solve. 
     
-        We currently have three solvers:
+        We currently have four solvers:
         
         - standard solving - Gmin stepping - source stepping
+        - pseudo-transient continuation
         
+    Each solver starts from x0, and each step of the steppers from the
+    solution of their last step. The error returned is None if the last
+    solve found M singular.
     """    
     
     M_size = M.shape[0]
@@ -138,72 +180,70 @@ def dc_solve(M, Z, circ, Gmin=None, x0=None, time=None,
     if locked_nodes is None:
         locked_nodes = circ.get_locked_nodes()
     
+    if solvers is None:
+        # without a Gmin, no source stepping and gmin
+        solvers = slv.setup_solvers(Gmin=Gmin is not None)
     if Gmin is None:
         Gmin = 0
-        # without source stepping and gmin
-        solvers = slv.setup_solvers(Gmin=False)
-    else:
-        solvers = slv.setup_solvers(Gmin=True)
 
     # if there is no initial guess, we start with 0
     if x0 is not None:
+        if isinstance(x0, dict):
+            x0 = list(x0.values())
+        x0 = np.array(x0, dtype=float).reshape(-1, 1)
         if len(x0) != M_size:
-            logging.warning("Bad initial estimate")
-            x0 = np.zeros((M_size, 1)) 
-        if isinstance(x0, np.ndarray):
-            x =x0
-        elif isinstance(x0, dict):
-            x0 = [value for value in x0.values()]
-            x0 = np.array(x0)[np.newaxis].T
-    else:
-        x = np.zeros((M_size, 1))
+            logger.warning("Bad initial estimate")
+            x0 = None
+    if x0 is None:
+        x0 = np.zeros((M_size, 1))
 
-    logging.info("Solving...")
+    logger.debug("Solving...")
     iters = 0
     
     converged = False
+    x, error = x0, None
     
-    for solver in solvers:
+    for k, solver in enumerate(solvers):
+        if converged:
+            break
+        if k:
+            profiler.count('solver_switches')
+        profiler.count(f'solver:{solver.name}')
+        maxit = MAXIT if solver.max_iterations is None else min(MAXIT, solver.max_iterations)
+        x_solved = x0
         while (solver.failed is not True) and (not converged):
-            logging.info(f"Now solving with: {solver.name}")
+            logger.debug("Now solving with: %s", solver.name)
             # 1. Operate on the matrices
             M_, Z_ = solver.operate_on_M_and_ZDC(np.array(M),\
-                                    np.array(Z), np.array(Gmin))
-            # 2. Try to solve with the current solver
+                                    np.array(Z), np.array(Gmin), x_solved)
+            # 2. Try to solve with the current solver, from its last solution
             try:
-                (x, error, converged, n_iter)\
-                    = MNA_solve(x, M_, circ, Z=Z_, NNODES=NNODES, 
+                (x, error, solved, n_iter)\
+                    = MNA_solve(x_solved, M_, circ, Z=Z_, NNODES=NNODES, 
                                     locked_nodes=locked_nodes,
-                                    time=time, MAXIT=MAXIT)
+                                    time=time, MAXIT=maxit, solver=solver.name)
                 # increment iteration
                 iters += n_iter
             except SingularityError:
-                logging.warning("Singular matrix")
-                converged, error, x = False, None, None
-                solver.fail()
+                logger.log(logging.DEBUG if quiet else logging.WARNING, "Singular matrix")
+                solved, error, x, n_iter = False, None, None, 0
             
             except OverflowError:
-                logging.warning("Overflow error detected...")
-                converged, error, x = False, None, None
-                solver.fail()
-            
-            if not converged:
-                # make sure iterations haven't been exceeded
-                if iters == MAXIT - 1:
-                    logging.warning("Error: MAXIT exceeded (" + str(MAXIT) + ")")
-
-                if solver.finished:
-                    solver.fail()
-            else:
-                # check to see if stepping was completed...
-                # if not, we go again using previous solution
-                if not solver.finished:
-                    converged = False
-                    
+                logger.log(logging.DEBUG if quiet else logging.WARNING, "Overflow error detected...")
+                solved, error, x, n_iter = False, None, None, 0
+
+            # 3. Let the solver take its next step, or retry it
+            solver.step_result(solved, n_iter)
+            if solved:
+                x_solved = x
+                converged = solver.finished
+
+    if not converged and not quiet:
+        newton_trace.dump(circ, "dc_solve() failed")
     return (x, error, converged, iters)
 
 
-def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None):
+def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None, solver=''):
 
     """
     M : conductance matrix
@@ -224,6 +264,9 @@ def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None):
     iteration method.
     
     Damping is configurable in the turmeric config.json file
+
+    Every iteration is recorded in trace.newton_trace, under the name of the
+    solver that set up M and Z
     
     """    
     
@@ -257,6 +300,7 @@ def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None):
         LU, INDX, _, C = ludcmp(M + nl*J, M_size)
         if C == 1:
             # singularity
+            newton_trace.record(iters + 1, error, None, damper(n=iters + 1), solver)
             raise SingularityError
         
         dx = lubksb(LU, INDX,  -error)
@@ -265,8 +309,10 @@ def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None):
             raise OverflowError
         
         iters += 1
+        damping = damper(n=iters)
+        newton_trace.record(iters, error, dx, damping, solver)
         # perform newton update and damp appropriately
-        x = x + damper(n=iters) * dx
+        x = x + damping * dx
         
         # if the circuit is linear, we know it has converged upon solution after one iteration
         if not nl:
@@ -280,6 +326,7 @@ def MNA_solve(x, M, circ, Z, MAXIT, NNODES, locked_nodes, time=None):
             if converged:
                 break
 
+    profiler.count('newton_iterations', iters)
     return (x, error, converged, iters)
 
 
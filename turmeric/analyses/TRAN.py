@@ -2,14 +2,17 @@ import logging
 import importlib
 import numpy as np
 
+from turmeric import progress
 from turmeric import results
 from turmeric import settings
 from turmeric.FORTRAN.DC_SUBRS import gmin_mat
 from turmeric.ODEsolvers import BE, odesolvers
 from turmeric.analyses.OP import dc_solve
-from turmeric.analyses.Analysis import Analysis, printProgressBar
+from turmeric.analyses.Analysis import Analysis
 from turmeric.components.tokens import ParamDict, Value
 
+logger = logging.getLogger(__name__)
+
 class TRAN(Analysis):
     
     """
@@ -29,6 +32,7 @@ class TRAN(Analysis):
             'tstep'  : { 'type' : lambda v: float(Value(v)), 'default' : None },
             'tstop'  : { 'type' : lambda v: float(Value(v)), 'default' : None },
             'tstart' : { 'type' : lambda v: float(Value(v)), 'default' : '0' },
+            'tmax'   : { 'type' : lambda v: float(Value(v)), 'default' : '0' },
             'method' : { 'type' : lambda v: str(v) if str(v) in odesolvers else settings.default_integration_scheme, 'default' : settings.default_integration_scheme },
             'x0'    : { 'type' : lambda v: [float(val) for val in list(v)], 'default' : [] }
             })]
@@ -38,9 +42,13 @@ class TRAN(Analysis):
 
     def __repr__(self):
         """
-        .TRAN tstep=<Value> tstop=<Value> tstart=<Value> method=<Value> [x0=\[<Value>...\]]
+        .TRAN tstep=<Value> tstop=<Value> tstart=<Value> [tmax=<Value>] method=<Value> [x0=\[<Value>...\]]
+
+        tstep is the interval at which results are written. The circuit is
+        integrated with the internal step tmax, which defaults to tstep.
         """
         r = f'.TRAN tstep={self.tstep} tstop={self.tstop} tstart={self.tstart} method={self.method}'
+        r += f' tmax={self.tmax}' if self.tmax else ''
         r += ' x0=['+''.join(str(v) for v in self.x0) + ']' if self.x0 is not None else ''
         return r
     
@@ -87,11 +95,11 @@ class TRAN(Analysis):
         
         # check params    
         if self.tstart > self.tstop:
-            logging.critical(f"tstart ({self.tstart}) > tstop ({self.tstop})")
+            logger.critical(f"tstart ({self.tstart}) > tstop ({self.tstop})")
             raise ValueError("Start value is greater than stop value - can't time travel")
         
-        if self.tstep < 0 or self.tstart < 0 or self.tstop < 0:
-            logging.critical("t-values are less than 0")
+        if self.tstep < 0 or self.tstart < 0 or self.tstop < 0 or self.tmax < 0:
+            logger.critical("t-values are less than 0")
             raise ValueError("Bad t-value. Must be positive")
         
         # list of the nodes attached to non-linear elements
@@ -104,7 +112,7 @@ class TRAN(Analysis):
 
         self.x0 = self.format_estimate(self.x0, M_size)
         
-        logging.info("Building Gmin matrix")
+        logger.info("Building Gmin matrix")
 
         Gmin_matrix = gmin_mat(settings.gmin, M.shape[0], NNODES-1)
         sol = results.Solution(circ, None, sol_type='TRAN', extra_header='t')
@@ -112,18 +120,27 @@ class TRAN(Analysis):
         #        tpoint         x       dx
         buf = [(self.tstart, self.x0, None)]
         
-        logging.info("Beginning transient")
+        # internal integration step, results are only written on the tstep grid
+        h = self.tmax if self.tmax > 0 else self.tstep
+        # tolerance on comparing time points to absorb rounding
+        eps = 1e-9 * h
+        nsteps = int(round((self.tstop-self.tstart)/h))
+        
+        logger.info("Beginning transient")
         
         i = 0
         t = self.tstart
+        # index of the next point on the print grid
+        k = 1
+        tprint = self.tstart + self.tstep
 
-        printProgressBar(int((t-self.tstart)/self.tstep),int((self.tstop-self.tstart)/self.tstep),'Transient analysis')
+        reporter = progress.start('TRAN', nsteps, 's')
         
-        while t < self.tstop:
+        while t < self.tstop - eps:
             if i < diff_slv.rsteps:
-                C1, C0 = BE.get_coefs((buf[i][1]), self.tstep)
+                C1, C0 = BE.get_coefs((buf[i][1]), h)
             else:
-                C1, C0 = diff_slv.get_coefs(buf, self.tstep)
+                C1, C0 = diff_slv.get_coefs(buf, h)
             
             # call circuit generation method to generate ZT
             circ.gen_matrices(t)
@@ -135,42 +152,46 @@ class TRAN(Analysis):
             x, error, solved, n_iter = dc_solve(M=(M + C1 * D),
                                                    Z=(ZDC + np.dot(D, C0) +ZT), circ=circ,
                                                    Gmin=Gmin_matrix, x0=self.x0,
-                                                   time=(t + self.tstep),
+                                                   time=(t + h),
                                                    locked_nodes=locked_nodes,
                                                    MAXIT=settings.transient_max_iterations)
 
 
             if solved:
-                t += self.tstep          # update time step
-                self.x0 = x              # update initial estimate
+                t_prev, x_prev = t, self.x0
                 i += 1                   # increment
-                # create and write the solution vector
-                row = [t]
-                row.extend(x.transpose().tolist()[0])
-                sol.write_data(row)
+                t = self.tstart + i * h  # update time step, without accumulating rounding
+                self.x0 = x              # update initial estimate
+                # interpolate the accepted step onto the print points it covers
+                while tprint <= t + eps and tprint <= self.tstop + eps:
+                    xp = x_prev + (x - x_prev) * ((tprint - t_prev) / (t - t_prev))
+                    row = [tprint]
+                    row.extend(xp.transpose().tolist()[0])
+                    sol.write_data(row)
+                    k += 1
+                    tprint = self.tstart + k * self.tstep
                 dxdt = np.multiply(C1, x) + C0
                 buf.append((t, x, dxdt))
 
-                if i % 5 == 0:
-                    #print(f"CURRENT {int((t-self.tstart)/self.tstep)} OF {int((self.tstop-self.tstart)/self.tstep)}")
-                    printProgressBar(int((t-self.tstart)/self.tstep),int((self.tstop-self.tstart)/self.tstep),'Transient analysis')
+                reporter.update(i, t)
                 if len(buf) > diff_slv.rsteps:
                     buf.pop(0)
                 
             else:
                 # we have fixed step size so if it can't solve it has to abort
-                logging.error(f"Can't converge with step: {self.tstep}.")
-                logging.info("Reduce step or increase max iterations")
+                logger.error(f"Can't converge with step: {h}.")
+                logger.info("Reduce step or increase max iterations")
                 solved = False
                 break
         # close the file pointer
         sol.close()
+        reporter.finish(t, failed=not solved)
         if solved:
             # return the solution object
-            logging.info("Transient complete")
+            logger.info("Transient complete")
             return sol.as_dict(float)
         
-        logging.info("Failed to solve")
+        logger.info("Failed to solve")
         return None
 
     def get_reduced_system(self, circ):
@@ -188,12 +209,12 @@ class TRAN(Analysis):
         D : reduced dynamic matrix
 
         """
-        logging.debug("Getting and reducing MNA equations from circuit")
+        logger.debug("Getting and reducing MNA equations from circuit")
          
         M = circ.M0[1:, 1:]
         ZDC = circ.ZDC0[1:]
         
-        logging.debug("Getting and reducing dynamic matrix D0 from circuit")
+        logger.debug("Getting and reducing dynamic matrix D0 from circuit")
         # Once again, if Dynamic matrix has been generated for previous transient, we reuse
         D = circ.D0[1:, 1:]
         
@@ -217,16 +238,16 @@ class TRAN(Analysis):
         """
         
         if x0 is None:
-            logging.info("No initial solution provided... Not ideal")
+            logger.info("No initial solution provided... Not ideal")
             x0 = np.zeros((dim, 1))
         else:
-            logging.info("Using provided x0")
+            logger.info("Using provided x0")
             if isinstance(x0, dict):
-                logging.info("Operating point solution provided as simulation result")
+                logger.info("Operating point solution provided as simulation result")
                 x0 = [value for value in x0.values()]
                 x0 = np.array(x0)[np.newaxis].T
         
-        logging.debug("Initial estimate is...")
-        logging.debug(x0)
+        logger.debug("Initial estimate is...")
+        logger.debug(x0)
         
         return x0
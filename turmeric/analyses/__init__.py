@@ -1,5 +1,9 @@
-from .AC import AC
-from .OP import OP
-from .DC import DC
-from .TRAN import TRAN
+import importlib
 
+# Each analysis, and the Fortran routines it uses, is imported on first use
+__all__ = ['AC', 'OP', 'DC', 'TRAN']
+
+def __getattr__(name):
+    if name in __all__:
+        return getattr(importlib.import_module(f'.{name}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,115 @@
+"""
+Running many netlists, e.g. a regression suite
+
+    python -m turmeric -j 8 'regression/**/*.net'
+
+Every netlist runs as its own job with its own output directory,
+<output_directory>/<netlist name>, so jobs never write over each other's
+results whatever their outprefix. With jobs > 1 the netlists run on a pool
+of worker processes, each started and configured once and then reused for
+job after job. A job that fails or raises does not
+stop the batch; its status and message are reported in the summary.
+"""
+import glob
+import logging
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from turmeric import log
+from turmeric import parallel
+from turmeric import settings
+from turmeric import turmeric
+
+logger = logging.getLogger(__name__)
+
+#: Outcome of one netlist of a batch
+JobResult = namedtuple('JobResult', 'netlist output_directory status seconds message')
+
+def expand(patterns):
+    """
+    The netlists matched by each of patterns, a filename or a glob, in
+    order and without duplicates
+    """
+    netlists = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            logger.warning(f"No netlist matches `{pattern}'")
+        netlists.extend(matches)
+    return list(dict.fromkeys(netlists))
+
+def output_directories(netlists, output_directory):
+    """A distinct output directory under output_directory for each netlist"""
+    dirs, used = [], set()
+    for netlist in netlists:
+        name, k = Path(netlist).stem, 1
+        while name.lower() in used:
+            k += 1
+            name = f"{Path(netlist).stem}-{k}"
+        used.add(name.lower())
+        dirs.append(str(Path(output_directory) / name))
+    return dirs
+
+def run_job(netlist, output_directory, outprefix):
+    """Simulate one netlist into output_directory and report how it went"""
+    Path(output_directory).mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(Path(output_directory) / f"{outprefix}.log", mode='w', encoding='utf8')
+    handler.setFormatter(logging.Formatter('%(asctime)s : %(name)s : %(levelname)s : %(message)s'))
+    log.add_handler(handler)
+    start = time.perf_counter()
+    try:
+        if not Path(netlist).is_file():
+            logger.error(f"Netlist file {netlist} was not found")
+            status, message = 'error', "netlist not found"
+        else:
+            res = turmeric.main(filename=netlist, outprefix=outprefix, output_directory=output_directory)
+            failed = [an for an, r in (res or {}).items() if r is None]
+            status, message = ('failed', f"{', '.join(failed)} failed") if failed else ('ok', '')
+    except Exception as e:
+        logger.exception(f"Simulating {netlist} raised")
+        status, message = 'error', f"{type(e).__name__}: {e}"
+    finally:
+        log.remove_handler(handler)
+        handler.close()
+    return JobResult(netlist, output_directory, status, time.perf_counter() - start, message)
+
+def _run_job(args):
+    return run_job(*args)
+
+def run_batch(netlists, jobs=1, outprefix=None, output_directory=None):
+    """
+    Simulate every netlist, each into its own directory under
+    output_directory, on up to jobs worker processes.
+
+    netlists : list of filenames or globs
+    jobs : int
+        Number of worker processes, 1 to run the netlists one after another
+        in this process.
+
+    **Returns:**
+    list of JobResult, in the order of netlists
+    """
+    outprefix = settings.outprefix if outprefix is None else outprefix
+    output_directory = settings.output_directory if output_directory is None else output_directory
+    netlists = expand(netlists)
+    tasks = [(n, d, outprefix) for n, d in zip(netlists, output_directories(netlists, output_directory))]
+    logger.info(f"Running a batch of {len(tasks)} netlists on {min(jobs, len(tasks))} processes")
+    if jobs > 1 and len(tasks) > 1:
+        with parallel.pool(min(jobs, len(tasks)), None) as pool:
+            return list(pool.map(_run_job, tasks))
+    saved = (settings.outprefix, settings.output_directory)
+    try:
+        return [run_job(*t) for t in tasks]
+    finally:
+        settings.outprefix, settings.output_directory = saved
+
+def summary(results):
+    """The results of a batch as a table, with totals"""
+    width = max([len('NETLIST')] + [len(r.netlist) for r in results])
+    lines = [f"{'NETLIST':<{width}}  {'STATUS':<6}  {'TIME (s)':>9}  MESSAGE"]
+    for r in results:
+        lines.append(f"{r.netlist:<{width}}  {r.status:<6}  {r.seconds:9.3f}  {r.message}")
+    ok = sum(r.status == 'ok' for r in results)
+    lines.append(f"{ok}/{len(results)} ok in {sum(r.seconds for r in results):.3f} s of simulation")
+    return '\n'.join(lines)
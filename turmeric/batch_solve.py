@@ -0,0 +1,120 @@
+"""
+Batched Newton solves of many DC points of one circuit at once
+
+The points of a batch share the reduced MNA matrix M and differ in their
+source vectors. Devices are evaluated for the whole batch in one call, the
+(K, n, n) Jacobians are solved together by LAPACK, and points drop out of the
+batch as they converge. For small nonlinear circuits, this avoids the Python
+overhead that dominates solving one point at a time.
+
+Every nonlinear element must provide batchable() and batch_ig(v), see D.
+"""
+import logging
+
+import numpy as np
+
+from turmeric import profiler
+from turmeric import settings
+
+logger = logging.getLogger(__name__)
+
+def batchable(circ):
+    """Whether every nonlinear element of circ can be evaluated in batches"""
+    return all(hasattr(elem, 'batch_ig') and elem.batchable() for elem in circ if elem.is_nonlinear)
+
+def _devices(circ):
+    """(element, n1, n2) of the nonlinear elements, with 0-based nodes and -1 for ground"""
+    return [(elem, elem.n1 - 1, elem.n2 - 1) for elem in circ if elem.is_nonlinear]
+
+def _port_voltage(x, n1, n2):
+    v = x[:, n1] if n1 >= 0 else np.zeros(len(x))
+    return v - x[:, n2] if n2 >= 0 else v
+
+def has_converged(x, dx, e, NNODES):
+    """
+    Per point of a batch, the convergence test of OP.has_converged. x, dx and
+    e are (K, n) arrays.
+    """
+    NNODES -= 1
+    vtol = (settings.ver, settings.vea)
+    itol = (settings.ier, settings.iea)
+    xv, xi = x[:, :NNODES], x[:, NNODES:]
+    dxv, dxi = dx[:, :NNODES], dx[:, NNODES:]
+    ev, ei = e[:, :NNODES], e[:, NNODES:]
+    # as np.allclose(x, x + dx)
+    vcheck = np.all(np.abs(dxv) <= vtol[1] + vtol[0] * np.abs(xv + dxv), axis=1) & np.all(np.abs(ev) <= settings.iea, axis=1)
+    icheck = np.all(np.abs(dxi) <= itol[1] + itol[0] * np.abs(xi + dxi), axis=1) & np.all(np.abs(ei) <= settings.vea, axis=1)
+    return vcheck & icheck
+
+@profiler.timed('lu_factor')
+def _solve(A, b):
+    """np.linalg.solve for a batch, with NaN for the points whose matrix is singular"""
+    try:
+        return np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        x = np.full(b.shape, np.nan)
+        for k in range(len(A)):
+            try:
+                x[k] = np.linalg.solve(A[k], b[k])
+            except np.linalg.LinAlgError:
+                logger.debug("batch_newton(): singular Jacobian at point %d of the batch", k)
+        return x
+
+@profiler.timed('devices')
+def _evaluate(devices, x):
+    """(currents, conductances) of each device at every point of x"""
+    return [elem.batch_ig(_port_voltage(x, n1, n2)) for elem, n1, n2 in devices]
+
+def batch_newton(circ, M, Z, x, maxit, dZ=None):
+    """
+    Undamped Newton iterations on M x + Z[k] + N(x) = 0 for every point k of
+    a batch.
+
+    M  : (n, n) reduced MNA matrix shared by the batch
+    Z  : (K, n) source vectors
+    x  : (K, n) initial estimates
+    dZ : (n,) optional derivative of Z with respect to a swept source, whose
+         tangent dx/dv is then returned for every point
+
+    Returns (x, converged, iterations, tangents), converged being a boolean
+    array and tangents a (K, n) array from the last Jacobian of each point,
+    or None without dZ.
+    """
+    K, n = x.shape
+    x = np.array(x, dtype=float)
+    devices = _devices(circ)
+    converged = np.zeros(K, dtype=bool)
+    active = np.ones(K, dtype=bool)
+    t = np.zeros((K, n)) if dZ is not None else None
+    iters = 0
+    while iters < maxit and active.any():
+        iters += 1
+        idx = np.flatnonzero(active)
+        xa = x[idx]
+        J = np.repeat(M[np.newaxis], len(idx), axis=0)
+        error = xa @ M.T + Z[idx]
+        rows = np.arange(len(idx))
+        profiler.count('newton_iterations', len(idx))
+        for (elem, n1, n2), (i, g) in zip(devices, _evaluate(devices, xa)):
+            if n1 >= 0:
+                error[:, n1] += i
+                J[rows, n1, n1] += g
+            if n2 >= 0:
+                error[:, n2] -= i
+                J[rows, n2, n2] += g
+            if n1 >= 0 and n2 >= 0:
+                J[rows, n1, n2] -= g
+                J[rows, n2, n1] -= g
+        rhs = -error[:, :, np.newaxis]
+        if dZ is not None:
+            rhs = np.concatenate([rhs, np.broadcast_to(-dZ[:, np.newaxis], (len(idx), n, 1))], axis=2)
+        sol = _solve(J, rhs)
+        dx = sol[:, :, 0]
+        if dZ is not None:
+            t[idx] = sol[:, :, 1]
+        finite = np.all(np.isfinite(dx), axis=1)
+        x[idx[finite]] = xa[finite] + dx[finite]
+        done = finite & has_converged(xa + dx, dx, error, circ.nnodes)
+        converged[idx[done]] = True
+        active[idx[done | ~finite]] = False
+    return x, converged, iters, t
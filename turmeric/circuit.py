@@ -2,6 +2,7 @@ import numpy as np
 import logging
 
 from . import components
+from . import profiler
 
 class Circuit(list):
     """
@@ -20,6 +21,10 @@ class Circuit(list):
         self.filename = filename
         self.nodes_dict = {}
         self.models = {}
+        # signals named by .save directives; empty records every signal
+        self.saves = []
+        # subcircuit definitions by name
+        self.subcircuits = {}
         self.gnd = '0'
 
     def __str__(self):
@@ -84,6 +89,7 @@ class Circuit(list):
                     locked_nodes.append(port)
         return locked_nodes
 
+    @profiler.timed('assembly')
     def gen_matrices(self, time=0):
         """
         This method generates the MNA matrices for the circuit simulation
@@ -128,6 +134,7 @@ class Circuit(list):
         self.D0   = D0
         self.ZT0  = ZT0
  
+    @profiler.timed('devices')
     def generate_J_and_N(self, J, N, x, time):
         
         """
@@ -9,7 +9,13 @@ to 2n equations with real-valued coefficients
 import numpy as np
 from numpy.linalg import norm
 import logging
-from .FORTRAN.LU import ludcmp, lubksb
+from .FORTRAN import LU
+from . import profiler
+
+logger = logging.getLogger(__name__)
+
+ludcmp = profiler.timed('lu_factor', LU.ludcmp)
+lubksb = profiler.timed('lu_solve', LU.lubksb)
 
 j = np.complex('j')    
 
@@ -114,22 +120,22 @@ def solver(A_c, b_c):
     (n, m) = A_c.shape
     
     if n != m:
-        logging.error("complex_solve(): Matrix dimensions do not agree")
+        logger.error("complex_solve(): Matrix dimensions do not agree")
         raise ValueError
     if n != b_c.shape[0]:
-        logging.error("complex_solve(): A and b matrix dimensions do not agree")
+        logger.error("complex_solve(): A and b matrix dimensions do not agree")
     
     A, b = allocate_mats(n)
     (A, b) = populate_mats(A, b, A_c, b_c)
     
     LU, INDX, _, C = ludcmp(A)
     if C == 1:
-        logging.error("Singular matrix")
+        logger.error("Singular matrix")
         raise ValueError
     
     x = lubksb(LU, INDX,  b)
     if norm(x) == np.nan:
-        logging.error("Overflow error")
+        logger.error("Overflow error")
         raise OverflowError
     
     x_c = real_to_complex(x)
@@ -1,3 +1,4 @@
+import copy
 import numpy as np
 from abc import ABC, abstractmethod
 from .Parseable import Parseable
@@ -8,6 +9,9 @@ class Component(Parseable):
     Defines structure they should follow.
     """
 
+    #: Attributes holding the numbers of the nodes the component connects to
+    node_attrs = ('n1', 'n2')
+
     def __init__(self, line):
         super().__init__(line)
 
@@ -18,6 +22,19 @@ class Component(Parseable):
     def __str__(self):
         return repr(self)
 
+    def remap_nodes(self, nodemap, instance):
+        """
+        Copy of this component as part of the subcircuit instance ``instance'',
+        with its nodes renumbered through ``nodemap''.
+        """
+        elem = copy.copy(self)
+        for attr in self.node_attrs:
+            setattr(elem, attr, nodemap[getattr(self, attr)])
+        # r1 becomes r.x1.r1, r.x2.r1 becomes r.x1.x2.r1
+        part_id = str(self.part_id)
+        elem.part_id = f".{instance}{part_id}" if part_id.startswith('.') else f".{instance}.{self.name}{part_id}"
+        return elem
+
     @abstractmethod
     def stamp(self, M0, ZDC0, ZAC0, D0, ZT0, time):
         pass
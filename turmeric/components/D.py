@@ -40,6 +40,11 @@ class D(Component):
     def stamp(self, M0, ZDC0, ZAC0, D0, ZT0, time):
         pass
 
+    def remap_nodes(self, nodemap, instance):
+        elem = super().remap_nodes(nodemap, instance)
+        elem.ports = ((elem.n1, elem.n2),)
+        return elem
+
     def set_temperature(self, T):
         self.T = T
 
@@ -142,6 +147,18 @@ class D(Component):
             stamp = np.array(stamp_folded)
         return indices, stamp
 
+    def batchable(self):
+        """Whether batch_ig models this diode as istamp and gstamp do"""
+        return not self.model.RS
+
+    def batch_ig(self, v):
+        """
+        Currents and conductances of the diode at an array of port voltages
+        v, one per point of a batched solve
+        """
+        i, gm = self.model.batch_ig(v, self.T)
+        return i, np.where(gm == 0, settings.gmin*2, gm)
+
     def g(self, op_index, ports_v, port_index, time=0):
         if not port_index == 0:
             raise Exception("Attepted to evaluate a D's gm on an unknown port.")
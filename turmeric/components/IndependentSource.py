@@ -1,7 +1,10 @@
+import logging
 from .Component import Component
 import numpy as np
 from ..TVSourceFunctions import tvsourcefunctions
 
+logger = logging.getLogger(__name__)
+
 class IndependentSource(Component):
     def __init__(self, line, circ):
         super().__init__(line)
@@ -10,7 +13,7 @@ class IndependentSource(Component):
         try:
             params['type']
         except AttributeError as e:
-            logging.exception(f"Type of source not specified or source type is unsupported in `{line}'")
+            logger.exception(f"Type of source not specified or source type is unsupported in `{line}'")
 
         dc_value = None
         ac_value = None
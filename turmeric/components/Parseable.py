@@ -1,7 +1,29 @@
 from abc import ABC, abstractmethod
 import logging
 import re
-from .tokens import rex
+from .tokens import rex, _WORD
+
+logger = logging.getLogger(__name__)
+
+# Compiled line patterns, keyed by (prefix, name, net_objs), bound token
+# classes by their pattern_key
+_patterns = {}
+
+def _line_pattern(prefix, name, net_objs):
+    """
+    Return (regex, compiled regex, word checks) for a line made of net_objs.
+    Word checks are only given if every one of net_objs is a single word,
+    see Parseable._split, otherwise they are None.
+    """
+    key = (prefix, name, tuple(getattr(o, 'pattern_key', o) for o in net_objs))
+    if key not in _patterns:
+        r = "^" + prefix + f"{name}" + '(?: +)'.join([rex(o) for o in net_objs])
+        checks = None
+        if not prefix and all(o.__word__ is not None for o in net_objs):
+            # every word matches a Label or a Node
+            checks = tuple((i, o.__word__) for i, o in enumerate(net_objs) if o.__word__ is not _WORD)
+        _patterns[key] = (r, re.compile(r), checks)
+    return _patterns[key]
 
 class Parseable(ABC):
 
@@ -10,16 +32,46 @@ class Parseable(ABC):
             self.name = type(self).__name__.lower()
         if not hasattr(self, '__re__'):
             self.__re__ = ''
-        self.__re__ = "^" + self.__re__ + f"{self.name}" + '(?: +)'.join([rex(o) for o in self.net_objs])
-        match = re.search(self.__re__,line.strip().lower())
+        self.__re__, pattern, checks = _line_pattern(self.__re__, self.name, self.net_objs)
+        text = line.strip().lower()
+        groups = self._split(text, checks) if checks is not None else None
+        if groups is None:
+            match = pattern.search(text)
+            if not match:
+                logger.error(f"Failed to parse element from line\n\t`{line}'\n\tusing the regex `{self.__re__}'")
+                return
+            groups = match.groups()
         try:
             # FOR THIS TO WORK, EACH PARAMETER IN self.net_objs MUST EVALUATE TO EXACTLY ONE REGEX GROUP
-            self.tokens = [n(g) for n,g in zip(self.net_objs,match.groups())]
+            self.tokens = [n(g) for n,g in zip(self.net_objs,groups)]
         except AttributeError as e:
-            if match:
-                logging.exception(f"Exception occurred during parsing of line:\n\t`{line}'\n\t using regex `{self.__re__}'")
-            else:
-                logging.error(f"Failed to parse element from line\n\t`{line}'\n\tusing the regex `{self.__re__}'")
+            logger.exception(f"Exception occurred during parsing of line:\n\t`{line}'\n\t using regex `{self.__re__}'")
+
+    def _split(self, line, checks):
+        """
+        Fast path for lines whose net_objs are all single words, e.g. `r1 1 2 1k'.
+        Returns the same groups the line regex would, or None to fall back to it.
+        """
+        # the regex only separates on spaces
+        if not line.isprintable():
+            return None
+        words = line.split()
+        name = self.name
+        if len(words) < len(self.net_objs) or not words[0].startswith(name) or len(words[0]) == len(name):
+            return None
+        words[0] = words[0][len(name):]
+        for i, word in checks:
+            if not word.fullmatch(words[i]):
+                return None
+        return words
+
+    def __getstate__(self):
+        # net_objs may hold parameter binders with lambdas, and neither they
+        # nor the tokens are needed once the line has been parsed
+        state = self.__dict__.copy()
+        state.pop('net_objs', None)
+        state.pop('tokens', None)
+        return state
 
     @property
     def __re__(self):
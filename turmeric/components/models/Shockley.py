@@ -1,6 +1,9 @@
 from ... import units
 from ...numerical import newtonRaphson
 from ...memoized import memoized
+import functools
+from collections import namedtuple
+
 import numpy as np
 from ... import settings
 from turmeric.components.models.Model import Model
@@ -18,7 +21,10 @@ DEFAULT_ISR  = 0.0
 DEFAULT_N    = 1.0 
 DEFAULT_NR   = 2.0 
 DEFAULT_RS   = 0.0  
+DEFAULT_TBV  = 0.0
 DEFAULT_TEMP = 26.85
+DEFAULT_TRS  = 0.0
+DEFAULT_XTI  = 3.0
 DEFAULT_T    = units.Kelvin(celsius=DEFAULT_TEMP)
 
 
@@ -48,6 +54,39 @@ class silicon(Material):
 
 si = silicon()
 
+#: Model parameters at the nominal temperature TNOM (K)
+Nominal = namedtuple('Nominal', 'IS N ISR NR BV RS EG XTI TBV TRS TNOM material')
+#: Model parameters scaled to a device temperature T (K)
+Scaled = namedtuple('Scaled', 'T VT IS N ISR NR BV RS EG')
+
+@functools.lru_cache(maxsize=1024)
+def scale(nominal, T):
+    """
+    The parameters nominal scaled to the temperature T. Results are cached
+    and immutable, so any number of devices at any temperatures can share a
+    model without changing it.
+    """
+    T = float(T)
+    p = nominal
+    # the IS scaling uses the gap at the reference temperature
+    EG0 = p.material.Eg(Tref) if p.material is not None else p.EG
+    IS = p.IS * (T / p.TNOM)**(p.XTI / p.N) * np.exp(-units.e * EG0 / (p.N * units.k * T) * (1 - T / p.TNOM))
+    return Scaled(T  = T,
+                  VT = units.Vth(T),
+                  IS = IS,
+                  N  = p.N,
+                  ISR= p.ISR,
+                  NR = p.NR,
+                  BV = p.BV - p.TBV * (T - p.TNOM),
+                  RS = p.RS * (1 + p.TRS * (T - p.TNOM)),
+                  EG = p.material.Eg(T) if p.material is not None else p.EG)
+
+def _safe_exp(x):
+    return np.exp(x) if x < 70 else np.exp(70) + 10 * x
+
+def _safe_exp_array(x):
+    return np.where(x < 70, np.exp(np.minimum(x, 70)), np.exp(70) + 10 * x)
+
 class Shockley(Model):
     def __init__(self, line):
         self.net_objs = [Label,Label,ParamDict.allowed_params(self,{
@@ -59,11 +98,15 @@ class Shockley(Model):
             'N'    : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_N   )},
             'NR'   : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_NR  )},
             'RS'   : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_RS  )},
+            'TBV'  : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_TBV )},
             'TEMP' : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_TEMP)},
+            'TRS'  : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_TRS )},
+            'XTI'  : { 'type' : lambda v: float(Value(v)) , 'default' : str(DEFAULT_XTI )},
             },optional=True)]
         super().__init__(line)
         self.model_id = str(self.tokens[2])
-        self.T    = DEFAULT_T
+        # parameters are given at the nominal temperature TEMP
+        self.T    = units.Kelvin(celsius=self.TEMP)
         self.last_vd = None
         self.VT   = units.k * self.T / units.e
         self.material=si
@@ -71,7 +114,16 @@ class Shockley(Model):
     def __repr__(self):
         return f".model D {self.model_id} IS={self.IS} N={self.N} ISR={self.ISR}\
                 NR={self.NR} RS={self.RS} BV={self.BV} IBV={self.IBV} TEMP={self.TEMP}\
-                EG={self.EG}"    
+                XTI={self.XTI} EG={self.EG} TBV={self.TBV} TRS={self.TRS}"    
+
+    def scaled(self, T):
+        """
+        The parameters of the model at the temperature T (K). They are
+        computed once per temperature, and again only if a nominal parameter
+        changes, e.g. in a Monte Carlo sample.
+        """
+        return scale(Nominal(self.IS, self.N, self.ISR, self.NR, self.BV, self.RS, self.EG,
+                             self.XTI, self.TBV, self.TRS, self.T, self.material), T)
 
     @memoized
     def get_i(self, vext, dev):
@@ -81,48 +133,34 @@ class Shockley(Model):
         returns:
             i : current
         """
-        if dev.T != self.T:
-            self.set_temperature(dev.T)
-        if not self.RS:
-            i = self._get_i(vext)
+        p = self.scaled(dev.T)
+        if not p.RS:
+            i = self._get_i(vext, p)
             dev.last_vd = vext
         else:
-            vd = dev.last_vd if dev.last_vd is not None else 10*self.VT
+            vd = dev.last_vd if dev.last_vd is not None else 10*p.VT
             vd = newtonRaphson(self._obj_irs, vd, df=self._obj_irs_prime,
-                    args=(vext, dev), tol=settings.vea, MAXITERS=500)
-            i = self._get_i(vext-vd)
+                    args=(vext, p), tol=settings.vea, MAXITERS=500)
+            i = self._get_i(vext-vd, p)
             dev.last_vd = vd
         return i
 
-    def _obj_irs(self, x, vext, dev):
+    def _obj_irs(self, x, vext, p):
         """
         Internal function for newton raphson method
         """
         # obj fn for newton
-        return x/self.RS-self._get_i(vext-x)
+        return x/p.RS-self._get_i(vext-x, p)
 
-    def _obj_irs_prime(self, x, vext, dev):
+    def _obj_irs_prime(self, x, vext, p):
         """
         Internal function for newton raphson method
 
         """
         # obj fn derivative for newton
-        # first term
-        ret = 1./self.RS
-        # disable RS
-        RSSAVE = self.RS
-        self.RS = 0
-        # second term
-        ret += self.get_gm(0, (vext-x,), 0, dev)
-        # renable RS
-        self.RS = RSSAVE
-        return ret
-
-    @memoized
-    def _safe_exp(self, x):
-        return np.exp(x) if x < 70 else np.exp(70) + 10 * x
+        return 1./p.RS + self._get_gm(vext-x, p)
 
-    def _get_i(self, v):
+    def _get_i(self, v, p):
         """
         Getter function for diode current
         We model:
@@ -132,14 +170,22 @@ class Shockley(Model):
 
         """
         # forward
-        i_fwd= self.IS * (self._safe_exp(v/(self.N * self.VT)) - 1)
+        i_fwd= p.IS * (_safe_exp(v/(p.N * p.VT)) - 1)
         # recombination
-        i_rec= self.ISR* (self._safe_exp(v/(self.NR * self.VT)) - 1)
+        i_rec= p.ISR* (_safe_exp(v/(p.NR * p.VT)) - 1)
         # reverse saturation
-        i_rev=-self.IS * (self._safe_exp(-(v+self.BV)/(self.VT)) - 1)
+        i_rev=-p.IS * (_safe_exp(-(v+p.BV)/(p.VT)) - 1)
 
         return i_fwd+i_rec+i_rev
 
+    def _get_gm(self, v, p):
+        """
+        Junction transconductance, without contact resistance
+        """
+        return p.IS / (p.N * p.VT) * _safe_exp(v / (p.N * p.VT)) +\
+                -p.IS/p.VT * (_safe_exp(-(v+p.BV)/p.VT)) +\
+                p.ISR / (p.NR * p.VT) * _safe_exp(v / (p.NR * p.VT))
+
     @memoized
     def get_gm(self, op_index, ports_v, port_index, dev):
         """
@@ -151,38 +197,24 @@ class Shockley(Model):
         gm : device transconductance
 
         """
-        if dev.T != self.T:
-            self.set_temperature(dev.T)
-        v=ports_v[0]
+        p = self.scaled(dev.T)
         # derivative wrt V
-        gm = self.IS / (self.N * self.VT) *\
-                self._safe_exp(v / (self.N * self.VT)) +\
-                -self.IS/self.VT * (self._safe_exp(-(v+self.BV)/self.VT)) +\
-                self.ISR / (self.NR * self.VT) *\
-                self._safe_exp(v / (self.NR * self.VT))
-
-        if self.RS != 0.0:
-            gm = 1. / (self.RS + 1. / (gm + 1e-3*settings.gmin))
+        gm = self._get_gm(ports_v[0], p)
+
+        if p.RS != 0.0:
+            gm = 1. / (p.RS + 1. / (gm + 1e-3*settings.gmin))
         return gm
 
-    def set_temperature(self, T):
+    def batch_ig(self, v, T):
         """
-        Sets the diode temperature adn alters the physical properties
-        accordingly
-
-        Parameters
-        ----------
-        T : temp
-
+        Device currents and transconductances at an array of applied voltages
+        v and the temperature T, e.g. one per point of a batched solve. Same
+        as get_i and get_gm without contact resistance.
         """
-        # alter properties based on T
-        T = float(T)
-        self.EG = self.material.Eg(T) if self.material!=None else self.EG
-        self.IS = self.IS*(T/self.T)**(self.XTI/self.N)*np.exp(-units.e*(self.material.Eg(units.Tref) if self.material!=None else self.EG)/(self.N*units.k*T)*(1 - T/self.T))
-        self.BV = self.BV - self.TBV*(T - self.T)
-        self.RS = self.RS*(1 + self.TRS*(T - self.T))
-        self.T = T
-
-
-
-
+        p = self.scaled(T)
+        e_fwd = _safe_exp_array(v / (p.N * p.VT))
+        e_rec = _safe_exp_array(v / (p.NR * p.VT))
+        e_rev = _safe_exp_array(-(v + p.BV) / p.VT)
+        i = p.IS * (e_fwd - 1) + p.ISR * (e_rec - 1) - p.IS * (e_rev - 1)
+        gm = p.IS / (p.N * p.VT) * e_fwd - p.IS / p.VT * e_rev + p.ISR / (p.NR * p.VT) * e_rec
+        return i, gm
@@ -3,6 +3,8 @@ class E(VoltageDefinedComponent):
     """
     VCVS
     """
+    node_attrs = ('n1', 'n2', 'sn1', 'sn2')
+
     def __init__(self, part_id, n1, n2, value, sn1, sn2):
         self.net_objs = [Label,Node,Node,Node,Node,Value]
         self.part_id = str(self.tokens[0])
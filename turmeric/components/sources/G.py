@@ -2,6 +2,8 @@ from ..CurrentDefinedComponent import CurrentDefinedComponent
 from ..tokens import rex, Value, Label, Node
 
 class G(CurrentDefinedComponent):
+    node_attrs = ('n1', 'n2', 'sn1', 'sn2')
+
     def __init__(self, line, circ):
         self.net_objs = [Label,Node,Node,Value]
         super().__init__(line)
@@ -2,6 +2,7 @@
 Tokens that appear in a netlist line
 """
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import re
 
 def rex(objs):
@@ -32,7 +33,29 @@ class classproperty(object):
     def __get__(self, instance, owner):
         return self.getter(owner)
 
+class _Bound(object):
+    """
+    Token class with keyword arguments bound to its constructor, for use in
+    net_objs. Stands in for the token class: it has the same regex and
+    calling it constructs the token.
+    """
+    def __init__(self, cls, regex, **kwargs):
+        self.cls = cls
+        self.__re__ = regex
+        self.__word__ = cls.__word__
+        self.kwargs = kwargs
+        # binders with the same key give the same line regex, see Parseable.
+        # The kwargs are left out, so that cached patterns do not keep them alive
+        self.pattern_key = (cls, regex)
+
+    def __call__(self, val):
+        return self.cls(val, **self.kwargs)
+
 class NetlistToken(ABC):
+    #: Compiled regex a whole space-delimited word must match for the token
+    #: to be split off a line without the line regex, None if it can't be.
+    __word__ = None
+
     def __init__(self, val):
         self._value = val
 
@@ -50,7 +73,11 @@ class NetlistToken(ABC):
         pass
 
 
+_WORD = re.compile(r"[^ ]+")
+
 class Label(NetlistToken):
+    __word__ = _WORD
+
     def __init__(self,val):
         super().__init__(val)
 
@@ -65,24 +92,20 @@ class Model(Label):
     """
     To use in net_objs, call classmethod with list of models as parameter
     """
-    def __init__(self, val):
+    def __init__(self, val, models=None):
         super().__init__(val)
+        self.__models = models if models is not None else {}
         if self.value.lower() not in [i.lower() for i in self.__models.keys()]:
             raise ValueError("Model {self.value} not found in this netlist.")
         self.value = self.__models[self.value]
 
     @classmethod
     def defined(cls, models):
-        def newInit(obj, val):
-            obj.__models = models
-            cls.__init__(obj, val)
-
-        return type(f"Model", (Model,) ,{
-            '__init__' : newInit
-            })
-        return cls
+        return _Bound(cls, Label.__re__, models=models)
 
 class Node(NetlistToken):
+    __word__ = _WORD
+
     def __init__(self,val):
         super().__init__(val)
         self.__name = str(self.value)
@@ -105,16 +128,26 @@ class Node(NetlistToken):
     def __re__(self):
         return r"([^ ]+)"
 
+_VALUE = re.compile(r"^(?: *)(?:([\d\.\-\+]+)(meg|[fpnumkgt])?|(inf))$")
+
+@lru_cache(maxsize=4096)
+def _parse_value(val):
+    """Return (value, order of its SI prefix) of a netlist value string"""
+    m = _VALUE.search(val)
+    if m is None:
+        raise ValueError(f"Bad value `{val}'")
+    g = m.groups()
+    if g[0] is not None:
+        order = si[g[1]] if g[1] is not None else 1.0
+        return float(g[0]) * order, order
+    return float(g[2]), 1.0
+
 class Value(NetlistToken):
+    __word__ = re.compile(r"(?:[\d\.\-\+]+(?:meg|[fpnumkgt])?|inf)")
+
     def __init__(self, val):
-        r = r"^(?: *)(?:([\d\.\-\+]+)(meg|[fpnumkgt])?|(inf))$"
-        m = re.search(r,val)
-        g = m.groups()
-        if g[0] is not None:
-            self.__order = si[g[1]] if g[1] is not None else 1.0
-            super().__init__(float(g[0]) * self.__order)
-        else:
-            super().__init__(float(g[2]))
+        value, self.__order = _parse_value(val)
+        super().__init__(value)
 
     @classproperty
     def __re__(cls):
@@ -135,9 +168,8 @@ class ParamDict(NetlistToken):
         as attributes.
     This will still return the dictionary of parsed parameter=value pairs.
     """
-    def __init__(self, val):
-        r = '([^ \n]+=[^ \n]+)'
-        m = re.findall(r,val) if val else None
+    def __init__(self, val, parent=None, allowed=None):
+        m = _KV.findall(val) if val else None
         d = {}
         if m is not None:
             for g in m:
@@ -151,14 +183,14 @@ class ParamDict(NetlistToken):
                         d[p.key.lower()] = l
                 else:
                     d.update({p.key.lower() : p.value})
-        if hasattr(self, '_ParamDict__allowed_params') and hasattr(self, '_ParamDict__parent'):
-            for param, desc in self.__allowed_params.items():
+        if allowed is not None and parent is not None:
+            for param, desc in allowed.items():
                 if param.lower() in d:
-                    setattr(self._ParamDict__parent,param,desc['type'](d[param.lower()]))
+                    setattr(parent,param,desc['type'](d[param.lower()]))
                 elif desc['default'] is not None:
-                    setattr(self._ParamDict__parent,param,desc['type'](desc['default']))
+                    setattr(parent,param,desc['type'](desc['default']))
                 else:
-                    raise ValueError(f'Missing non-default parameter {param} for {self._ParamDict__parent} component')
+                    raise ValueError(f'Missing non-default parameter {param} for {parent} component')
         super().__init__(d)
 
     @classmethod
@@ -171,31 +203,23 @@ class ParamDict(NetlistToken):
 
         optional - whole parameter list is optional. Bit of a hack, but sure look.
         """
-        def newInit(obj, val):
-            obj.__parent = parent
-            obj.__allowed_params = paramset
-            cls.__init__(obj, val)
-
         r = r"((?:(?: *)[^ \n]+=(?:(?:\[.+\])+|[^ \n])+)+)"
         r = f'?{r}?' if optional else r
 
-        return type(f"{type(parent).__name__.lower()}ParamDict", (ParamDict,) ,{
-            '__init__' : newInit,
-            '__re__' : r
-            })
+        return _Bound(cls, r, parent=parent, allowed=paramset)
 
     @classproperty
     def __re__(cls):
         r = r"((?:(?: *)[^ \n]+=[^ \n]+)+)"
         return r
 
+_KV = re.compile(r'([^ \n]+=[^ \n]+)')
+
 class KVParam(NetlistToken):
     def __init__(self, val):
-        r = r"([^ ]+)=([^ ]+)"
-        m = re.search(r,val)
-        g = m.groups()
-        self.key = g[0]
-        super().__init__(g[1])
+        # the key ends at the last `=', as with a greedy ([^ ]+)=([^ ]+)
+        self.key, _, value = val.rpartition('=')
+        super().__init__(value)
 
     @classproperty
     def __re__(cls):
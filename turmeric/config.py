@@ -2,6 +2,8 @@ import json
 import logging
 import turmeric.settings
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_CONFIG_FILE = 'config.json'
 
 def load_config(configfile=DEFAULT_CONFIG_FILE,configdict=None):
@@ -20,7 +22,7 @@ def _write_options(configdict):
 
 
 def _load_config_file(filename):
-    logging.info(f'Loading config file {filename}')
+    logger.info(f'Loading config file {filename}')
     try:
         with open(filename, 'r') as f:
             config = json.load(f)
@@ -28,4 +30,4 @@ def _load_config_file(filename):
         _write_options(config)
         setattr(turmeric.settings,'config_filename',{'value' : filename, 'type':'str', 'description' : 'The name of the current config file'})
     except FileNotFoundError as e:
-        logging.error(f"Config file {filename} not found")
+        logger.error(f"Config file {filename} not found")
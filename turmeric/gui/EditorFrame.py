@@ -108,8 +108,12 @@ class EditorFrame(ttk.Frame):
             return
         self.console.writeOutput(f"Results being loaded from `{sol_files}'")
         sols = [Solution(filename=f.name,sol_type=f.suffix[1:]) for f in sol_files]
-        
-        results = dict(sol.as_dict(v_type=analyses_vtypes[a]) for a, sol in zip([f.suffix[1:] for f in sol_files],sols))
+
+        # Column stores are memory-mapped column by column as they are plotted
+        results = {}
+        for sol in sols:
+            cols = sol.columns()
+            results[sol.sol_type] = cols if cols is not None else sol.as_dict(v_type=analyses_vtypes[sol.sol_type])[1]
 
         if 'OP' in results:
             self.printOP(results['OP'])
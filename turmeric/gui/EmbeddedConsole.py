@@ -8,6 +8,8 @@ from threading import Thread
 from tkinter import *
 from tkinter import ttk
 
+from turmeric.gui import sharedresults
+
 ansi_colour_codes =  {
         'foreground':
         {
@@ -87,6 +89,8 @@ class EmbeddedConsole(Text):
         self.__bindings()
 
         self.python = self._spawnConsole(envfilename='turmeric/gui/interactive_console.py')
+        # Values passed to the console, whose shared memory is ours to free
+        self.shared = {}
 
         self.outBuf = queue.Queue()
         self.errBuf = queue.Queue()
@@ -116,6 +120,9 @@ class EmbeddedConsole(Text):
     # Called when widget destroyed
     def destroy(self):
         self.alive=False
+        for handle in self.shared.values():
+            handle.release()
+        self.shared.clear()
         self.python.stdin.write("exit()\n".encode())
         self.python.stdin.flush()
         super().destroy()
@@ -226,23 +233,17 @@ class EmbeddedConsole(Text):
             self.after(10, self.pollOutputStreams)
 
     def pass_variable(self, consoleVariable, value):
-        #self.write(command, readonly=True, output=False)
-        #import IPython;IPython.embed()
-        #output, error = self.python.communicate(command.encode())
-        #returncode = self.python.returncode
-
-        # Send command to subprocess
-        #console = self._spawnConsole(envfilename='turmeric/gui/dumb_console.py')
-        #pickled = f'pickle.dumps({command})'
-        #out,err = console.communicate(pickled.encode())
-        # Send output of that subprocess to output queues of ipython subprocess
-        #import pdb; pdb.set_trace()
-        #out = out[1:-2]
-
-        objstr = pickle.dumps(value)
-        #self.outBuf.put(out)
-        #self.errBuf.put(err)
-        self.__sendLine(f'{consoleVariable} = pickle.loads({objstr})\n')
+        """
+        Bind consoleVariable to value in the console. Its arrays are handed
+        over in shared memory, only their description goes through stdin.
+        """
+        handle = sharedresults.share(value)
+        previous = self.shared.pop(consoleVariable, None)
+        if previous is not None:
+            previous.release()
+        self.shared[consoleVariable] = handle
+        objstr = pickle.dumps(handle.descriptor)
+        self.__sendLine(f'{consoleVariable} = sharedresults.attach(pickle.loads({objstr}))\n')
 
 class EmbeddedConsoleFrame(ttk.Frame):
     def __init__(self, master):
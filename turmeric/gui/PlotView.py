@@ -5,6 +5,8 @@ from matplotlib.backend_bases import key_press_handler
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
 import numpy as np
+import turmeric.settings as settings
+from turmeric.gui.decimate import decimate, visible
 
 class PlotView(Frame):
     def __init__(self, master):
@@ -48,20 +50,48 @@ class PlotView(Frame):
 
         analysis = self.analysisSelection.get()
         x = self.res[analysis][self.X]
+        if analysis == 'AC':
+            x = np.absolute(x)
+        # only a sorted x can be cut down to the visible range
+        x_sorted = bool(np.all(np.diff(x) >= 0))
+        # lines and their full data, decimated again whenever the x range changes
+        self._lines = []
         for y in [self.res[analysis][yi] for yi in self.Y]:
             if analysis == 'AC':
-                x = np.absolute(x)
                 yabs = np.absolute(y)
                 yph  = np.angle(y)
-                plotfn(x,yabs,linestyle='solid')
+                line, = plotfn(*self.decimated(x, yabs, x_sorted), linestyle='solid')
+                self._lines.append((line, x, yabs, x_sorted))
                 #plotfn(x,yph ,linestyle='dashed')
             else:
-                plotfn(x,y)
+                line, = plotfn(*self.decimated(x, y, x_sorted))
+                self._lines.append((line, x, y, x_sorted))
         self.subplot.set_title(self.titleE.get())
         self.subplot.set_xlabel(self.xaxisE.get())
         self.subplot.set_ylabel(self.yaxisE.get())
+        # cla() replaces the callback registry, so connect after every clear
+        self.subplot.callbacks.connect('xlim_changed', self.on_xlim_changed)
         self.canvas.draw()
 
+    def decimated(self, x, y, x_sorted, xlim=None):
+        """
+        Points of x, y to draw: those within xlim reduced to a few per pixel
+        of the axes width.
+        """
+        if not x_sorted or settings.plot_decimation == 'none':
+            return x, y
+        if xlim is not None:
+            window = visible(x, *sorted(xlim))
+            x, y = x[window], y[window]
+        n_out = 2 * max(int(self.subplot.bbox.width), 100)
+        return decimate(x, y, n_out, settings.plot_decimation)
+
+    def on_xlim_changed(self, ax):
+        xlim = ax.get_xlim()
+        for line, x, y, x_sorted in self._lines:
+            line.set_data(*self.decimated(x, y, x_sorted, xlim))
+        self.canvas.draw_idle()
+
     def clear(self):
         self.subplot.cla()
 
@@ -0,0 +1,85 @@
+"""
+Downsampling of long waveforms for plotting
+
+A line plot can not show more detail than the pixels it is drawn on, so
+before handing a waveform to matplotlib it is reduced to a few points per
+pixel of the visible x range:
+
+    minmax: the minimum and maximum of each bin, which keeps every spike
+            visible (per-pixel envelope)
+    lttb:   Largest-Triangle-Three-Buckets, one point per bucket chosen to
+            preserve the visual shape of the line
+
+Both expect x to be sorted, as the sweep variable of TRAN, DC and AC
+results is.
+"""
+import numpy as np
+
+decimation_methods = ('none', 'minmax', 'lttb')
+
+def visible(x, lo, hi):
+    """
+    Slice of the sorted array x covering [lo, hi], extended by one point on
+    either side so that lines run to the edge of the axes.
+    """
+    start = max(int(np.searchsorted(x, lo, side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, hi, side='right')) + 1, len(x))
+    return slice(start, stop)
+
+def minmax(x, y, n_out):
+    """
+    Reduce x, y to at most about n_out points by keeping the minimum and
+    maximum of y in each of n_out/2 bins of equal length. The end points are
+    always kept.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 4:
+        return x, y
+    nbins = n_out // 2
+    size = n // nbins
+    body = np.asarray(y[:nbins * size]).reshape(nbins, size)
+    offsets = np.arange(nbins) * size
+    idx = [offsets + np.argmin(body, axis=1), offsets + np.argmax(body, axis=1), [0, n - 1]]
+    if nbins * size < n:
+        tail = np.asarray(y[nbins * size:])
+        idx.append([nbins * size + np.argmin(tail), nbins * size + np.argmax(tail)])
+    idx = np.unique(np.concatenate(idx))
+    return x[idx], y[idx]
+
+def lttb(x, y, n_out):
+    """
+    Reduce x, y to n_out points with the Largest-Triangle-Three-Buckets
+    algorithm. The first and last points are always kept.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+    xs = np.asarray(x, dtype=float)
+    ys = np.asarray(y, dtype=float)
+    # bucket boundaries of the n-2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    idx = np.empty(n_out, dtype=np.intp)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # average of the next bucket, or the last point
+        nlo, nhi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        # twice the area of the triangles (a, candidate, next average)
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(np.argmax(area))
+        idx[b + 1] = a
+    return x[idx], y[idx]
+
+def decimate(x, y, n_out, method='minmax'):
+    """
+    Reduce x, y to about n_out points with one of decimation_methods
+    """
+    if method == 'minmax':
+        return minmax(x, y, n_out)
+    if method == 'lttb':
+        return lttb(x, y, n_out)
+    if method == 'none':
+        return x, y
+    raise ValueError(f"Unknown decimation method `{method}', expected one of {decimation_methods}")
@@ -19,7 +19,8 @@ if __name__ == '__main__':
     c = Config()
     c.InteractiveShellApp.exec_lines = [
             'from turmeric import runnet',
-            'import pickle'
+            'import pickle',
+            'from turmeric.gui import sharedresults'
             ]
     c.InteractiveShellApp.exec_files = [
 
@@ -17,6 +17,7 @@ if __name__ == '__main__':
     c.InteractiveShellApp.exec_lines = [
             'from turmeric import runnet',
             'import pickle',
+            'from turmeric.gui import sharedresults',
             #'from IPython import display',
             #'%gui tk',
             #'%matplotlib tk'
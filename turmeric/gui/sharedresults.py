@@ -0,0 +1,107 @@
+"""
+Handing results to the embedded console without pickling their arrays
+
+The console runs in its own Python process. Rather than pickling whole
+waveforms through its stdin, share() puts each array of a result in a block
+of shared memory and describes the result with a few names and shapes:
+
+    handle = sharedresults.share({'TRAN' : data})
+    # in the console, given a copy of handle.descriptor
+    res = sharedresults.attach(descriptor)
+
+attach() rebuilds the result in the console from NumPy arrays viewing those
+blocks, so it costs the same however long the waveforms are. Column stores
+(results.ResultColumns) are already files and are opened again from their
+path, memory-mapping the same columns.
+
+The blocks belong to the process that shared them, and are freed when it
+releases the Handle. Attached arrays are read-only.
+"""
+import os
+import pickle
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from turmeric.results import ResultColumns
+
+class Handle(object):
+    """The descriptor of a shared value and the blocks of shared memory it owns"""
+    def __init__(self, descriptor, blocks):
+        self.descriptor = descriptor
+        self.blocks = blocks
+
+    def release(self):
+        """Free the blocks; consoles which attached them keep their views"""
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+def share(value):
+    """
+    Put the arrays of value, arrays in any nesting of dicts, lists and
+    tuples, in shared memory. Anything else is pickled into the descriptor.
+    """
+    blocks = []
+    try:
+        return Handle(_describe(value, blocks), blocks)
+    except BaseException:
+        Handle(None, blocks).release()
+        raise
+
+def _describe(value, blocks):
+    if isinstance(value, ResultColumns):
+        return ('columns', str(value.path))
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        # shared memory can not be empty
+        shm = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+        blocks.append(shm)
+        np.ndarray(value.shape, value.dtype, buffer=shm.buf)[...] = value
+        return ('array', shm.name, value.dtype, value.shape)
+    if isinstance(value, Mapping):
+        return ('dict', [(k, _describe(v, blocks)) for k, v in value.items()])
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, [_describe(v, blocks) for v in value])
+    return ('pickle', pickle.dumps(value))
+
+# The blocks attached by this process, which stay mapped as long as it runs
+_attached = {}
+
+def _open(name):
+    if name not in _attached:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            # the resource tracker would unlink the block when this process
+            # exits, although it belongs to the process that shared it
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        _attached[name] = shm
+    return _attached[name]
+
+def attach(descriptor):
+    """The value described by the descriptor of a Handle, without copying its arrays"""
+    kind, *args = descriptor
+    if kind == 'array':
+        name, dtype, shape = args
+        arr = np.ndarray(shape, dtype, buffer=_open(name).buf)
+        arr.flags.writeable = False
+        return arr
+    if kind == 'columns':
+        return ResultColumns(args[0])
+    if kind == 'dict':
+        return {k : attach(v) for k, v in args[0]}
+    if kind == 'list':
+        return [attach(v) for v in args[0]]
+    if kind == 'tuple':
+        return tuple(attach(v) for v in args[0])
+    if kind == 'pickle':
+        return pickle.loads(args[0])
+    raise ValueError(f"Unknown kind `{kind}' of shared value")
@@ -0,0 +1,111 @@
+"""
+Logging off the simulation's thread, with a level per subsystem
+
+start() puts a QueueHandler on the root logger and hands the records to
+the real handlers, e.g. the log file, on a background thread, so that
+formatting and writing them does not hold up the solvers. add_handler()
+and remove_handler() change those handlers while it runs, e.g. for the log
+file of each job of a batch, and forked worker processes get a listener of
+their own. Every module
+logs to its own logger, named after it, whose level is set by
+settings.log_levels, e.g.
+
+    turmeric.analyses=INFO,turmeric.parser=WARNING
+
+Records below the level of their logger cost a level check. Messages
+logged once per Newton iteration or timestep are at DEBUG and pass their
+arguments %-style, so they are not even formatted unless enabled.
+"""
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+
+_listener = None
+
+def parse_levels(levels):
+    """{logger name : level} from `name=LEVEL,...', `root' naming the root logger"""
+    parsed = {}
+    for item in filter(None, (i.strip() for i in levels.split(','))):
+        name, sep, level = item.partition('=')
+        if not sep or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Bad log level `{item}', expected <logger>=<LEVEL>")
+        name = name.strip()
+        parsed['' if name == 'root' else name] = level.strip().upper()
+    return parsed
+
+def apply_levels(levels):
+    """Set the level of each logger named in levels, see parse_levels"""
+    for name, level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(level)
+
+def start(*handlers):
+    """
+    Log everything through a queue to handlers, which keep their own
+    levels, until stop() or exit
+    """
+    global _listener
+    stop()
+    q = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(q))
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop():
+    """Write out the queued records and go back to logging directly"""
+    global _listener
+    if _listener is None:
+        return
+    _remove_queue_handlers()
+    _listener.stop()
+    for h in _listener.handlers:
+        h.flush()
+    _listener = None
+
+def add_handler(handler):
+    """
+    Hand the records logged from now on to handler as well, through the
+    listener if start() is in effect
+    """
+    if _listener is None:
+        logging.getLogger().addHandler(handler)
+    else:
+        _restart(_listener.handlers + (handler,))
+
+def remove_handler(handler):
+    """Stop handing records to handler, once those logged so far are written"""
+    if _listener is None:
+        logging.getLogger().removeHandler(handler)
+    else:
+        _restart(tuple(h for h in _listener.handlers if h is not handler))
+
+def _restart(handlers):
+    # stopping the listener writes out the records queued so far
+    _listener.stop()
+    _listener.handlers = handlers
+    _listener.start()
+
+def _remove_queue_handlers():
+    root = logging.getLogger()
+    for h in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        root.removeHandler(h)
+
+def _after_fork():
+    # a forked process, e.g. a worker of a pool, inherits the queue but not
+    # the thread emptying it: give it a listener of its own
+    global _listener
+    if _listener is None:
+        return
+    handlers, _listener = _listener.handlers, None
+    _remove_queue_handlers()
+    start(*handlers)
+    # pool workers leave without running atexit
+    multiprocessing.util.Finalize(None, stop, exitpriority=0)
+
+atexit.register(stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,248 @@
+"""
+Monte Carlo analysis over component tolerances
+
+    .mc runs=<int> [tol=<Value>] [tolr=<Value>] [tolc=<Value>] [toll=<Value>]
+        [told=<Value>] [dist=uniform|gauss] [seed=<int>] [jobs=<int>]
+        [output=all|stats]
+
+Runs every analysis of the netlist once per sample. In each sample the
+values of R, C and L elements and the IS, N and RS of diode models deviate
+from their nominal values by up to the relative tolerance tol; tolr, tolc,
+toll and told override it for each kind of component. With dist=gauss the
+tolerance is three standard deviations.
+
+Sample k draws from its own random stream, spawned from seed, so a sample is
+the same whichever worker runs it and however many jobs there are. The
+netlist is parsed once; with jobs > 1, samples run on a process pool.
+
+Results are streamed to disk as samples complete: the running mean, standard
+deviation, minimum and maximum of every value go to <outprefix>.<analysis>.stats
+and, unless output=stats, every sample goes to <outprefix>.<analysis> with
+the sample number as its first column.
+"""
+import copy
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from turmeric import components
+from turmeric import parallel
+from turmeric import progress
+from turmeric import results
+from turmeric import settings
+from turmeric.Directive import Directive
+from turmeric.analyses.Analysis import analyses_vtypes
+from turmeric.components.models.Shockley import Shockley
+from turmeric.components.tokens import ParamDict, Value
+
+logger = logging.getLogger(__name__)
+
+# The toleranced value of each element, and its tolerance parameter
+element_attrs = {
+    components.R : ('value', 'tolr'),
+    components.C : ('value', 'tolc'),
+    components.L : ('value', 'toll')
+}
+
+# The toleranced parameters of each model, and their tolerance parameter
+model_attrs = {
+    Shockley : (('IS', 'N', 'RS'), 'told')
+}
+
+distributions = ('uniform', 'gauss')
+
+_SCRATCH = 'mcscratch'
+
+class RunningStats(object):
+    """
+    Mean, standard deviation, minimum and maximum of a stream of equally
+    shaped arrays, updated one array at a time (Welford's algorithm)
+    """
+    def __init__(self):
+        self.n = 0
+
+    def update(self, x):
+        x = np.asarray(x)
+        self.n += 1
+        if self.n == 1:
+            self.mean = x.astype(np.result_type(x, float))
+            self._m2 = np.zeros(x.shape)
+            self.min = x.copy()
+            self.max = x.copy()
+            return
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += np.real(delta * np.conj(x - self.mean))
+        self.min = np.minimum(self.min, x)
+        self.max = np.maximum(self.max, x)
+
+    @property
+    def std(self):
+        """Sample standard deviation"""
+        if self.n < 2:
+            return np.zeros(self._m2.shape)
+        return np.sqrt(self._m2 / (self.n - 1))
+
+class MonteCarlo(Directive):
+    def __init__(self, line):
+        tol = lambda v: float(Value(v))
+        self.net_objs = [ParamDict.allowed_params(self, {
+            'runs'   : { 'type' : int   , 'default' : None      },
+            'tol'    : { 'type' : tol   , 'default' : '0.05'    },
+            # a negative tolerance falls back to tol
+            'tolr'   : { 'type' : tol   , 'default' : '-1'      },
+            'tolc'   : { 'type' : tol   , 'default' : '-1'      },
+            'toll'   : { 'type' : tol   , 'default' : '-1'      },
+            'told'   : { 'type' : tol   , 'default' : '-1'      },
+            'dist'   : { 'type' : str   , 'default' : 'uniform' },
+            'seed'   : { 'type' : int   , 'default' : '0'       },
+            'jobs'   : { 'type' : int   , 'default' : '1'       },
+            'output' : { 'type' : str   , 'default' : 'all'     }
+            })]
+        self.name = 'mc'
+        super().__init__(line)
+        for t in ('tolr', 'tolc', 'toll', 'told'):
+            if getattr(self, t) < 0:
+                setattr(self, t, self.tol)
+        if self.runs < 1:
+            raise ValueError(f"Monte Carlo needs at least one run, not {self.runs}")
+        if self.dist not in distributions:
+            raise ValueError(f"Unknown distribution {self.dist}, use one of {distributions}")
+        if self.output not in ('all', 'stats'):
+            raise ValueError(f"Unknown output {self.output}, use all or stats")
+
+    def __repr__(self):
+        """
+        .MC runs=<int> tol=<Value> tolr=<Value> tolc=<Value> toll=<Value> told=<Value> dist=<dist> seed=<int> jobs=<int> output=<output>
+        """
+        return f".MC runs={self.runs} tol={self.tol} tolr={self.tolr} tolc={self.tolc} toll={self.toll} "\
+               f"told={self.told} dist={self.dist} seed={self.seed} jobs={self.jobs} output={self.output}"
+
+    def prepare(self, circ):
+        """Keep the nominal values of everything that is toleranced"""
+        self._outprefix = settings.outprefix
+        self._elements = [(elem, attr, getattr(self, tol), getattr(elem, attr))
+                          for elem in circ if type(elem) in element_attrs
+                          for attr, tol in (element_attrs[type(elem)],)]
+        self._models = [(model, attr, getattr(self, tol), getattr(model, attr))
+                        for _, model in sorted(circ.models.items()) if type(model) in model_attrs
+                        for attrs, tol in (model_attrs[type(model)],) for attr in attrs]
+        self._base = {m : np.array(getattr(circ, m)) for m in ('M0', 'ZDC0', 'ZAC0', 'D0', 'ZT0')}
+
+    def restore(self, circ):
+        """Put every toleranced value and the matrices back as they were"""
+        for obj, attr, tol, nominal in self._elements + self._models:
+            setattr(obj, attr, nominal)
+        for m, base in self._base.items():
+            setattr(circ, m, np.array(base))
+
+    def rng(self, k):
+        """The random generator of sample k, the k-th child of seed"""
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(k,)))
+
+    def deviations(self, k, n):
+        """n relative deviations of sample k"""
+        rng = self.rng(k)
+        if self.dist == 'gauss':
+            return rng.standard_normal(n) / 3
+        return rng.uniform(-1., 1., n)
+
+    def apply(self, circ, k):
+        """Set every toleranced value to that of sample k"""
+        toleranced = self._elements + self._models
+        for (obj, attr, tol, nominal), d in zip(toleranced, self.deviations(k, len(toleranced))):
+            setattr(obj, attr, nominal * (1 + tol * d))
+        circ.gen_matrices()
+
+    def run_sample(self, circ, analyses, k):
+        """Run copies of the analyses on sample k"""
+        logger.info(f"Monte Carlo sample {k}")
+        self.apply(circ, k)
+        # analyses always write their results, each process reuses one scratch file
+        settings.outprefix = f"{self._outprefix}.{_SCRATCH}.{os.getpid()}"
+        res = {}
+        for a in analyses:
+            an, r = copy.deepcopy(a).run(circ)
+            res[an] = None if r is None else {h : np.asarray(v) for h, v in r.items()}
+        return res
+
+    def run(self, circ, analyses):
+        """
+        Run the analyses on every sample and return the statistics of their
+        results
+        """
+        self.prepare(circ)
+        logger.info(f"Running {self.runs} Monte Carlo samples")
+        writer = _Writer(self._outprefix, self.output == 'all')
+        reporter = progress.start('MC', self.runs)
+        try:
+            if self.jobs > 1 and self.runs > 1:
+                jobs = min(self.jobs, self.runs)
+                with parallel.pool(jobs, (self, circ, analyses)) as pool:
+                    chunksize = max(1, self.runs // (8 * jobs))
+                    for k, res in enumerate(pool.map(_run_sample, range(self.runs), chunksize=chunksize)):
+                        writer.write(k, res)
+                        reporter.update(k + 1, k)
+            else:
+                for k in range(self.runs):
+                    writer.write(k, self.run_sample(circ, analyses, k))
+                    reporter.update(k + 1, k)
+            reporter.finish(self.runs - 1)
+        finally:
+            self.restore(circ)
+            settings.outprefix = self._outprefix
+            _remove_scratch(self._outprefix)
+        return writer.close()
+
+class _Writer(object):
+    """Streams samples and their running statistics to disk"""
+    def __init__(self, outprefix, samples):
+        self.outprefix = outprefix
+        self.samples = samples
+        self._sols = {}
+        self._stats = {}
+        self._headers = {}
+
+    def write(self, k, res):
+        for an, r in res.items():
+            if r is None:
+                logger.warning(f"{an} failed on Monte Carlo sample {k}")
+                continue
+            if an not in self._headers:
+                self._headers[an] = list(r.keys())
+                self._stats[an] = RunningStats()
+                if self.samples:
+                    self._sols[an] = results.Solution(filename=f"{self.outprefix}.{an}", sol_type=an,
+                                                      extra_header='SAMPLE', headers=self._headers[an])
+            block = np.column_stack([r[h] for h in self._headers[an]])
+            self._stats[an].update(block)
+            if self.samples:
+                self._sols[an].write_block(np.column_stack([np.full(len(block), k), block]))
+
+    def close(self):
+        for sol in self._sols.values():
+            sol.close()
+        stats = {}
+        for an, s in self._stats.items():
+            headers = [f"{f}({h})" for h in self._headers[an] for f in ('MEAN', 'STD', 'MIN', 'MAX')]
+            sol = results.Solution(filename=f"{self.outprefix}.{an}.stats", sol_type=an, headers=headers)
+            columns = np.stack([s.mean, s.std, s.min, s.max], axis=-1).reshape(len(s.mean), -1)
+            sol.write_block(columns.astype(analyses_vtypes.get(an, float)))
+            sol.close()
+            logger.info(f"{an} statistics over {s.n} Monte Carlo samples written to {sol.filepath}")
+            stats[an] = sol.as_dict()[1]
+        return stats
+
+def _remove_scratch(outprefix):
+    for path in Path(settings.output_directory).glob(f"{outprefix}.{_SCRATCH}.*"):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+def _run_sample(k):
+    mc, circ, analyses = parallel.payload()
+    return mc.run_sample(circ, analyses, k)
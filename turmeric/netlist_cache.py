@@ -0,0 +1,104 @@
+"""
+On-disk cache of parsed netlists
+
+A parsed circuit and its analyses are pickled under a key hashed from the
+contents of the netlist, of every file it includes, and of the versions of
+the parser and its environment. Changing any of those gives a new key, so
+stale entries are never loaded, just left behind.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from turmeric import settings
+from turmeric.__version__ import __version__
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed at a time, so that hashing a netlist takes constant memory
+_HASH_CHUNK = 1 << 20
+
+# Settings read while parsing, e.g. as defaults of directive parameters
+_PARSE_SETTINGS = ('default_integration_scheme',)
+
+def included_files(filename):
+    """
+    Paths of the files included by the netlist ``filename``, recursively and
+    in the order they are included.
+    """
+    from turmeric.parser import parse_include_directive
+    found = []
+    pending = [filename]
+    while pending:
+        current = pending.pop(0)
+        with open(current, 'r') as f:
+            for line in f:
+                line = line.strip().lower()
+                if line.startswith('.include'):
+                    path = parse_include_directive(line, os.path.split(current)[0])
+                    if path not in found:
+                        found.append(path)
+                        pending.append(path)
+    return found
+
+def netlist_key(filename):
+    """
+    Content hash identifying the parse of the netlist ``filename``
+    """
+    from turmeric.parser import PARSER_VERSION
+    h = hashlib.sha256()
+    h.update(f'{PARSER_VERSION}:{__version__}:{sys.version_info[:2]}:{np.__version__}'.encode())
+    h.update(repr([getattr(settings, s) for s in _PARSE_SETTINGS]).encode())
+    for path in [filename] + included_files(filename):
+        h.update(str(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                h.update(chunk)
+        h.update(b'\0')
+    return h.hexdigest()
+
+def _cache_path(key):
+    # by default next to the results rather than wherever turmeric runs
+    directory = settings.netlist_cache_directory or Path(settings.output_directory) / '.turmeric_cache'
+    return Path(directory) / f'{key}.pickle'
+
+def load(key):
+    """
+    Return the (circuit, analyses) cached under ``key``, or None if there is
+    no usable entry.
+    """
+    path = _cache_path(key)
+    if not path.exists():
+        return None
+    try:
+        with path.open('rb') as f:
+            parsed = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable netlist cache entry `{path}': {e}")
+        return None
+    logger.info(f"Loaded parsed netlist from cache `{path}'")
+    return parsed
+
+def store(key, parsed):
+    """
+    Cache the (circuit, analyses) ``parsed`` under ``key``. The entry is
+    written to a temporary file first and then renamed, so that concurrent
+    runs never see half an entry.
+    """
+    path = _cache_path(key)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open('wb') as f:
+            pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"Could not cache parsed netlist in `{path}': {e}")
+        tmp.unlink(missing_ok=True)
+        return
+    logger.info(f"Cached parsed netlist in `{path}'")
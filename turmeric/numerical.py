@@ -5,6 +5,8 @@ A lightweight module containing any numerical algorithms without a home
 """
 import logging
 
+logger = logging.getLogger(__name__)
+
 def newtonRaphson(f, x0, df=None, args=(), tol=1e-10, MAXITERS=500):
     
     """
@@ -30,9 +32,9 @@ def newtonRaphson(f, x0, df=None, args=(), tol=1e-10, MAXITERS=500):
     iters = 0
     while (abs(f(x, *args)) > tol):
         iters += 1
-        x = x - (f(x0, *args))/(df(x0, *args))
-        if (iters < MAXITERS):
-            logging.critical("newtonRaphson(): newton method did not converge")
+        x = x - (f(x, *args))/(df(x, *args))
+        if (iters > MAXITERS):
+            logger.critical("newtonRaphson(): newton method did not converge")
             raise ValueError
          
     return x
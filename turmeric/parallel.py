@@ -0,0 +1,40 @@
+"""
+Process pools for running many simulations of one parsed circuit
+
+The parent hands every worker its settings and a pickled payload, e.g. the
+circuit and analyses, once when the worker starts. Tasks then only carry
+what differs between them, such as a step value or a random seed.
+"""
+import pickle
+
+from turmeric import settings
+
+_payload = None
+
+def settings_snapshot():
+    """The current settings, as far as they can be sent to another process"""
+    return {k : v for k, v in vars(settings).items()
+            if not k.startswith('_') and isinstance(v, (bool, int, float, str, list, tuple, dict))}
+
+def apply_settings(snapshot):
+    """Set the settings of this process to those of a snapshot"""
+    for k, v in snapshot.items():
+        setattr(settings, k, v)
+
+def _init_worker(snapshot, payload):
+    global _payload
+    apply_settings(snapshot)
+    _payload = pickle.loads(payload)
+
+def payload():
+    """The payload given to the pool this worker belongs to"""
+    return _payload
+
+def pool(jobs, payload):
+    """
+    Process pool of ``jobs`` workers, each initialised with the current
+    settings and ``payload``
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                               initargs=(settings_snapshot(), pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)))
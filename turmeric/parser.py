@@ -1,61 +1,87 @@
 import copy
+import importlib
 import os
 import logging
+from collections.abc import Mapping
 
 from turmeric import circuit
 from turmeric import components
-from turmeric import analyses
+from turmeric import netlist_cache
+from turmeric import settings
+from turmeric import subcircuit
 
+logger = logging.getLogger(__name__)
 
-def digest_raw_netlist(filename):
-    logging.info(f"Processing netlist `{filename}'")
-    directives = []
-    model_directives = []
-    net_lines = []
-    title = ""
+#: Bump whenever a change to parsing changes the parsed circuit, so that
+#: cached parses are not reused
+PARSER_VERSION = 7
 
+modelsmap = {
+    "d" : components.models.Shockley
+}
+
+class _Lazy(Mapping):
+    """Mapping to classes named `module:class', imported when first looked up"""
+    def __init__(self, names):
+        self._names = names
+        self._classes = {}
+
+    def __getitem__(self, key):
+        if key not in self._classes:
+            module, cls = self._names[key].split(':')
+            self._classes[key] = getattr(importlib.import_module(module), cls)
+        return self._classes[key]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+# Analyses are only imported by the netlists that use them
+directivesmap = _Lazy({
+    ".ac"   : "turmeric.analyses.AC:AC",
+    ".op"   : "turmeric.analyses.OP:OP",
+    ".dc"   : "turmeric.analyses.DC:DC",
+    ".tran" : "turmeric.analyses.TRAN:TRAN",
+    ".step" : "turmeric.step:Step",
+    ".temp" : "turmeric.step:Temp",
+    ".mc"   : "turmeric.montecarlo:MonteCarlo"
+})
+
+def read_title(filename):
+    """Title of a netlist, from its first line"""
     with open(filename, 'r') as f:
-        for i, line in enumerate(f.readlines()):
+        return f.readline().strip().lower()[1:]
+
+def read_netlist(filename):
+    """
+    Yield the statements of a netlist one line at a time, stripped and
+    lowercased. The title, comments and blank lines are skipped. Included
+    files are read in place of their .include directive, and reading a file
+    stops at its .end directive.
+
+    Only the line being parsed is held in memory.
+    """
+    logger.info(f"Processing netlist `{filename}'")
+    with open(filename, 'r') as f:
+        # the title
+        next(f, None)
+        for line in f:
             line = line.strip().lower()
- 
-            if i == 0:
-                title = line[1:]
-                continue
-            if line.isspace() or line == '' or line[0] == "*":
+            if line == '' or line[0] == "*":
                 continue
- 
-            # Directives, models statements, etc.
             if line[0] == ".":
-                tokens = line.split()
-                if tokens[0] == '.include':
-                    logging.info(f"Including `{filename}'")
-                    (t, d, md, nl) = digest_raw_netlist(parse_include_directive(line, os.path.split(filename)[0]))
-                    directives.extend(d)
-                    models.extend(md)
-                    net_lines.extend(nl)
-                    if t:
-                        logging.info(f"Found title `{t}' in included file. Ignoring...")
-                elif tokens[0] == ".end":
+                directive = line.split(None, 1)[0]
+                if directive == '.include':
+                    path = parse_include_directive(line, os.path.split(filename)[0])
+                    logger.info(f"Including `{path}'. Ignoring its title `{read_title(path)}'")
+                    yield from read_netlist(path)
+                    continue
+                elif directive == '.end':
                     break
-                elif tokens[0] == ".model":
-                    model_directives.append(line)
-                else:
-                    directives.append(line)
-                continue
-            net_lines.append(line)
-    modelsmap = {
-            "d" : components.models.Shockley
-            }
-    models = {m.model_id : m for m in [modelsmap[line.split()[1]](line) for line in model_directives]}
-    directivesmap = {
-        ".ac"   : analyses.AC,
-        ".op"   : analyses.OP,
-        ".dc"   : analyses.DC,
-        ".tran" : analyses.TRAN
-    }
-    ans = [directivesmap[line.split()[0]](line) for line in directives]
-    logging.info(f"Finished processing `{filename}'")
-    return (title, ans, models, net_lines)
+            yield line
+    logger.info(f"Finished processing `{filename}'")
 
 def parse_network(filename):
     """Parse a SPICE-like netlist
@@ -63,21 +89,44 @@ def parse_network(filename):
     **Returns:**
 
     (circuit_instance, plotting directives)
+
+    Parses are cached on disk when settings.use_netlist_cache is set, see
+    turmeric.netlist_cache.
     """
-    (title, analyses, models, net_lines) = digest_raw_netlist(filename)
-    circ = circuit.Circuit(title=title, filename=filename)
+    if settings.use_netlist_cache:
+        key = netlist_cache.netlist_key(filename)
+        parsed = netlist_cache.load(key)
+        if parsed is not None:
+            parsed[0].filename = filename
+            return parsed
 
-    # PARSE CIRCUIT
-    circ += main_parser(circ, net_lines, models)
-    # FIXME: surely models should be assigned through the constructor
-    circ.models = models
+    circ = circuit.Circuit(title=read_title(filename), filename=filename)
+    analyses = main_parser(circ, read_netlist(filename))
     circ.gen_matrices()
 
+    if settings.use_netlist_cache:
+        netlist_cache.store(key, (circ, analyses))
     return (circ, analyses)
 
 
-def main_parser(circ, netlist_lines, models):
-    elements = []
+def main_parser(circ, netlist_lines, models=None):
+    """
+    Add the elements, models and .save signals of netlist_lines to circ as
+    they are read, and return the analyses they request.
+
+    Diodes may come before the .model they use, and subcircuit instances
+    before the .subckt they use, so those lines are kept back until every
+    line has been read. Their place in the circuit and their nodes are
+    reserved, so the circuit is the same as if the definitions had come
+    first.
+    """
+    if models is not None:
+        circ.models.update(models)
+    models = circ.models
+    subcircuits = circ.subcircuits
+    ans = []
+    # (position in circ, line) of elements waiting for a model or subcircuit
+    deferred = []
     constructor = {
         'c': lambda line: components.C(line, circ),
         'd': lambda line: components.D(line, circ, models),
@@ -88,29 +137,103 @@ def main_parser(circ, netlist_lines, models):
         'r': lambda line: components.R(line, circ),
         'v': lambda line: components.sources.V(line,circ)
     }
-    for line in netlist_lines:
-        try:
-            elements.append(constructor[line[0]](line))
-        except KeyError:
-            raise logging.exception(f"Unknown element {line[0]} in {line}")
-    return elements
-
-def parse_temp_directive(line):
-    from turmeric.components.tokens import Value
-    line_elements = line.split()
-    for token in line_elements[1:]:
-        if token[0] == "*":
-            break
-        value = float(Value(token))
+    def build(line):
+        if line[0] == 'x':
+            return subcircuits[subcircuit.words(line)[-1]].instantiate(circ, line)
+        return [constructor[line[0]](line)]
+    def defer(line, nodes):
+        for node in nodes:
+            circ.add_node(node)
+        deferred.append((len(circ), line))
+        circ.append(None)
+
+    lines = iter(netlist_lines)
+    for line in lines:
+        # Directives, models statements, etc.
+        if line[0] == ".":
+            directive = line.split(None, 1)[0]
+            if directive == ".model":
+                model = modelsmap[line.split()[1]](line)
+                models[model.model_id] = model
+            elif directive == ".save":
+                circ.saves.extend(parse_save_directive(line))
+            elif directive == ".subckt":
+                sub = subcircuit.Subcircuit(line, read_subckt_body(lines, line))
+                subcircuits[sub.name] = sub
+            elif directive == ".ends":
+                raise ValueError(f".ends without .subckt: `{line}'")
+            else:
+                ans.append(directivesmap[directive](line))
+            continue
+        if line[0] == 'x':
+            words = subcircuit.words(line)
+            sub = subcircuits.get(words[-1])
+            if sub is None or not sub.ready(models, subcircuits):
+                defer(line, words[1:-1])
+            else:
+                circ.extend(sub.instantiate(circ, line))
+            continue
+        if line[0] not in constructor:
+            logger.error(f"Unknown element {line[0]} in {line}")
+            raise KeyError(f"Unknown element {line[0]} in `{line}'")
+        if line[0] == 'd':
+            words = line.split()
+            if len(words) > 3 and words[3] not in models:
+                defer(line, words[1:3])
+                continue
+        circ.append(constructor[line[0]](line))
+    for position, line in deferred:
+        if line[0] == 'x' and subcircuit.words(line)[-1] not in subcircuits:
+            raise ValueError(f"Subcircuit not defined: `{line}'")
+    # build in netlist order, then splice in from the back so positions hold
+    built = [(position, build(line)) for position, line in deferred]
+    for position, elements in reversed(built):
+        circ[position:position + 1] = elements
+    return ans
 
-    return {"type": "temp", "temp": value}
+def parse_directive(line):
+    """An analysis or other directive, e.g. `.op', on its own"""
+    line = line.strip().lower()
+    directive = line.split(None, 1)[0] if line else ''
+    if directive not in directivesmap:
+        raise ValueError(f"Unknown directive `{line}'")
+    return directivesmap[directive](line)
 
+def read_subckt_body(lines, line):
+    """
+    Lines of the body of the subcircuit defined by ``line'', taken from the
+    iterator ``lines'' up to the matching .ends
+    """
+    body = []
+    for l in lines:
+        if l.split(None, 1)[0] == '.ends':
+            return body
+        if l.split(None, 1)[0] == '.subckt':
+            raise ValueError(f"Nested .subckt definition in `{line}': `{l}'")
+        body.append(l)
+    raise ValueError(f"Missing .ends for `{line}'")
+
+def parse_save_directive(line):
+    """.save <signal> [<signal>...]
+
+    Signals are named as they appear in the results, e.g. v(out) or i(v1).
+    `.save all' records everything, as does leaving out the directive.
+    """
+    signals = []
+    for token in line.split()[1:]:
+        if token[0] == "*":
+            break
+        signals.append(token.upper())
+    if not signals:
+        raise ValueError(f"No signals given to save in `{line}'")
+    return [] if 'ALL' in signals else signals
 
 def parse_include_directive(line, wd):
     """.include <filename>
     """
     tokens = line.split()
     if not len(tokens) > 1 or (len(tokens) > 2 and not tokens[2][0] == '*'):
+        raise ValueError(f"Bad include directive: `{line}'")
     path = tokens[1]
     if not os.path.isabs(path):
         path = os.path.join(wd, path)
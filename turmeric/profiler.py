@@ -0,0 +1,136 @@
+"""
+Where the time of a simulation goes
+
+    python -m turmeric --profile <netlist>
+
+records the wall time of each analysis, split into phases, and counts what
+the solvers did, then writes <outprefix>.profile.json next to the results:
+
+    assembly     - stamping the MNA matrices, Circuit.gen_matrices
+    devices      - evaluating the nonlinear devices and their Jacobians
+    lu_factor    - LU factorisations, and the batched solves of batch_solve
+    lu_solve     - back-substitutions
+    io           - writing and reading results
+
+    newton_iterations - Newton iterations, per point for batched solves
+    solver_switches   - moves to the next of the solvers of setup_solvers
+    solver:<name>     - runs of each of those solvers
+    rejected_steps    - sweep and homotopy steps that failed and were retried smaller
+
+Parsing is reported on its own, as are the phases of a .step or .mc as a
+whole. Only the process running the netlist is profiled, not the workers
+of a pool.
+
+Timed functions check a single global when profiling is off, see timed().
+"""
+import functools
+import json
+import logging
+import time
+from pathlib import Path
+
+from turmeric import settings
+from turmeric.__version__ import __version__
+
+logger = logging.getLogger(__name__)
+
+class Profile(object):
+    """Time per phase and counters of one analysis"""
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.
+        self.phases = {}
+        self.counters = {}
+
+    def as_dict(self):
+        phases = dict(self.phases)
+        phases['other'] = max(0., self.wall - sum(self.phases.values()))
+        return {'analysis' : self.name, 'wall' : self.wall, 'phases' : phases, 'counters' : self.counters}
+
+# The profiles of the current run, None when not profiling
+_profiles = None
+# The profile being recorded into
+_current = None
+# The phase being timed, so that nested timed calls are not counted twice
+_phase = None
+
+def enable():
+    """Start recording profiles"""
+    global _profiles
+    _profiles = []
+
+def disable():
+    global _profiles, _current
+    _profiles = _current = None
+
+def enabled():
+    return _profiles is not None
+
+class _Recording(object):
+    """Context in which everything timed goes to a new profile"""
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        global _current
+        self._outer = _current
+        if _profiles is not None:
+            self.profile = Profile(self.name)
+            _profiles.append(self.profile)
+            _current = self.profile
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _current
+        if _profiles is not None:
+            self.profile.wall += time.perf_counter() - self._start
+        _current = self._outer
+        return False
+
+def record(name):
+    """
+    with record('OP'): ... records the wall time, phases and counters of the
+    block as the profile of name
+    """
+    return _Recording(name)
+
+def timed(phase, fn=None):
+    """
+    fn, timing its calls as phase when profiling. Use as a decorator,
+    @timed('io'), or as a wrapper, ludcmp = timed('lu_factor', ludcmp).
+    """
+    if fn is None:
+        return functools.partial(timed, phase)
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _phase
+        if _current is None or _phase is not None:
+            return fn(*args, **kwargs)
+        _phase = phase
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.phases[phase] = _current.phases.get(phase, 0.) + time.perf_counter() - start
+            _phase = None
+    return wrapper
+
+def count(counter, n=1):
+    """Add n to counter of the current profile"""
+    if _current is not None:
+        _current.counters[counter] = _current.counters.get(counter, 0) + n
+
+def report(netlist=None):
+    """The recorded profiles, as written by write_report"""
+    return {'version' : __version__, 'netlist' : netlist,
+            'profiles' : [p.as_dict() for p in _profiles or []]}
+
+def write_report(netlist=None):
+    """Write the recorded profiles to <outprefix>.profile.json"""
+    path = Path(settings.output_directory) / f"{settings.outprefix}.profile.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('w') as f:
+        json.dump(report(netlist), f, indent=1)
+    logger.info(f"Profile written to {path}")
+    return path
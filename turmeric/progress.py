@@ -0,0 +1,95 @@
+"""
+Progress of the running analysis
+
+Analyses report their progress through a Reporter:
+
+    reporter = progress.start('TRAN', total=nsteps, unit='s')
+    for i in ...:
+        reporter.update(i, t)
+    reporter.finish()
+
+and whoever wants to follow it adds a listener, called with a
+ProgressEvent: the analysis, the fraction done, the current sweep value
+(time, frequency, swept source...) and its unit, the measured rate in
+steps per second, the estimated time left, and whether the analysis is done
+and if it failed. Events are throttled to one per settings.progress_interval
+seconds, plus the last one. Without
+listeners, update() returns after a single check.
+
+console_bar is the listener printing the bar of the command line, which the
+GUI reads from the simulator's output.
+"""
+import sys
+import time
+from collections import namedtuple
+
+from turmeric import settings
+
+#: fraction in [0, 1], value of the swept variable or None, rate in steps
+#: per second and eta in seconds, None until measured; failed is only set
+#: with done, by an analysis which gave up
+ProgressEvent = namedtuple('ProgressEvent', 'analysis fraction value unit rate eta done failed',
+                           defaults=(False,))
+
+_listeners = []
+
+def add_listener(listener):
+    """Call listener(event) with the ProgressEvents of every analysis"""
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+class Reporter(object):
+    """Progress of one analysis over total steps"""
+    def __init__(self, analysis, total, unit=''):
+        self.analysis = analysis
+        self.total = total
+        self.unit = unit
+        self._start = time.perf_counter()
+        self._last = None
+        self._done = 0
+
+    def update(self, done, value=None):
+        """done of total steps are complete, at value of the swept variable"""
+        if not _listeners:
+            return
+        self._done = done
+        now = time.perf_counter()
+        if self._last is not None and now - self._last < settings.progress_interval:
+            return
+        self._last = now
+        self._emit(done, value, now)
+
+    def finish(self, value=None, failed=False):
+        """The analysis is complete, or gave up at value if failed"""
+        if _listeners:
+            self._emit(self._done if failed else self.total, value, time.perf_counter(), True, failed)
+
+    def _emit(self, done, value, now, finished=False, failed=False):
+        elapsed = now - self._start
+        fraction = min(1., done / self.total) if self.total else 1.
+        rate = done / elapsed if done and elapsed > 0 else None
+        eta = None if failed else 0. if finished else (self.total - done) / rate if rate else None
+        event = ProgressEvent(self.analysis, fraction, value, self.unit, rate, eta, finished, failed)
+        for listener in list(_listeners):
+            listener(event)
+
+def start(analysis, total, unit=''):
+    """A Reporter of the progress of analysis, reporting that it started"""
+    reporter = Reporter(analysis, total, unit)
+    if _listeners:
+        reporter._emit(0, None, reporter._start)
+    return reporter
+
+def console_bar(event, length=100, fill='#', stream=None):
+    """Print the progress of event as a bar, overwriting the previous one"""
+    stream = sys.stdout if stream is None else stream
+    filled = int(length * event.fraction)
+    bar = fill * filled + '-' * (length - filled)
+    eta = f" ETA {event.eta:.1f} s" if event.eta is not None and not event.done else ''
+    failed = " failed" if event.failed else ''
+    stream.write(f"\r{event.analysis} analysis |{bar}| {100 * event.fraction:.1f}%{eta}{failed}")
+    if event.done:
+        stream.write('\n')
+    stream.flush()
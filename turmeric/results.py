@@ -1,21 +1,66 @@
 import numpy as np
 import csv
+import json
 import logging
 import re
+import shutil
+from collections.abc import Mapping
 from pathlib import Path
 from turmeric.components import VoltageDefinedComponent
+from . import profiler
 from . import settings
 from turmeric.analyses.Analysis import analyses_vtypes
 
+logger = logging.getLogger(__name__)
+
+# Column store layout: <results file>.cols/{meta.json,index.npy,c<n>.npy}
+COLUMNS_SUFFIX = '.cols'
+COLUMNS_META = 'meta.json'
+COLUMNS_INDEX = 'index.npy'
+_ROWS_FILE = 'rows.bin'
+# Rows transposed into columns per pass when closing a column store
+_TRANSPOSE_CHUNK = 1 << 16
+
+# Callables notified of the results as solutions are written, see add_listener
+_listeners = []
+
+def add_listener(listener):
+    """
+    Call listener(event, solution, rows) as results are written: 'open' when a
+    solution is created, 'rows' with a 2D array of the rows just written, and
+    'close' when it is complete. rows is None but for 'rows'.
+    """
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+def _notify(event, solution, rows=None):
+    for listener in list(_listeners):
+        listener(event, solution, rows)
+
 class Solution(object):
-    def __init__(self, circ=None, filename=None, sol_type="", extra_header=None):
+    def __init__(self, circ=None, filename=None, sol_type="", extra_header=None, apply_saves=True, headers=None):
+        """
+        circ        - circuit whose node voltages and branch currents are written
+        extra_header - name of the sweep variable written before them, or a
+                      list of names for nested sweeps, innermost first
+        headers     - names of the values of a solution not written from a
+                      circuit, e.g. one combining other solutions
+        Without either circ or headers, the solution reads an existing file.
+        """
         self.sol_type = str(sol_type)
         if sol_type not in analyses_vtypes.keys():
-            logging.warning(f'Solution type of {sol_type} will not be available in TISE')
-        if extra_header is not None:
-            self.headers = [extra_header]
-        else:
-            self.headers = []
+            logger.warning(f'Solution type of {sol_type} will not be available in TISE')
+        if extra_header is None:
+            extra_header = []
+        elif isinstance(extra_header, str):
+            extra_header = [extra_header]
+        self.headers = list(extra_header)
+        self._nextra = len(self.headers)
+        # the (innermost) extra header of a sweep is its independent variable
+        self.index_name = self.headers[0] if self.headers else None
+        self.dtype = np.dtype(analyses_vtypes.get(self.sol_type, float))
 
         opdir = Path(settings.output_directory)
         if not opdir.is_dir():
@@ -25,9 +70,14 @@ class Solution(object):
             #self.filepath = opdir / re.sub(' ','_',f"{circ.title}.{sol_type}".strip())
             self.filepath = opdir / f'{settings.outprefix}.{self.sol_type}'
         else:
-            self.filepath = opdir / filename 
-        logging.info(f'Using results file {self.filepath}')
-        
+            self.filepath = opdir / filename
+        self.colpath = self.filepath.with_name(self.filepath.name + COLUMNS_SUFFIX)
+        logger.info(f'Using results file {self.filepath}')
+
+        # indices of the recorded values in a full row, None to record all
+        self._save_index = None
+        # length of the full rows written, before .save selects from them
+        self._nvalues = len(self.headers)
         if circ is not None:
             # we have reduced MNA
             NNODES = circ.nnodes -1
@@ -36,30 +86,151 @@ class Solution(object):
                 self.headers.append(header)
             for elem in circ:
                 if isinstance(elem, VoltageDefinedComponent):
-                    header=f"I({elem.name.upper()}{elem.part_id})"
+                    header=f"I({elem.name}{elem.part_id})".upper()
                     self.headers.append(header)
-            # setup file 
+            self._nvalues = len(self.headers)
+            if apply_saves and circ.saves:
+                self._select_saved(circ.saves)
+            # setup file
+            self._setup_file(mode='w')
+        elif headers is not None:
+            self.headers.extend(headers)
+            self._nvalues = len(self.headers)
             self._setup_file(mode='w')
-            
+
+    def _select_saved(self, saves):
+        """
+        Restrict the recorded columns to the signals named by .save directives.
+        The sweep variables, if any, are always kept.
+        """
+        positions = {h.upper() : i for i, h in enumerate(self.headers)}
+        unknown = [s for s in saves if s not in positions]
+        if unknown:
+            logger.error(f"Cannot save unknown signals {unknown}")
+            raise ValueError(f"Unknown signals {unknown} in .save, available signals are {self.headers}")
+        keep = list(range(self._nextra))
+        keep += sorted(set(positions[s] for s in saves) - set(keep))
+        self._save_index = np.array(keep, dtype=np.intp)
+        self.headers = [self.headers[i] for i in keep]
+
+    @profiler.timed('io')
     def _setup_file(self,mode):
         if mode in ['w','w+']:
             self.file = self.filepath.open(mode=mode)
             self.writer = csv.writer(self.file, delimiter=',')
             self.writer.writerow(self.headers)
+            # a stale store would shadow the csv we are about to write
+            if self.colpath.is_dir():
+                shutil.rmtree(self.colpath)
+            self._rows = None
+            if settings.results_column_store:
+                self.colpath.mkdir(parents=True)
+                self._rows = (self.colpath / _ROWS_FILE).open('wb')
+            if _listeners:
+                _notify('open', self)
+
 
-    
+    @profiler.timed('io')
     def write_data(self, x):
-        if len(x) != len(self.headers):
-            logging.error("Solution array is incorrect size")
+        if len(x) != self._nvalues:
+            logger.error("Solution array is incorrect size")
             raise ValueError
 
+        if self._save_index is not None:
+            x = np.asarray(x)[self._save_index].tolist()
         self.writer.writerow(x)
-        
+        if self._rows is not None:
+            np.asarray(x, dtype=self.dtype).tofile(self._rows)
+        if _listeners:
+            _notify('rows', self, np.asarray([x], dtype=self.dtype))
+
+    @profiler.timed('io')
+    def write_block(self, block):
+        """
+        Write many rows at once. block is a 2D array with one row per line
+        of the results.
+        """
+        block = np.asarray(block, dtype=self.dtype)
+        if block.ndim != 2 or block.shape[1] != self._nvalues:
+            logger.error("Solution block is incorrect size")
+            raise ValueError
+        if self._save_index is not None:
+            block = block[:, self._save_index]
+        self.writer.writerows(block.tolist())
+        if self._rows is not None:
+            np.ascontiguousarray(block).tofile(self._rows)
+        if _listeners:
+            _notify('rows', self, block)
+
+    @profiler.timed('io')
     def close(self):
         self.file.close()
+        if self._rows is not None:
+            self._rows.close()
+            self._rows = None
+            self._write_columns()
+        if _listeners:
+            _notify('close', self)
+
+    def _write_columns(self):
+        """
+        Transpose the raw rows written during the analysis into one .npy file
+        per column, so that single columns can later be memory-mapped.
+        """
+        rows_file = self.colpath / _ROWS_FILE
+        ncols = len(self.headers)
+        nrows = rows_file.stat().st_size // (self.dtype.itemsize * ncols) if ncols else 0
+        files = [f'c{i}.npy' for i in range(ncols)]
+
+        if nrows:
+            rows = np.memmap(rows_file, dtype=self.dtype, mode='r', shape=(nrows, ncols))
+            cols = [np.lib.format.open_memmap(self.colpath / f, mode='w+', dtype=self.dtype, shape=(nrows,)) for f in files]
+            for start in range(0, nrows, _TRANSPOSE_CHUNK):
+                block = np.array(rows[start:start + _TRANSPOSE_CHUNK])
+                for i, col in enumerate(cols):
+                    col[start:start + _TRANSPOSE_CHUNK] = block[:, i]
+            for col in cols:
+                col.flush()
+            del rows, cols
+        else:
+            for f in files:
+                np.save(self.colpath / f, np.empty(0, dtype=self.dtype))
+        rows_file.unlink()
 
+        is_sorted = False
+        if self.index_name is not None:
+            idx = np.real(np.load(self.colpath / files[0])).astype(np.float64)
+            is_sorted = bool(np.all(np.diff(idx) >= 0))
+            np.save(self.colpath / COLUMNS_INDEX, idx)
+
+        meta = {
+            'sol_type' : self.sol_type,
+            'headers'  : self.headers,
+            'files'    : files,
+            'dtype'    : self.dtype.str,
+            'rows'     : int(nrows),
+            'index'    : self.index_name,
+            'sorted'   : is_sorted
+            }
+        with (self.colpath / COLUMNS_META).open('w') as f:
+            json.dump(meta, f)
+
+    def columns(self):
+        """
+        Lazily loaded columns of this solution, or None if it was not stored
+        as a column store.
+        """
+        if not (self.colpath / COLUMNS_META).exists():
+            return None
+        return ResultColumns(self.colpath)
+
+    @profiler.timed('io')
     def as_dict(self, v_type=float):
-        
+
+        cols = self.columns()
+        if cols is not None:
+            return (self.sol_type, {h : np.array(cols[h]) for h in cols})
+
         with self.filepath.open('r',newline='') as csvfile:
             lines = csvfile.readlines()
         # set up dict keys
@@ -68,7 +239,82 @@ class Solution(object):
         nrows = len(lines)
 
         linelist = [x.rstrip().split(',') for x in lines[1:nrows+1]]
-        data = {keyVal:np.array([v_type(x[idx]) for x in linelist if len(x)==len(headers)]) for idx,keyVal in enumerate(headers)} 
-        
+        data = {keyVal:np.array([v_type(x[idx]) for x in linelist if len(x)==len(headers)]) for idx,keyVal in enumerate(headers)}
+
         return (self.sol_type, data)
-        
+
+class ResultColumns(Mapping):
+    """
+    Read-only mapping of header to column of a stored solution.
+
+    Columns are memory-mapped the first time they are accessed, so opening a
+    result costs the same regardless of its length. Sweeps (TRAN, AC, DC) keep
+    a real-valued copy of their independent variable which can be used to
+    slice every column to a range of time or frequency by binary search.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with (self.path / COLUMNS_META).open('r') as f:
+            meta = json.load(f)
+        self.sol_type = meta['sol_type']
+        self.headers = meta['headers']
+        self.nrows = meta['rows']
+        self.index_name = meta['index']
+        self._sorted = meta['sorted']
+        self._files = dict(zip(self.headers, meta['files']))
+        self._cache = {}
+
+    def _load(self, filename):
+        # numpy cannot memory-map an empty file
+        return np.load(self.path / filename, mmap_mode='r' if self.nrows else None)
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            self._cache[key] = self._load(self._files[key])
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self.headers)
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __repr__(self):
+        return f"ResultColumns({str(self.path)!r}, rows={self.nrows})"
+
+    @property
+    def index(self):
+        """The sweep variable as a sorted, real-valued array"""
+        if self.index_name is None:
+            raise ValueError(f"{self.sol_type} results have no sweep variable")
+        if COLUMNS_INDEX not in self._cache:
+            self._cache[COLUMNS_INDEX] = self._load(COLUMNS_INDEX)
+        return self._cache[COLUMNS_INDEX]
+
+    def window(self, start=None, stop=None):
+        """
+        Slice selecting the rows whose sweep variable lies in [start, stop].
+        Either bound may be None to leave that side open.
+        """
+        if not self._sorted:
+            raise ValueError(f"Sweep variable `{self.index_name}' of {self.sol_type} results is not sorted")
+        index = self.index
+        lo = 0 if start is None else int(np.searchsorted(index, start, side='left'))
+        hi = self.nrows if stop is None else int(np.searchsorted(index, stop, side='right'))
+        return slice(lo, hi)
+
+    def select(self, key, start=None, stop=None):
+        """Column ``key`` restricted to sweep values in [start, stop]"""
+        return self[key][self.window(start, stop)]
+
+def open_columns(filepath):
+    """
+    Open the column store belonging to the results file ``filepath``
+    (e.g. results/out.TRAN). Returns None if there is none.
+    """
+    filepath = Path(filepath)
+    colpath = filepath.with_name(filepath.name + COLUMNS_SUFFIX)
+    if not (colpath / COLUMNS_META).exists():
+        return None
+    return ResultColumns(colpath)
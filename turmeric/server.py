@@ -0,0 +1,188 @@
+"""
+Simulation server reading JSON-lines requests
+
+    python -m turmeric --server            requests on stdin, responses on stdout
+    python -m turmeric --socket <path>     requests on a Unix socket
+
+The server imports the simulator and reads config.json once, then simulates
+one request after another. A request is one line of JSON:
+
+    {"id": 1, "netlist": "<netlist text>", ...}  or  {"id": 1, "path": "<netlist file>", ...}
+
+with the optional fields
+
+    analyses  - directives run instead of those of the netlist, e.g. [".op"]
+    settings  - values of turmeric.settings for this request only
+    outprefix - prefix of the result files, the settings' by default
+    directory - where a netlist given as text is written, and so what its
+                .include paths are relative to; the current directory by default
+    format    - "json" (default) or "binary"
+
+The response is one line of JSON with the id of the request, a status of
+"ok" or "error" and either the results or a message. With "json", results
+maps each analysis to its columns, complex values as [real, imag] pairs, or
+to null if it failed. With "binary", results gives the headers, dtype and
+number of rows of each analysis, and the line is followed by nbytes bytes:
+the (rows, headers) arrays of the analyses in order, in C order.
+"""
+import contextlib
+import json
+import logging
+import os
+import pickle
+import socketserver
+import sys
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from turmeric import netlist_cache
+from turmeric import parallel
+from turmeric import parser
+from turmeric import settings
+from turmeric import turmeric
+
+logger = logging.getLogger(__name__)
+
+# Parses of netlists sent as text, most recently used last
+_parsed = OrderedDict()
+_PARSED_MAX = 64
+
+def _apply_settings(overrides):
+    unknown = [k for k in overrides if k.startswith('_') or not hasattr(settings, k)]
+    if unknown:
+        raise ValueError(f"Unknown settings {unknown}")
+    parallel.apply_settings(overrides)
+
+@contextlib.contextmanager
+def _netlist_file(text, directory):
+    """The netlist text written to a file in directory"""
+    with tempfile.NamedTemporaryFile('w', suffix='.net', dir=directory, delete=False) as f:
+        f.write(text)
+    try:
+        yield f.name
+    finally:
+        os.unlink(f.name)
+
+def _parse(request):
+    """
+    The circuit and analyses of the netlist of request. A netlist given as
+    text is kept parsed in memory rather than in the netlist cache, whose
+    keys include the filename, unless it includes other files.
+    """
+    if 'path' in request:
+        return parser.parse_network(request['path'])
+    if 'netlist' not in request:
+        raise ValueError("A request needs a netlist or a path")
+    text, directory = request['netlist'], request.get('directory', '.')
+    key = (text, os.path.abspath(directory), tuple(getattr(settings, s) for s in netlist_cache._PARSE_SETTINGS))
+    if key in _parsed:
+        _parsed.move_to_end(key)
+        return pickle.loads(_parsed[key])
+    use_netlist_cache, settings.use_netlist_cache = settings.use_netlist_cache, False
+    try:
+        with _netlist_file(text, directory) as filename:
+            parsed = parser.parse_network(filename)
+    finally:
+        settings.use_netlist_cache = use_netlist_cache
+    if '.include' not in text.lower():
+        _parsed[key] = pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(_parsed) > _PARSED_MAX:
+            _parsed.popitem(last=False)
+    return parsed
+
+def _columns(res):
+    """The results of an analysis as a (rows, headers) array and its headers"""
+    headers = list(res.keys())
+    return headers, np.column_stack([np.asarray(res[h]) for h in headers]) if headers else np.zeros((0, 0))
+
+def _encode(an_results, fmt):
+    """The results part of a response, and the binary data following it"""
+    if fmt == 'json':
+        encoded = {}
+        for an, res in an_results.items():
+            if res is None:
+                encoded[an] = None
+                continue
+            encoded[an] = {h : (np.column_stack([v.real, v.imag]) if np.iscomplexobj(v) else v).tolist()
+                           for h, v in ((h, np.asarray(v)) for h, v in res.items())}
+        return encoded, []
+    if fmt == 'binary':
+        encoded, buffers = {}, []
+        for an, res in an_results.items():
+            if res is None:
+                encoded[an] = None
+                continue
+            headers, block = _columns(res)
+            block = np.ascontiguousarray(block)
+            encoded[an] = {'headers' : headers, 'dtype' : block.dtype.str, 'rows' : len(block)}
+            buffers.append(block.tobytes())
+        return encoded, buffers
+    raise ValueError(f"Unknown format {fmt}, use json or binary")
+
+def handle(request):
+    """
+    Simulate one request
+
+    **Returns:**
+    (response, buffers) : the response as a dict, and the bytes to send
+    after it
+    """
+    saved = parallel.settings_snapshot()
+    try:
+        _apply_settings(request.get('settings', {}))
+        settings.outprefix = request.get('outprefix', settings.outprefix)
+        circ, analyses = _parse(request)
+        if 'analyses' in request:
+            analyses = [parser.parse_directive(line) for line in request['analyses']]
+        res = turmeric.run(circ, analyses)
+        encoded, buffers = _encode(res, request.get('format', 'json'))
+    finally:
+        parallel.apply_settings(saved)
+    response = {'id' : request.get('id'), 'status' : 'ok', 'results' : encoded}
+    if buffers:
+        response['nbytes'] = sum(len(b) for b in buffers)
+    return response, buffers
+
+def serve(rfile, wfile):
+    """Answer the JSON-lines requests read from rfile on wfile, until EOF"""
+    for line in rfile:
+        if not line.strip():
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            response, buffers = handle(request)
+        except Exception as e:
+            logger.exception("Request failed")
+            response, buffers = {'id' : request.get('id') if isinstance(request, dict) else None,
+                                 'status' : 'error', 'message' : f"{type(e).__name__}: {e}"}, []
+        wfile.write(json.dumps(response).encode() + b'\n')
+        for b in buffers:
+            wfile.write(b)
+        wfile.flush()
+
+def serve_stdio():
+    """Serve the requests on stdin; whatever analyses print goes to stderr"""
+    rfile, wfile = sys.stdin.buffer, sys.stdout.buffer
+    with contextlib.redirect_stdout(sys.stderr):
+        serve(rfile, wfile)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve(self.rfile, self.wfile)
+
+def serve_socket(path):
+    """
+    Serve the requests of the connections to the Unix socket at path, one
+    connection at a time since simulations share the settings
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.UnixStreamServer(path, _Handler) as server:
+        logger.info(f"Serving simulations on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
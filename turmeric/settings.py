@@ -21,6 +21,10 @@ gmin = 1e-12
 #      Newton Method       #
 ############################
 damp_initial = False
+#: Newton iterations of the first, plain attempt at an OP, before the homotopies.
+op_newton_max_iterations = 100
+#: Number of the last Newton iterations kept for diagnosing failed solves, 0 to keep none.
+newton_trace_length = 64
 
 ############################
 #      Homopothies         #
@@ -28,6 +32,8 @@ damp_initial = False
 use_standard_solve_method = True
 use_gmin_stepping = True
 use_source_stepping = True
+#: Fall back on pseudo-transient continuation when solving for an OP.
+use_pseudo_transient = True
 
 ############################
 #      DC Analysis         #
@@ -35,6 +41,10 @@ use_source_stepping = True
 dc_use_guess = True
 dc_max_guess_effort = 250000
 dc_sweep_skip_allowed = True
+#: Maximum number of Newton iterations correcting each point of a DC sweep.
+dc_corrector_max_iterations = 10
+#: Fraction of the sweep step below which a DC sweep point is solved from scratch.
+dc_min_step_fraction = 1e-3
 
 ############################
 #       Transient          #
@@ -54,7 +64,29 @@ ac_phase_in_deg = False
 
 config_filename = "config.json"
 #############################
+#        Logging            #
+#############################
+#: Minimum time in seconds between two progress reports of an analysis.
+progress_interval = 0.1
+#: Level of the loggers of subsystems, as <logger>=<LEVEL>,... e.g. turmeric.parser=WARNING
+log_levels = 'turmeric.analyses=INFO,turmeric.batch_solve=INFO'
+#############################
+#        Parsing            #
+#############################
+#: Cache parsed netlists on disk, keyed by a hash of their contents.
+use_netlist_cache = True
+#: Directory of the cache, <output_directory>/.turmeric_cache if empty.
+netlist_cache_directory = ''
+#############################
 #        Results            #
 #############################
 output_directory = 'results'
 outprefix = 'out'
+#: Also store results column by column so they can be memory-mapped lazily.
+results_column_store = True
+
+#############################
+#        Plotting           #
+#############################
+#: Downsampling of plotted waveforms to the visible range: none, minmax or lttb.
+plot_decimation = 'minmax'
@@ -7,13 +7,24 @@ Created on Tue May 19 12:49:45 2020
 """
 
 import logging
+import math
+from abc import ABC, abstractmethod
+from . import profiler
 from . import settings
 
+logger = logging.getLogger(__name__)
+
 class Solver():
     """
     Base class
+
+    dc_solve asks a solver to operate on the MNA matrices, solves the
+    system it returns and tells it whether that converged, until the solver
+    is finished or failed.
     """
-    
+    #: Newton iterations allowed per solve, None for those of dc_solve
+    max_iterations = None
+
     def __init__(self, name=None, steps=None):
         self.name = name
         self._steps = steps
@@ -37,8 +48,14 @@ class Solver():
     def _next_step(self):
         pass
     
-    def operate_on_M_and_ZDC(self):
+    def operate_on_M_and_ZDC(self, M, ZDC, G, x=None):
+        """The matrices of the next step, which is solved starting from x"""
         pass
+
+    def step_result(self, converged, n_iter):
+        """The system of the last step converged, or not, in n_iter iterations"""
+        if not converged:
+            self.fail()
     
 class Standard(Solver):
     def __init__(self, name='standard'):
@@ -49,71 +66,133 @@ class Standard(Solver):
     def __str__(self):
         return f"Name: {self.name}"
     
-    def operate_on_M_and_ZDC(self, M, ZDC, G):
+    def operate_on_M_and_ZDC(self, M, ZDC, G, x=None):
         self._finished = True
         return (M+G, ZDC)
-    
-class GminStepper(Solver):
-    
-    def __init__(self, name='gmin_stepping', start=1, stop=20, step=1):
+
+class Stepper(Solver, ABC):
+    """
+    Homotopy from start to stop of a parameter of the circuit.
+
+    Each step starts from the solution of the last, and the step grows
+    while they converge in few iterations. A step which fails is retried
+    from the last solution with half the step, and stepping fails once the
+    step is smaller than min_step.
+    """
+    max_iterations = 50
+    #: Steps converging in at most this many iterations double the next
+    easy_iterations = 8
+
+    def __init__(self, name, start, stop, step, min_step):
         self.name = name
         self._start = start
         self._stop = stop
         self._step = step
-        self._index = 0
+        self._min_step = min_step
+        # the parameter of the last solution and of the step being solved
+        self._solved = None
+        self._value = None
         self._failed = False
         self._finished = False
-    
+
+    def __str__(self):
+        return f"Name: {self.name}, at {self._solved} of {self._start} to {self._stop}"
+
     def _next_step(self):
-        s = self._start + self._index * self._step
-        self._index += 1
-        return s
-    
-    def operate_on_M_and_ZDC(self, M, ZDC, G):
-        s = self._next_step()
-        # check to see if we are on the last step
-        if s >= self._stop:
-            self._finished = True
+        if self._solved is None:
+            return self._start
+        if self._stop > self._start:
+            return min(self._solved + self._step, self._stop)
+        return max(self._solved - self._step, self._stop)
+
+    def operate_on_M_and_ZDC(self, M, ZDC, G, x=None):
+        self._value = self._next_step()
+        return self._apply(M, ZDC, G, self._value, x)
+
+    @abstractmethod
+    def _apply(self, M, ZDC, G, value, x):
+        """The matrices of the step to value, which is solved starting from x"""
+        pass
+
+    def step_result(self, converged, n_iter):
+        if converged:
+            started = self._solved is not None
+            self._solved = self._value
+            if self._value == self._stop:
+                self._finished = True
+            elif started and n_iter <= self.easy_iterations:
+                self._step *= 2
+        elif self._solved is None:
+            # no solution to go back to
+            self.fail()
+        else:
+            self._step /= 2
+            profiler.count('rejected_steps')
+            logger.debug("%s: step to %g failed, retrying with %g", self.name, self._value, self._step)
+            if self._step < self._min_step:
+                self.fail()
+    
+class GminStepper(Stepper):
+    """
+    Gmin of 10^-start down to 10^-stop, by default the gmin of the settings.
+    Steps are in decades.
+    """
+    def __init__(self, name='gmin_stepping', start=1, stop=None, step=1, min_step=1e-3):
+        if stop is None:
+            stop = -math.log10(settings.gmin)
+        super().__init__(name, start, stop, step, min_step)
+
+    def _apply(self, M, ZDC, G, s, x):
         # scale matrix by Gmin
         G *= 1.0/settings.gmin
         # apply new gmin
         G *= 10 ** -s
         return (M + G, ZDC)
         
-class SourceStepper(Solver):
-    def __init__(self, name ='source_stepping', start=3, stop=0.2, step=0.2):
-        self.name = name
-        self._start = start
-        self._stop = stop
-        self._step = step
-        self._index = 0
-        self._failed = False
-        self._finished = False
-    
-    def _next_step(self):
-        s = self._start - self._index * self._step
-        self._index += 1
-        return s
-        
-    def operate_on_M_and_ZDC(self, M, ZDC, G):
-        s = self._next_step()
-        if s <= self._stop:
-            self._finished = True
-        
-        ZDC *= 10 ** -s
+class SourceStepper(Stepper):
+    """Sources scaled from start to stop, by default from 0 to their full value"""
+    def __init__(self, name ='source_stepping', start=0., stop=1., step=0.1, min_step=1e-6):
+        super().__init__(name, start, stop, step, min_step)
+
+    def _apply(self, M, ZDC, G, scale, x):
+        ZDC *= scale
         return (M + G, ZDC)
-    
-def setup_solvers(Gmin=False):
-    
+
+class PtranStepper(Stepper):
+    """
+    Pseudo-transient continuation: a capacitor from every node to ground,
+    integrated by backward Euler from the last solution, with a timestep
+    growing until their conductance C/h falls from 10^-start to 10^-stop,
+    in decades. The last step, at stop, removes them and solves for DC.
+    """
+    def __init__(self, name='pseudo_transient', start=0, stop=None, step=0.5, min_step=1e-3):
+        if stop is None:
+            stop = -math.log10(settings.gmin)
+        super().__init__(name, start, stop, step, min_step)
+
+    def _apply(self, M, ZDC, G, s, x):
+        if s == self._stop:
+            return (M + G, ZDC)
+        # companion model of the capacitors, on the nodes G connects to ground
+        C = G * (10 ** -s / settings.gmin)
+        return (M + G + C, ZDC - C.dot(x))
+    
+def setup_solvers(Gmin=False, standard=True):
+    """
+    The solvers dc_solve tries in turn: plain Newton, unless standard is
+    False, and with Gmin the Gmin and source steppers and pseudo-transient
+    continuation
+    """
     solvers = []
-    if settings.use_standard_solve_method:
-        standard = Standard()
-        solvers.append(standard)
+    if settings.use_standard_solve_method and standard:
+        solvers.append(Standard())
     if settings.use_gmin_stepping and Gmin:
         gmin_stepping = GminStepper()
         solvers.append(gmin_stepping)
     if settings.use_source_stepping and Gmin:
         source_stepping = SourceStepper()
         solvers.append(source_stepping)
+    if settings.use_pseudo_transient and Gmin:
+        solvers.append(PtranStepper())
     
     return solvers
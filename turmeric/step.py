@@ -0,0 +1,217 @@
+"""
+.step parameter sweeps
+
+    .step param=<element> start=<Value> stop=<Value> step=<Value> [jobs=<int>]
+
+Runs every analysis of the netlist once per value of the element, e.g. the
+resistance of r1 or the dc value of v1. The netlist is parsed once. Between
+steps only the stamp of the stepped element is updated when it is current
+defined (R, C, I); otherwise the matrices are regenerated.
+
+Each step writes its results with the prefix <outprefix>.step<k>. They are
+then stacked into one result per analysis, <outprefix>.<analysis>, whose
+first column is the stepped value. With jobs > 1, steps run on a process pool.
+
+    .temp start=<Value> stop=<Value> step=<Value> [jobs=<int>]
+
+steps the temperature (Celsius) of every device the same way. Models scale
+their parameters to each temperature once, see Shockley.scaled.
+"""
+import copy
+import logging
+
+import numpy as np
+
+from turmeric import components
+from turmeric import parallel
+from turmeric import progress
+from turmeric import results
+from turmeric import settings
+from turmeric import units
+from turmeric.Directive import Directive
+from turmeric.components.tokens import ParamDict, Value
+
+logger = logging.getLogger(__name__)
+
+# The value of an element that is stepped
+stepped_attrs = {
+    components.R : 'value',
+    components.C : 'value',
+    components.L : 'value',
+    components.sources.V : 'dc_value',
+    components.sources.I : 'dc_value'
+}
+
+# Elements whose stamp can be updated on its own: they only add to the matrices
+incremental = (components.R, components.C, components.sources.I)
+
+_MATRICES = ('M0', 'ZDC0', 'ZAC0', 'D0', 'ZT0')
+
+class Step(Directive):
+    def __init__(self, line):
+        self.net_objs = [ParamDict.allowed_params(self, {
+            'param' : { 'type' : str                       , 'default' : None },
+            'start' : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'stop'  : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'step'  : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'jobs'  : { 'type' : int                       , 'default' : '1'  }
+            })]
+        super().__init__(line)
+        self.param = self.param.lower()
+
+    def __repr__(self):
+        """
+        .STEP param=<element> start=<Value> stop=<Value> step=<Value> [jobs=<int>]
+        """
+        return f".STEP param={self.param} start={self.start} stop={self.stop} step={self.step} jobs={self.jobs}"
+
+    @property
+    def label(self):
+        """Name of the stepped quantity in the results"""
+        return self.param.upper()
+
+    def values(self):
+        """The values stepped through, start and stop included"""
+        if self.step == 0 or (self.stop - self.start) * self.step < 0:
+            logger.error(f"Unbounded stepping in `{self!r}'")
+            raise ValueError(f"Bad step {self.step} from {self.start} to {self.stop}")
+        n = int(round((self.stop - self.start) / self.step)) + 1
+        return self.start + self.step * np.arange(n)
+
+    def prepare(self, circ):
+        """
+        Find the stepped element and keep the matrices it was stamped into,
+        so that each step starts from them whatever the analyses did to the
+        circuit.
+        """
+        self._elem = None
+        for elem in circ:
+            if type(elem) in stepped_attrs and f"{elem.name}{elem.part_id}".lower() == self.param:
+                self._elem = elem
+                break
+        if self._elem is None:
+            logger.error(f"Stepped element {self.param} was not found")
+            raise ValueError(f"Element {self.param} was not found")
+        self._attr = stepped_attrs[type(self._elem)]
+        self._nominal = getattr(self._elem, self._attr)
+        self._base = {m : np.array(getattr(circ, m)) for m in _MATRICES}
+
+    def restore(self, circ):
+        """Put the stepped element and the matrices back as they were"""
+        setattr(self._elem, self._attr, self._nominal)
+        for m, base in self._base.items():
+            setattr(circ, m, np.array(base))
+
+    def apply(self, circ, value):
+        """Set the stepped element to value and update the circuit's matrices"""
+        elem = self._elem
+        if type(elem) not in incremental or self._nominal is None:
+            setattr(elem, self._attr, value)
+            circ.gen_matrices()
+            return
+        # the difference between the stamps at the nominal and new values
+        old = [np.zeros(self._base[m].shape) for m in _MATRICES]
+        new = [np.zeros(self._base[m].shape) for m in _MATRICES]
+        setattr(elem, self._attr, self._nominal)
+        elem.stamp(*old, 0)
+        setattr(elem, self._attr, value)
+        elem.stamp(*new, 0)
+        for m, o, n in zip(_MATRICES, old, new):
+            setattr(circ, m, self._base[m] + (n - o))
+
+    def run_step(self, circ, analyses, k, value):
+        """Run copies of the analyses at the k-th step value"""
+        logger.info(f"Step {k}: {self.label}={value}")
+        self.apply(circ, value)
+        settings.outprefix = f"{self._outprefix}.step{k}"
+        res = {}
+        for a in analyses:
+            # analyses keep state from their last run, so each step gets a fresh copy
+            an, r = copy.deepcopy(a).run(circ)
+            res[an] = r
+        return res
+
+    def run(self, circ, analyses):
+        """
+        Run the analyses at every step value and return their stacked results
+        """
+        values = self.values()
+        self.prepare(circ)
+        self._outprefix = settings.outprefix
+        logger.info(f"Stepping {self.label} through {len(values)} values")
+        reporter = progress.start('STEP', len(values), self.label)
+        per_step = []
+        try:
+            if self.jobs > 1 and len(values) > 1:
+                with parallel.pool(min(self.jobs, len(values)), (self, circ, analyses)) as pool:
+                    for k, res in enumerate(pool.map(_run_step, range(len(values)), values)):
+                        per_step.append(res)
+                        reporter.update(k + 1, values[k])
+            else:
+                for k, v in enumerate(values):
+                    per_step.append(self.run_step(circ, analyses, k, v))
+                    reporter.update(k + 1, v)
+            reporter.finish(values[-1])
+        finally:
+            self.restore(circ)
+            settings.outprefix = self._outprefix
+        return self.stack(values, per_step)
+
+    def stack(self, values, per_step):
+        """
+        Write the results of all steps into one solution per analysis, with
+        the step value as its first column
+        """
+        stacked = {}
+        for an in dict.fromkeys(an for res in per_step for an in res):
+            steps = [(v, res.get(an)) for v, res in zip(values, per_step)]
+            headers = next(list(r.keys()) for v, r in steps if r is not None) if any(r is not None for v, r in steps) else None
+            if headers is None:
+                logger.error(f"{an} failed at every step")
+                stacked[an] = None
+                continue
+            sol = results.Solution(sol_type=an, extra_header=self.label, headers=headers)
+            for v, r in steps:
+                if r is None:
+                    logger.warning(f"{an} failed at {self.label}={v}")
+                    continue
+                cols = [np.asarray(r[h]) for h in headers]
+                sol.write_block(np.column_stack([np.full(len(cols[0]), v)] + cols))
+            sol.close()
+            stacked[an] = sol.as_dict()[1]
+        return stacked
+
+def _run_step(k, value):
+    step, circ, analyses = parallel.payload()
+    return step.run_step(circ, analyses, k, value)
+
+class Temp(Step):
+    def __init__(self, line):
+        self.net_objs = [ParamDict.allowed_params(self, {
+            'start' : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'stop'  : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'step'  : { 'type' : lambda v: float(Value(v)) , 'default' : None },
+            'jobs'  : { 'type' : int                       , 'default' : '1'  }
+            })]
+        Directive.__init__(self, line)
+        self.param = 'temp'
+
+    def __repr__(self):
+        """
+        .TEMP start=<Value> stop=<Value> step=<Value> [jobs=<int>]
+        """
+        return f".TEMP start={self.start} stop={self.stop} step={self.step} jobs={self.jobs}"
+
+    def prepare(self, circ):
+        """Keep the temperatures of the devices"""
+        self._devices = [(elem, elem.T) for elem in circ if hasattr(elem, 'set_temperature')]
+
+    def restore(self, circ):
+        """Put the devices back at their temperatures"""
+        for elem, T in self._devices:
+            elem.set_temperature(T)
+
+    def apply(self, circ, value):
+        """Set every device to value degrees Celsius"""
+        for elem, T in self._devices:
+            elem.set_temperature(units.Kelvin(celsius=value))
@@ -0,0 +1,105 @@
+"""
+Subcircuits
+
+    .subckt <name> <port> [<port>...]
+    <element lines>
+    .ends [<name>]
+
+    X<label> <node> [<node>...] <name>
+
+The body of a subcircuit is parsed once, the first time it is instantiated,
+into a template circuit. Every instance is a copy of the template's elements
+with their nodes renumbered, so the text is never parsed again.
+
+Instance elements and internal nodes are named after the instance, e.g. the
+resistor r1 and node mid of x1 become r.x1.r1 and x1.mid.
+"""
+import logging
+
+from turmeric import circuit
+
+logger = logging.getLogger(__name__)
+
+def words(line):
+    """Words of a netlist line, up to a trailing comment"""
+    w = line.split()
+    for i, word in enumerate(w):
+        if word[0] == '*':
+            return w[:i]
+    return w
+
+class Subcircuit(object):
+    def __init__(self, line, body):
+        """
+        line - the .subckt directive
+        body - lines between the .subckt and .ends directives
+        """
+        w = words(line)
+        if len(w) < 3:
+            raise ValueError(f"A subcircuit needs a name and at least one port: `{line}'")
+        self.name = w[1]
+        self.ports = w[2:]
+        if '0' in self.ports:
+            raise ValueError(f"Ground can not be a port of subcircuit {self.name}: `{line}'")
+        if len(set(self.ports)) != len(self.ports):
+            raise ValueError(f"Repeated port in subcircuit {self.name}: `{line}'")
+        self.body = body
+        self._template = None
+
+    def __repr__(self):
+        return f".subckt {self.name} {' '.join(self.ports)}"
+
+    def ready(self, models, subcircuits):
+        """
+        Whether every model and subcircuit used by the body is defined, so
+        that the template can be built.
+        """
+        if self._template is not None:
+            return True
+        for line in self.body:
+            w = words(line)
+            if line[0] == 'd' and len(w) > 3 and w[3] not in models:
+                return False
+            if line[0] == 'x':
+                sub = subcircuits.get(w[-1])
+                if sub is None or sub is self or not sub.ready(models, subcircuits):
+                    return False
+        return True
+
+    def template(self, parent):
+        """
+        The body parsed into a circuit of its own, whose first nodes are the
+        ports. Models and subcircuits are shared with the parent circuit.
+        """
+        if self._template is None:
+            from turmeric.parser import main_parser
+            logger.info(f"Building template of subcircuit {self.name}")
+            t = circuit.Circuit(title=f"subcircuit {self.name}")
+            t.models = parent.models
+            t.subcircuits = parent.subcircuits
+            for port in self.ports:
+                t.add_node(port)
+            ans = main_parser(t, self.body)
+            if ans or t.saves:
+                logger.warning(f"Ignoring directives in subcircuit {self.name}")
+            self._template = t
+            # the text is no longer needed
+            self.body = []
+        return self._template
+
+    def instantiate(self, parent, line):
+        """
+        Elements of the instance described by the X line ``line``, connected
+        to the nodes of ``parent``.
+        """
+        w = words(line)
+        label, nodes = w[0], w[1:-1]
+        if len(nodes) != len(self.ports):
+            raise ValueError(f"Subcircuit {self.name} has {len(self.ports)} ports, {len(nodes)} nodes given: `{line}'")
+        template = self.template(parent)
+        nodemap = {0 : 0}
+        for n in sorted(k for k in template.nodes_dict if isinstance(k, int) and k != 0):
+            # ports were added first, so they are nodes 1 to len(ports)
+            name = nodes[n - 1] if n <= len(nodes) else f"{label}.{template.nodes_dict[n]}"
+            nodemap[n] = parent.add_node(name)
+        return [elem.remap_nodes(nodemap, label) for elem in template]
@@ -0,0 +1,88 @@
+"""
+Ring buffer of the last Newton iterations, for finding out why a solve
+failed or crawled
+
+For each of the last settings.newton_trace_length iterations it keeps the
+residual norm, the largest |dx| and the unknown it belongs to, the damping
+and the solver in use. Recording an iteration stores a few numbers and
+does not format anything; dc_solve dumps the buffer to the log when it
+fails, and newton_trace.dump(circ) does so at any time.
+"""
+import logging
+
+import numpy as np
+
+from turmeric import settings
+from turmeric.components import VoltageDefinedComponent
+
+logger = logging.getLogger(__name__)
+
+def unknown_names(circ):
+    """Names of the unknowns of the reduced MNA system of circ, as in the results"""
+    names = [f"V({circ.nodes_dict[i + 1]})".upper() for i in range(circ.nnodes - 1)]
+    names += [f"I({elem.name}{elem.part_id})".upper() for elem in circ if isinstance(elem, VoltageDefinedComponent)]
+    return names
+
+class NewtonTrace(object):
+    def __init__(self, length=None):
+        # without a length, follow settings.newton_trace_length
+        self._follow = length is None
+        self.resize(settings.newton_trace_length if length is None else length)
+
+    def resize(self, length):
+        """Empty the trace and keep the last length iterations from now on"""
+        self.length = length
+        self.clear()
+
+    def clear(self):
+        self._rows = [None] * self.length
+        self._next = 0
+        self.count = 0
+
+    def record(self, iteration, error, dx, damping=1., solver=''):
+        """
+        Record a Newton iteration, with its residual error and update dx; dx
+        is None if the iteration failed before computing it
+        """
+        if self._follow and self.length != settings.newton_trace_length:
+            self.resize(settings.newton_trace_length)
+        if not self.length:
+            return
+        if dx is None:
+            k, max_dx = -1, np.nan
+        else:
+            k = int(np.argmax(np.abs(dx)))
+            max_dx = float(np.abs(dx.flat[k]))
+        self._rows[self._next] = (self.count, iteration, float(np.linalg.norm(error)), max_dx, k, damping, solver)
+        self._next = (self._next + 1) % self.length
+        self.count += 1
+
+    def entries(self, circ=None):
+        """
+        The recorded iterations, oldest first, as dicts. With circ, the
+        unknown with the largest update is given by name.
+        """
+        names = unknown_names(circ) if circ is not None else None
+        rows = [r for r in self._rows[self._next:] + self._rows[:self._next] if r is not None]
+        entries = []
+        for n, iteration, residual, max_dx, k, damping, solver in rows:
+            unknown = None if k < 0 else names[k] if names is not None and k < len(names) else k
+            entries.append({'n' : n, 'iteration' : iteration, 'residual' : residual, 'max_dx' : max_dx,
+                            'unknown' : unknown, 'damping' : damping, 'solver' : solver})
+        return entries
+
+    def format(self, circ=None):
+        """The recorded iterations as a table"""
+        lines = [f"{'N':>8} {'ITER':>5} {'|RESIDUAL|':>12} {'MAX |DX|':>12} {'UNKNOWN':<16} {'DAMPING':>8} SOLVER"]
+        for e in self.entries(circ):
+            lines.append(f"{e['n']:>8} {e['iteration']:>5} {e['residual']:>12.4e} {e['max_dx']:>12.4e} "
+                         f"{str(e['unknown']):<16} {e['damping']:>8.3g} {e['solver']}")
+        return '\n'.join(lines)
+
+    def dump(self, circ=None, reason="Newton trace", level=logging.WARNING):
+        """Log the recorded iterations"""
+        if self.count:
+            logger.log(level, f"{reason}: last {min(self.count, self.length)} of {self.count} Newton iterations\n{self.format(circ)}")
+
+#: The trace of every Newton iteration of this process
+newton_trace = NewtonTrace()
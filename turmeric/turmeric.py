@@ -1,49 +1,83 @@
 import sys
 import numpy as np
-import scipy as sp
 import logging
 
-from turmeric import parser,settings
-from turmeric import units
+from turmeric import log,parser,profiler,settings
+from turmeric.step import Step
+from turmeric.montecarlo import MonteCarlo
 from turmeric.config import load_config
 from turmeric.__version__ import __version__
 
-def temp_directive(T): # T in celsius
-    units.T = units.Kelvin(float(T))
+logger = logging.getLogger(__name__)
 
-analysis = {'temp': temp_directive}
-
-def main(filename,outprefix):
+def main(filename,outprefix,output_directory=None):
     """
     filename : string
         The netlist filename.
+    outprefix : string
+        Prefix of the generated files.
+    output_directory : string, optional
+        Directory of the generated files, instead of that of the settings.
 
     **Returns:**
     res : dict
         A dictionary containing the computed results.
+
+    **Raises:**
+    FileNotFoundError
+        If the netlist or a file it includes does not exist.
     """
-    logging.info(f"This is turmeric {__version__} running with:")
-    logging.info(f"==Python {sys.version.split()[0]}")
-    logging.info(f"==Numpy {np.__version__}")
-    logging.info(f"==Scipy {sp.__version__}")
+    logger.info(f"This is turmeric {__version__} running with:")
+    logger.info(f"==Python {sys.version.split()[0]}")
+    logger.info(f"==Numpy {np.__version__}")
+    if 'scipy' in sys.modules:
+        logger.info(f"==Scipy {sys.modules['scipy'].__version__}")
     
     load_config()
+    log.apply_levels(settings.log_levels)
     settings.outprefix = outprefix
+    if output_directory is not None:
+        settings.output_directory = output_directory
 
-    logging.info(f"Parsing netlist file `{filename}'")
+    logger.info(f"Parsing netlist file `{filename}'")
     try:
-        (circ, analyses) = parser.parse_network(filename)
+        with profiler.record('parse'):
+            (circ, analyses) = parser.parse_network(filename)
     except FileNotFoundError as e:
-        logging.exception(f"{e}: netlist file {filename} was not found")
-        sys.exit()
+        # also a missing .include: let the caller decide whether to go on
+        logger.exception(f"{e}: netlist file {filename} was not found")
+        raise
+
+    logger.info("Parsed circuit:")
+    logger.info(repr(circ) + '\n' + '\n'.join(repr(m) for m in circ.models.values()))
 
-    logging.info("Parsed circuit:")
-    logging.info(repr(circ) + '\n' + '\n'.join(repr(m) for m in circ.models.values()))
+    res = run(circ, analyses)
+    if profiler.enabled():
+        profiler.write_report(filename)
+    return res
+
+def run(circ, analyses):
+    """
+    Run the analyses of a parsed circuit, or the .step or .mc driving them
+
+    **Returns:**
+    res : dict
+        The results of each analysis, None for those that failed.
+    """
+    # .step and .mc run the analyses many times themselves
+    drivers = [a for a in analyses if isinstance(a, (Step, MonteCarlo))]
+    analyses = [a for a in analyses if not isinstance(a, (Step, MonteCarlo))]
+    if drivers:
+        if len(drivers) > 1:
+            logger.warning(f"Only `{drivers[0]!r}' is run, ignoring {len(drivers) - 1} more .step/.mc")
+        with profiler.record(type(drivers[0]).__name__):
+            return drivers[0].run(circ, analyses)
 
     results = {}
     for a in analyses:
-        logging.info(f"Analysis {a} running")
-        an, res = a.run(circ)
+        logger.info(f"Analysis {a} running")
+        with profiler.record(type(a).__name__):
+            an, res = a.run(circ)
         results[an] = res
         # TODO: are more than one analysis of a single type a real use case?
         #if an not in results: